@@ -28,6 +28,7 @@ __email__ = "niklas.fiekas@backscattering.de"
 
 __version__ = "0.22.0"
 
+import array
 import collections
 import copy
 import re
@@ -41,6 +42,9 @@ PIECE_TYPES = [PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING] = range(1, 7)
 PIECE_SYMBOLS = ["", "p", "n", "b", "r", "q", "k"]
 PIECE_NAMES = ["", "pawn", "knight", "bishop", "rook", "queen", "king"]
 
+SEE_PIECE_VALUES = [0, 100, 300, 300, 500, 900, 0]
+"""Piece values in centipawns used for static exchange evaluation, indexed by piece type."""
+
 UNICODE_PIECE_SYMBOLS = {
     "R": u"♖", "r": u"♜",
     "N": u"♘", "n": u"♞",
@@ -77,6 +81,17 @@ STATUS_RACE_CHECK = 4096
 STATUS_RACE_OVER = 8192
 STATUS_RACE_MATERIAL = 16384
 
+TERMINATION_CHECKMATE = "checkmate"
+TERMINATION_STALEMATE = "stalemate"
+TERMINATION_INSUFFICIENT_MATERIAL = "insufficient_material"
+TERMINATION_SEVENTYFIVE_MOVES = "seventyfive_moves"
+TERMINATION_FIVEFOLD_REPETITION = "fivefold_repetition"
+TERMINATION_FIFTY_MOVES = "fifty_moves"
+TERMINATION_THREEFOLD_REPETITION = "threefold_repetition"
+TERMINATION_VARIANT_WIN = "variant_win"
+TERMINATION_VARIANT_LOSS = "variant_loss"
+TERMINATION_VARIANT_DRAW = "variant_draw"
+
 
 SQUARES = [
     A1, B1, C1, D1, E1, F1, G1, H1,
@@ -180,8 +195,12 @@ def scan_reversed(bb, _BB_SQUARES=BB_SQUARES):
         yield r
         bb ^= _BB_SQUARES[r]
 
-def popcount(bb, _bin=bin):
-    return _bin(bb).count("1")
+if hasattr(int, "bit_count"):
+    def popcount(bb, _int=int):
+        return _int(bb).bit_count()  # Python 3.10
+else:
+    def popcount(bb, _bin=bin):
+        return _bin(bb).count("1")
 
 def bswap(bb, _be=struct.Struct(">Q"), _le=struct.Struct("<Q")):
     return _be.unpack(_le.pack(bb))[0]
@@ -223,6 +242,13 @@ def shift_down_left(b):
 def shift_down_right(b):
     return (b >> 7) & ~BB_FILE_A
 
+def pawn_attacks(color, pawns):
+    """Gets the squares attacked by the given pawns of the given color."""
+    if color == WHITE:
+        return shift_up_left(pawns) | shift_up_right(pawns)
+    else:
+        return shift_down_left(pawns) | shift_down_right(pawns)
+
 
 def _sliding_attacks(square, occupied, deltas):
     attacks = 0
@@ -247,10 +273,6 @@ BB_KING_ATTACKS = [_sliding_attacks(sq, BB_ALL, [9, 8, 7, 1, -9, -8, -7, -1]) fo
 BB_PAWN_ATTACKS = [[_sliding_attacks(sq, BB_ALL, deltas) for sq in SQUARES] for deltas in [[-7, -9], [7, 9]]]
 
 
-def _edges(square):
-    return (((BB_RANK_1 | BB_RANK_8) & ~BB_RANKS[square_rank(square)]) |
-            ((BB_FILE_A | BB_FILE_H) & ~BB_FILES[square_file(square)]))
-
 def _carry_rippler(mask):
     # Carry-Rippler trick to iterate subsets of mask.
     subset = 0
@@ -260,25 +282,68 @@ def _carry_rippler(mask):
         if not subset:
             break
 
-def _attack_table(deltas):
+def _line(square, delta_file, delta_rank):
+    # All squares on the line through the square in the given direction,
+    # from edge to edge.
+    file_index, rank_index = square_file(square), square_rank(square)
+    while 0 <= file_index - delta_file < 8 and 0 <= rank_index - delta_rank < 8:
+        file_index -= delta_file
+        rank_index -= delta_rank
+
+    line = []
+    while 0 <= file_index < 8 and 0 <= rank_index < 8:
+        line.append(rank_index * 8 + file_index)
+        file_index += delta_file
+        rank_index += delta_rank
+    return line
+
+def _line_attacks(square, line):
+    # Sliding attacks along a single line for each relevant occupancy. The
+    # ends of the line never block, so they are not relevant.
+    index = line.index(square)
+    rays = [line[index + 1:], line[index - 1::-1] if index else []]
+
+    mask = 0
+    for sq in line[1:-1]:
+        if sq != square:
+            mask |= BB_SQUARES[sq]
+
+    attacks = {}
+    for subset in _carry_rippler(mask):
+        bb = 0
+        for ray in rays:
+            for sq in ray:
+                bb |= BB_SQUARES[sq]
+                if subset & BB_SQUARES[sq]:
+                    break
+        attacks[subset] = bb
+
+    return mask, attacks
+
+def _attack_table(directions):
+    # Combines the tables of the lines through each square, so that only
+    # the small tables of single lines have to be computed square by
+    # square.
     mask_table = []
     attack_table = []
 
     for square in SQUARES:
-        attacks = {}
+        mask = 0
+        attacks = {0: 0}
 
-        mask = _sliding_attacks(square, 0, deltas) & ~_edges(square)
-        for subset in _carry_rippler(mask):
-            attacks[subset] = _sliding_attacks(square, subset, deltas)
+        for delta_file, delta_rank in directions:
+            line_mask, line_attacks = _line_attacks(square, _line(square, delta_file, delta_rank))
+            mask |= line_mask
+            attacks = dict((a | b, attacks[a] | line_attacks[b]) for a in attacks for b in line_attacks)
 
         attack_table.append(attacks)
         mask_table.append(mask)
 
     return mask_table, attack_table
 
-BB_DIAG_MASKS, BB_DIAG_ATTACKS = _attack_table([-9, -7, 7, 9])
-BB_FILE_MASKS, BB_FILE_ATTACKS = _attack_table([-8, 8])
-BB_RANK_MASKS, BB_RANK_ATTACKS = _attack_table([-1, 1])
+BB_DIAG_MASKS, BB_DIAG_ATTACKS = _attack_table([(1, 1), (1, -1)])
+BB_FILE_MASKS, BB_FILE_ATTACKS = _attack_table([(0, 1)])
+BB_RANK_MASKS, BB_RANK_ATTACKS = _attack_table([(1, 0)])
 
 
 def _rays():
@@ -307,14 +372,295 @@ def _rays():
 BB_RAYS, BB_BETWEEN = _rays()
 
 
+# Pseudo-random values for Zobrist hashing, compatible with Polyglot opening
+# books.
+POLYGLOT_RANDOM_ARRAY = [
+    0x9D39247E33776D41, 0x2AF7398005AAA5C7, 0x44DB015024623547, 0x9C15F73E62A76AE2,
+    0x75834465489C0C89, 0x3290AC3A203001BF, 0x0FBBAD1F61042279, 0xE83A908FF2FB60CA,
+    0x0D7E765D58755C10, 0x1A083822CEAFE02D, 0x9605D5F0E25EC3B0, 0xD021FF5CD13A2ED5,
+    0x40BDF15D4A672E32, 0x011355146FD56395, 0x5DB4832046F3D9E5, 0x239F8B2D7FF719CC,
+    0x05D1A1AE85B49AA1, 0x679F848F6E8FC971, 0x7449BBFF801FED0B, 0x7D11CDB1C3B7ADF0,
+    0x82C7709E781EB7CC, 0xF3218F1C9510786C, 0x331478F3AF51BBE6, 0x4BB38DE5E7219443,
+    0xAA649C6EBCFD50FC, 0x8DBD98A352AFD40B, 0x87D2074B81D79217, 0x19F3C751D3E92AE1,
+    0xB4AB30F062B19ABF, 0x7B0500AC42047AC4, 0xC9452CA81A09D85D, 0x24AA6C514DA27500,
+    0x4C9F34427501B447, 0x14A68FD73C910841, 0xA71B9B83461CBD93, 0x03488B95B0F1850F,
+    0x637B2B34FF93C040, 0x09D1BC9A3DD90A94, 0x3575668334A1DD3B, 0x735E2B97A4C45A23,
+    0x18727070F1BD400B, 0x1FCBACD259BF02E7, 0xD310A7C2CE9B6555, 0xBF983FE0FE5D8244,
+    0x9F74D14F7454A824, 0x51EBDC4AB9BA3035, 0x5C82C505DB9AB0FA, 0xFCF7FE8A3430B241,
+    0x3253A729B9BA3DDE, 0x8C74C368081B3075, 0xB9BC6C87167C33E7, 0x7EF48F2B83024E20,
+    0x11D505D4C351BD7F, 0x6568FCA92C76A243, 0x4DE0B0F40F32A7B8, 0x96D693460CC37E5D,
+    0x42E240CB63689F2F, 0x6D2BDCDAE2919661, 0x42880B0236E4D951, 0x5F0F4A5898171BB6,
+    0x39F890F579F92F88, 0x93C5B5F47356388B, 0x63DC359D8D231B78, 0xEC16CA8AEA98AD76,
+    0x5355F900C2A82DC7, 0x07FB9F855A997142, 0x5093417AA8A7ED5E, 0x7BCBC38DA25A7F3C,
+    0x19FC8A768CF4B6D4, 0x637A7780DECFC0D9, 0x8249A47AEE0E41F7, 0x79AD695501E7D1E8,
+    0x14ACBAF4777D5776, 0xF145B6BECCDEA195, 0xDABF2AC8201752FC, 0x24C3C94DF9C8D3F6,
+    0xBB6E2924F03912EA, 0x0CE26C0B95C980D9, 0xA49CD132BFBF7CC4, 0xE99D662AF4243939,
+    0x27E6AD7891165C3F, 0x8535F040B9744FF1, 0x54B3F4FA5F40D873, 0x72B12C32127FED2B,
+    0xEE954D3C7B411F47, 0x9A85AC909A24EAA1, 0x70AC4CD9F04F21F5, 0xF9B89D3E99A075C2,
+    0x87B3E2B2B5C907B1, 0xA366E5B8C54F48B8, 0xAE4A9346CC3F7CF2, 0x1920C04D47267BBD,
+    0x87BF02C6B49E2AE9, 0x092237AC237F3859, 0xFF07F64EF8ED14D0, 0x8DE8DCA9F03CC54E,
+    0x9C1633264DB49C89, 0xB3F22C3D0B0B38ED, 0x390E5FB44D01144B, 0x5BFEA5B4712768E9,
+    0x1E1032911FA78984, 0x9A74ACB964E78CB3, 0x4F80F7A035DAFB04, 0x6304D09A0B3738C4,
+    0x2171E64683023A08, 0x5B9B63EB9CEFF80C, 0x506AACF489889342, 0x1881AFC9A3A701D6,
+    0x6503080440750644, 0xDFD395339CDBF4A7, 0xEF927DBCF00C20F2, 0x7B32F7D1E03680EC,
+    0xB9FD7620E7316243, 0x05A7E8A57DB91B77, 0xB5889C6E15630A75, 0x4A750A09CE9573F7,
+    0xCF464CEC899A2F8A, 0xF538639CE705B824, 0x3C79A0FF5580EF7F, 0xEDE6C87F8477609D,
+    0x799E81F05BC93F31, 0x86536B8CF3428A8C, 0x97D7374C60087B73, 0xA246637CFF328532,
+    0x043FCAE60CC0EBA0, 0x920E449535DD359E, 0x70EB093B15B290CC, 0x73A1921916591CBD,
+    0x56436C9FE1A1AA8D, 0xEFAC4B70633B8F81, 0xBB215798D45DF7AF, 0x45F20042F24F1768,
+    0x930F80F4E8EB7462, 0xFF6712FFCFD75EA1, 0xAE623FD67468AA70, 0xDD2C5BC84BC8D8FC,
+    0x7EED120D54CF2DD9, 0x22FE545401165F1C, 0xC91800E98FB99929, 0x808BD68E6AC10365,
+    0xDEC468145B7605F6, 0x1BEDE3A3AEF53302, 0x43539603D6C55602, 0xAA969B5C691CCB7A,
+    0xA87832D392EFEE56, 0x65942C7B3C7E11AE, 0xDED2D633CAD004F6, 0x21F08570F420E565,
+    0xB415938D7DA94E3C, 0x91B859E59ECB6350, 0x10CFF333E0ED804A, 0x28AED140BE0BB7DD,
+    0xC5CC1D89724FA456, 0x5648F680F11A2741, 0x2D255069F0B7DAB3, 0x9BC5A38EF729ABD4,
+    0xEF2F054308F6A2BC, 0xAF2042F5CC5C2858, 0x480412BAB7F5BE2A, 0xAEF3AF4A563DFE43,
+    0x19AFE59AE451497F, 0x52593803DFF1E840, 0xF4F076E65F2CE6F0, 0x11379625747D5AF3,
+    0xBCE5D2248682C115, 0x9DA4243DE836994F, 0x066F70B33FE09017, 0x4DC4DE189B671A1C,
+    0x51039AB7712457C3, 0xC07A3F80C31FB4B4, 0xB46EE9C5E64A6E7C, 0xB3819A42ABE61C87,
+    0x21A007933A522A20, 0x2DF16F761598AA4F, 0x763C4A1371B368FD, 0xF793C46702E086A0,
+    0xD7288E012AEB8D31, 0xDE336A2A4BC1C44B, 0x0BF692B38D079F23, 0x2C604A7A177326B3,
+    0x4850E73E03EB6064, 0xCFC447F1E53C8E1B, 0xB05CA3F564268D99, 0x9AE182C8BC9474E8,
+    0xA4FC4BD4FC5558CA, 0xE755178D58FC4E76, 0x69B97DB1A4C03DFE, 0xF9B5B7C4ACC67C96,
+    0xFC6A82D64B8655FB, 0x9C684CB6C4D24417, 0x8EC97D2917456ED0, 0x6703DF9D2924E97E,
+    0xC547F57E42A7444E, 0x78E37644E7CAD29E, 0xFE9A44E9362F05FA, 0x08BD35CC38336615,
+    0x9315E5EB3A129ACE, 0x94061B871E04DF75, 0xDF1D9F9D784BA010, 0x3BBA57B68871B59D,
+    0xD2B7ADEEDED1F73F, 0xF7A255D83BC373F8, 0xD7F4F2448C0CEB81, 0xD95BE88CD210FFA7,
+    0x336F52F8FF4728E7, 0xA74049DAC312AC71, 0xA2F61BB6E437FDB5, 0x4F2A5CB07F6A35B3,
+    0x87D380BDA5BF7859, 0x16B9F7E06C453A21, 0x7BA2484C8A0FD54E, 0xF3A678CAD9A2E38C,
+    0x39B0BF7DDE437BA2, 0xFCAF55C1BF8A4424, 0x18FCF680573FA594, 0x4C0563B89F495AC3,
+    0x40E087931A00930D, 0x8CFFA9412EB642C1, 0x68CA39053261169F, 0x7A1EE967D27579E2,
+    0x9D1D60E5076F5B6F, 0x3810E399B6F65BA2, 0x32095B6D4AB5F9B1, 0x35CAB62109DD038A,
+    0xA90B24499FCFAFB1, 0x77A225A07CC2C6BD, 0x513E5E634C70E331, 0x4361C0CA3F692F12,
+    0xD941ACA44B20A45B, 0x528F7C8602C5807B, 0x52AB92BEB9613989, 0x9D1DFA2EFC557F73,
+    0x722FF175F572C348, 0x1D1260A51107FE97, 0x7A249A57EC0C9BA2, 0x04208FE9E8F7F2D6,
+    0x5A110C6058B920A0, 0x0CD9A497658A5698, 0x56FD23C8F9715A4C, 0x284C847B9D887AAE,
+    0x04FEABFBBDB619CB, 0x742E1E651C60BA83, 0x9A9632E65904AD3C, 0x881B82A13B51B9E2,
+    0x506E6744CD974924, 0xB0183DB56FFC6A79, 0x0ED9B915C66ED37E, 0x5E11E86D5873D484,
+    0xF678647E3519AC6E, 0x1B85D488D0F20CC5, 0xDAB9FE6525D89021, 0x0D151D86ADB73615,
+    0xA865A54EDCC0F019, 0x93C42566AEF98FFB, 0x99E7AFEABE000731, 0x48CBFF086DDF285A,
+    0x7F9B6AF1EBF78BAF, 0x58627E1A149BBA21, 0x2CD16E2ABD791E33, 0xD363EFF5F0977996,
+    0x0CE2A38C344A6EED, 0x1A804AADB9CFA741, 0x907F30421D78C5DE, 0x501F65EDB3034D07,
+    0x37624AE5A48FA6E9, 0x957BAF61700CFF4E, 0x3A6C27934E31188A, 0xD49503536ABCA345,
+    0x088E049589C432E0, 0xF943AEE7FEBF21B8, 0x6C3B8E3E336139D3, 0x364F6FFA464EE52E,
+    0xD60F6DCEDC314222, 0x56963B0DCA418FC0, 0x16F50EDF91E513AF, 0xEF1955914B609F93,
+    0x565601C0364E3228, 0xECB53939887E8175, 0xBAC7A9A18531294B, 0xB344C470397BBA52,
+    0x65D34954DAF3CEBD, 0xB4B81B3FA97511E2, 0xB422061193D6F6A7, 0x071582401C38434D,
+    0x7A13F18BBEDC4FF5, 0xBC4097B116C524D2, 0x59B97885E2F2EA28, 0x99170A5DC3115544,
+    0x6F423357E7C6A9F9, 0x325928EE6E6F8794, 0xD0E4366228B03343, 0x565C31F7DE89EA27,
+    0x30F5611484119414, 0xD873DB391292ED4F, 0x7BD94E1D8E17DEBC, 0xC7D9F16864A76E94,
+    0x947AE053EE56E63C, 0xC8C93882F9475F5F, 0x3A9BF55BA91F81CA, 0xD9A11FBB3D9808E4,
+    0x0FD22063EDC29FCA, 0xB3F256D8ACA0B0B9, 0xB03031A8B4516E84, 0x35DD37D5871448AF,
+    0xE9F6082B05542E4E, 0xEBFAFA33D7254B59, 0x9255ABB50D532280, 0xB9AB4CE57F2D34F3,
+    0x693501D628297551, 0xC62C58F97DD949BF, 0xCD454F8F19C5126A, 0xBBE83F4ECC2BDECB,
+    0xDC842B7E2819E230, 0xBA89142E007503B8, 0xA3BC941D0A5061CB, 0xE9F6760E32CD8021,
+    0x09C7E552BC76492F, 0x852F54934DA55CC9, 0x8107FCCF064FCF56, 0x098954D51FFF6580,
+    0x23B70EDB1955C4BF, 0xC330DE426430F69D, 0x4715ED43E8A45C0A, 0xA8D7E4DAB780A08D,
+    0x0572B974F03CE0BB, 0xB57D2E985E1419C7, 0xE8D9ECBE2CF3D73F, 0x2FE4B17170E59750,
+    0x11317BA87905E790, 0x7FBF21EC8A1F45EC, 0x1725CABFCB045B00, 0x964E915CD5E2B207,
+    0x3E2B8BCBF016D66D, 0xBE7444E39328A0AC, 0xF85B2B4FBCDE44B7, 0x49353FEA39BA63B1,
+    0x1DD01AAFCD53486A, 0x1FCA8A92FD719F85, 0xFC7C95D827357AFA, 0x18A6A990C8B35EBD,
+    0xCCCB7005C6B9C28D, 0x3BDBB92C43B17F26, 0xAA70B5B4F89695A2, 0xE94C39A54A98307F,
+    0xB7A0B174CFF6F36E, 0xD4DBA84729AF48AD, 0x2E18BC1AD9704A68, 0x2DE0966DAF2F8B1C,
+    0xB9C11D5B1E43A07E, 0x64972D68DEE33360, 0x94628D38D0C20584, 0xDBC0D2B6AB90A559,
+    0xD2733C4335C6A72F, 0x7E75D99D94A70F4D, 0x6CED1983376FA72B, 0x97FCAACBF030BC24,
+    0x7B77497B32503B12, 0x8547EDDFB81CCB94, 0x79999CDFF70902CB, 0xCFFE1939438E9B24,
+    0x829626E3892D95D7, 0x92FAE24291F2B3F1, 0x63E22C147B9C3403, 0xC678B6D860284A1C,
+    0x5873888850659AE7, 0x0981DCD296A8736D, 0x9F65789A6509A440, 0x9FF38FED72E9052F,
+    0xE479EE5B9930578C, 0xE7F28ECD2D49EECD, 0x56C074A581EA17FE, 0x5544F7D774B14AEF,
+    0x7B3F0195FC6F290F, 0x12153635B2C0CF57, 0x7F5126DBBA5E0CA7, 0x7A76956C3EAFB413,
+    0x3D5774A11D31AB39, 0x8A1B083821F40CB4, 0x7B4A38E32537DF62, 0x950113646D1D6E03,
+    0x4DA8979A0041E8A9, 0x3BC36E078F7515D7, 0x5D0A12F27AD310D1, 0x7F9D1A2E1EBE1327,
+    0xDA3A361B1C5157B1, 0xDCDD7D20903D0C25, 0x36833336D068F707, 0xCE68341F79893389,
+    0xAB9090168DD05F34, 0x43954B3252DC25E5, 0xB438C2B67F98E5E9, 0x10DCD78E3851A492,
+    0xDBC27AB5447822BF, 0x9B3CDB65F82CA382, 0xB67B7896167B4C84, 0xBFCED1B0048EAC50,
+    0xA9119B60369FFEBD, 0x1FFF7AC80904BF45, 0xAC12FB171817EEE7, 0xAF08DA9177DDA93D,
+    0x1B0CAB936E65C744, 0xB559EB1D04E5E932, 0xC37B45B3F8D6F2BA, 0xC3A9DC228CAAC9E9,
+    0xF3B8B6675A6507FF, 0x9FC477DE4ED681DA, 0x67378D8ECCEF96CB, 0x6DD856D94D259236,
+    0xA319CE15B0B4DB31, 0x073973751F12DD5E, 0x8A8E849EB32781A5, 0xE1925C71285279F5,
+    0x74C04BF1790C0EFE, 0x4DDA48153C94938A, 0x9D266D6A1CC0542C, 0x7440FB816508C4FE,
+    0x13328503DF48229F, 0xD6BF7BAEE43CAC40, 0x4838D65F6EF6748F, 0x1E152328F3318DEA,
+    0x8F8419A348F296BF, 0x72C8834A5957B511, 0xD7A023A73260B45C, 0x94EBC8ABCFB56DAE,
+    0x9FC10D0F989993E0, 0xDE68A2355B93CAE6, 0xA44CFE79AE538BBE, 0x9D1D84FCCE371425,
+    0x51D2B1AB2DDFB636, 0x2FD7E4B9E72CD38C, 0x65CA5B96B7552210, 0xDD69A0D8AB3B546D,
+    0x604D51B25FBF70E2, 0x73AA8A564FB7AC9E, 0x1A8C1E992B941148, 0xAAC40A2703D9BEA0,
+    0x764DBEAE7FA4F3A6, 0x1E99B96E70A9BE8B, 0x2C5E9DEB57EF4743, 0x3A938FEE32D29981,
+    0x26E6DB8FFDF5ADFE, 0x469356C504EC9F9D, 0xC8763C5B08D1908C, 0x3F6C6AF859D80055,
+    0x7F7CC39420A3A545, 0x9BFB227EBDF4C5CE, 0x89039D79D6FC5C5C, 0x8FE88B57305E2AB6,
+    0xA09E8C8C35AB96DE, 0xFA7E393983325753, 0xD6B6D0ECC617C699, 0xDFEA21EA9E7557E3,
+    0xB67C1FA481680AF8, 0xCA1E3785A9E724E5, 0x1CFC8BED0D681639, 0xD18D8549D140CAEA,
+    0x4ED0FE7E9DC91335, 0xE4DBF0634473F5D2, 0x1761F93A44D5AEFE, 0x53898E4C3910DA55,
+    0x734DE8181F6EC39A, 0x2680B122BAA28D97, 0x298AF231C85BAFAB, 0x7983EED3740847D5,
+    0x66C1A2A1A60CD889, 0x9E17E49642A3E4C1, 0xEDB454E7BADC0805, 0x50B704CAB602C329,
+    0x4CC317FB9CDDD023, 0x66B4835D9EAFEA22, 0x219B97E26FFC81BD, 0x261E4E4C0A333A9D,
+    0x1FE2CCA76517DB90, 0xD7504DFA8816EDBB, 0xB9571FA04DC089C8, 0x1DDC0325259B27DE,
+    0xCF3F4688801EB9AA, 0xF4F5D05C10CAB243, 0x38B6525C21A42B0E, 0x36F60E2BA4FA6800,
+    0xEB3593803173E0CE, 0x9C4CD6257C5A3603, 0xAF0C317D32ADAA8A, 0x258E5A80C7204C4B,
+    0x8B889D624D44885D, 0xF4D14597E660F855, 0xD4347F66EC8941C3, 0xE699ED85B0DFB40D,
+    0x2472F6207C2D0484, 0xC2A1E7B5B459AEB5, 0xAB4F6451CC1D45EC, 0x63767572AE3D6174,
+    0xA59E0BD101731A28, 0x116D0016CB948F09, 0x2CF9C8CA052F6E9F, 0x0B090A7560A968E3,
+    0xABEEDDB2DDE06FF1, 0x58EFC10B06A2068D, 0xC6E57A78FBD986E0, 0x2EAB8CA63CE802D7,
+    0x14A195640116F336, 0x7C0828DD624EC390, 0xD74BBE77E6116AC7, 0x804456AF10F5FB53,
+    0xEBE9EA2ADF4321C7, 0x03219A39EE587A30, 0x49787FEF17AF9924, 0xA1E9300CD8520548,
+    0x5B45E522E4B1B4EF, 0xB49C3B3995091A36, 0xD4490AD526F14431, 0x12A8F216AF9418C2,
+    0x001F837CC7350524, 0x1877B51E57A764D5, 0xA2853B80F17F58EE, 0x993E1DE72D36D310,
+    0xB3598080CE64A656, 0x252F59CF0D9F04BB, 0xD23C8E176D113600, 0x1BDA0492E7E4586E,
+    0x21E0BD5026C619BF, 0x3B097ADAF088F94E, 0x8D14DEDB30BE846E, 0xF95CFFA23AF5F6F4,
+    0x3871700761B3F743, 0xCA672B91E9E4FA16, 0x64C8E531BFF53B55, 0x241260ED4AD1E87D,
+    0x106C09B972D2E822, 0x7FBA195410E5CA30, 0x7884D9BC6CB569D8, 0x0647DFEDCD894A29,
+    0x63573FF03E224774, 0x4FC8E9560F91B123, 0x1DB956E450275779, 0xB8D91274B9E9D4FB,
+    0xA2EBEE47E2FBFCE1, 0xD9F1F30CCD97FB09, 0xEFED53D75FD64E6B, 0x2E6D02C36017F67F,
+    0xA9AA4D20DB084E9B, 0xB64BE8D8B25396C1, 0x70CB6AF7C2D5BCF0, 0x98F076A4F7A2322E,
+    0xBF84470805E69B5F, 0x94C3251F06F90CF3, 0x3E003E616A6591E9, 0xB925A6CD0421AFF3,
+    0x61BDD1307C66E300, 0xBF8D5108E27E0D48, 0x240AB57A8B888B20, 0xFC87614BAF287E07,
+    0xEF02CDD06FFDB432, 0xA1082C0466DF6C0A, 0x8215E577001332C8, 0xD39BB9C3A48DB6CF,
+    0x2738259634305C14, 0x61CF4F94C97DF93D, 0x1B6BACA2AE4E125B, 0x758F450C88572E0B,
+    0x959F587D507A8359, 0xB063E962E045F54D, 0x60E8ED72C0DFF5D1, 0x7B64978555326F9F,
+    0xFD080D236DA814BA, 0x8C90FD9B083F4558, 0x106F72FE81E2C590, 0x7976033A39F7D952,
+    0xA4EC0132764CA04B, 0x733EA705FAE4FA77, 0xB4D8F77BC3E56167, 0x9E21F4F903B33FD9,
+    0x9D765E419FB69F6D, 0xD30C088BA61EA5EF, 0x5D94337FBFAF7F5B, 0x1A4E4822EB4D7A59,
+    0x6FFE73E81B637FB3, 0xDDF957BC36D8B9CA, 0x64D0E29EEA8838B3, 0x08DD9BDFD96B9F63,
+    0x087E79E5A57D1D13, 0xE328E230E3E2B3FB, 0x1C2559E30F0946BE, 0x720BF5F26F4D2EAA,
+    0xB0774D261CC609DB, 0x443F64EC5A371195, 0x4112CF68649A260E, 0xD813F2FAB7F5C5CA,
+    0x660D3257380841EE, 0x59AC2C7873F910A3, 0xE846963877671A17, 0x93B633ABFA3469F8,
+    0xC0C0F5A60EF4CDCF, 0xCAF21ECD4377B28C, 0x57277707199B8175, 0x506C11B9D90E8B1D,
+    0xD83CC2687A19255F, 0x4A29C6465A314CD1, 0xED2DF21216235097, 0xB5635C95FF7296E2,
+    0x22AF003AB672E811, 0x52E762596BF68235, 0x9AEBA33AC6ECC6B0, 0x944F6DE09134DFB6,
+    0x6C47BEC883A7DE39, 0x6AD047C430A12104, 0xA5B1CFDBA0AB4067, 0x7C45D833AFF07862,
+    0x5092EF950A16DA0B, 0x9338E69C052B8E7B, 0x455A4B4CFE30E3F5, 0x6B02E63195AD0CF8,
+    0x6B17B224BAD6BF27, 0xD1E0CCD25BB9C169, 0xDE0C89A556B9AE70, 0x50065E535A213CF6,
+    0x9C1169FA2777B874, 0x78EDEFD694AF1EED, 0x6DC93D9526A50E68, 0xEE97F453F06791ED,
+    0x32AB0EDB696703D3, 0x3A6853C7E70757A7, 0x31865CED6120F37D, 0x67FEF95D92607890,
+    0x1F2B1D1F15F6DC9C, 0xB69E38A8965C6B65, 0xAA9119FF184CCCF4, 0xF43C732873F24C13,
+    0xFB4A3D794A9A80D2, 0x3550C2321FD6109C, 0x371F77E76BB8417E, 0x6BFA9AAE5EC05779,
+    0xCD04F3FF001A4778, 0xE3273522064480CA, 0x9F91508BFFCFC14A, 0x049A7F41061A9E60,
+    0xFCB6BE43A9F2FE9B, 0x08DE8A1C7797DA9B, 0x8F9887E6078735A1, 0xB5B4071DBFC73A66,
+    0x230E343DFBA08D33, 0x43ED7F5A0FAE657D, 0x3A88A0FBBCB05C63, 0x21874B8B4D2DBC4F,
+    0x1BDEA12E35F6A8C9, 0x53C065C6C8E63528, 0xE34A1D250E7A8D6B, 0xD6B04D3B7651DD7E,
+    0x5E90277E7CB39E2D, 0x2C046F22062DC67D, 0xB10BB459132D0A26, 0x3FA9DDFB67E2F199,
+    0x0E09B88E1914F7AF, 0x10E8B35AF3EEAB37, 0x9EEDECA8E272B933, 0xD4C718BC4AE8AE5F,
+    0x81536D601170FC20, 0x91B534F885818A06, 0xEC8177F83F900978, 0x190E714FADA5156E,
+    0xB592BF39B0364963, 0x89C350C893AE7DC1, 0xAC042E70F8B383F2, 0xB49B52E587A1EE60,
+    0xFB152FE3FF26DA89, 0x3E666E6F69AE2C15, 0x3B544EBE544C19F9, 0xE805A1E290CF2456,
+    0x24B33C9D7ED25117, 0xE74733427B72F0C1, 0x0A804D18B7097475, 0x57E3306D881EDB4F,
+    0x4AE7D6A36EB5DBCB, 0x2D8D5432157064C8, 0xD1E649DE1E7F268B, 0x8A328A1CEDFE552C,
+    0x07A3AEC79624C7DA, 0x84547DDC3E203C94, 0x990A98FD5071D263, 0x1A4FF12616EEFC89,
+    0xF6F7FD1431714200, 0x30C05B1BA332F41C, 0x8D2636B81555A786, 0x46C9FEB55D120902,
+    0xCCEC0A73B49C9921, 0x4E9D2827355FC492, 0x19EBB029435DCB0F, 0x4659D2B743848A2C,
+    0x963EF2C96B33BE31, 0x74F85198B05A2E7D, 0x5A0F544DD2B1FB18, 0x03727073C2E134B1,
+    0xC7F6AA2DE59AEA61, 0x352787BAA0D7C22F, 0x9853EAB63B5E0B35, 0xABBDCDD7ED5C0860,
+    0xCF05DAF5AC8D77B0, 0x49CAD48CEBF4A71E, 0x7A4C10EC2158C4A6, 0xD9E92AA246BF719E,
+    0x13AE978D09FE5557, 0x730499AF921549FF, 0x4E4B705B92903BA4, 0xFF577222C14F0A3A,
+    0x55B6344CF97AAFAE, 0xB862225B055B6960, 0xCAC09AFBDDD2CDB4, 0xDAF8E9829FE96B5F,
+    0xB5FDFC5D3132C498, 0x310CB380DB6F7503, 0xE87FBB46217A360E, 0x2102AE466EBB1148,
+    0xF8549E1A3AA5E00D, 0x07A69AFDCC42261A, 0xC4C118BFE78FEAAE, 0xF9F4892ED96BD438,
+    0x1AF3DBE25D8F45DA, 0xF5B4B0B0D2DEEEB4, 0x962ACEEFA82E1C84, 0x046E3ECAAF453CE9,
+    0xF05D129681949A4C, 0x964781CE734B3C84, 0x9C2ED44081CE5FBD, 0x522E23F3925E319E,
+    0x177E00F9FC32F791, 0x2BC60A63A6F3B3F2, 0x222BBFAE61725606, 0x486289DDCC3D6780,
+    0x7DC7785B8EFDFC80, 0x8AF38731C02BA980, 0x1FAB64EA29A2DDF7, 0xE4D9429322CD065A,
+    0x9DA058C67844F20C, 0x24C0E332B70019B0, 0x233003B5A6CFE6AD, 0xD586BD01C5C217F6,
+    0x5E5637885F29BC2B, 0x7EBA726D8C94094B, 0x0A56A5F0BFE39272, 0xD79476A84EE20D06,
+    0x9E4C1269BAA4BF37, 0x17EFEE45B0DEE640, 0x1D95B0A5FCF90BC6, 0x93CBE0B699C2585D,
+    0x65FA4F227A2B6D79, 0xD5F9E858292504D5, 0xC2B5A03F71471A6F, 0x59300222B4561E00,
+    0xCE2F8642CA0712DC, 0x7CA9723FBB2E8988, 0x2785338347F2BA08, 0xC61BB3A141E50E8C,
+    0x150F361DAB9DEC26, 0x9F6A419D382595F4, 0x64A53DC924FE7AC9, 0x142DE49FFF7A7C3D,
+    0x0C335248857FA9E7, 0x0A9C32D5EAE45305, 0xE6C42178C4BBB92E, 0x71F1CE2490D20B07,
+    0xF1BCC3D275AFE51A, 0xE728E8C83C334074, 0x96FBF83A12884624, 0x81A1549FD6573DA5,
+    0x5FA7867CAF35E149, 0x56986E2EF3ED091B, 0x917F1DD5F8886C61, 0xD20D8C88C8FFE65F,
+    0x31D71DCE64B2C310, 0xF165B587DF898190, 0xA57E6339DD2CF3A0, 0x1EF6E6DBB1961EC9,
+    0x70CC73D90BC26E24, 0xE21A6B35DF0C3AD7, 0x003A93D8B2806962, 0x1C99DED33CB890A1,
+    0xCF3145DE0ADD4289, 0xD0E4427A5514FB72, 0x77C621CC9FB3A483, 0x67A34DAC4356550B,
+    0xF8D626AAAF278509
+]
+
+
 SAN_REGEX = re.compile(r"^([NBKRQ])?([a-h])?([1-8])?[\-x]?([a-h][1-8])(=?[nbrqkNBRQK])?(\+|#)?\Z")
 
 FEN_CASTLING_REGEX = re.compile(r"^(?:-|[KQABCDEFGH]{0,2}[kqabcdefgh]{0,2})\Z")
 
+# Occupancy, turn, castling rights on the back ranks, en passant square (64
+# if none), half-move clock and full-move number. Clocks that do not fit are
+# marked with 0xffff in both fields and follow the header.
+_BYTES_HEADER = struct.Struct(">QBHBHH")
+_BYTES_CLOCKS = struct.Struct(">QQ")
+
+
+def _parse_board_fen(fen):
+    # Returns the masks of pawns, knights, bishops, rooks, queens, kings,
+    # promoted pieces, white pieces and black pieces of the position part of
+    # a FEN. The FEN is not validated.
+    masks = dict.fromkeys("PNBRQKpnbrqk", BB_VOID)
+    promoted = BB_VOID
+
+    square = A8
+    for c in fen:
+        if c in masks:
+            masks[c] |= BB_SQUARES[square]
+            square += 1
+        elif c == "/":
+            square -= 16
+        elif c == "~":
+            promoted |= BB_SQUARES[square - 1]
+        else:
+            square += int(c)
+
+    white = masks["P"] | masks["N"] | masks["B"] | masks["R"] | masks["Q"] | masks["K"]
+    black = masks["p"] | masks["n"] | masks["b"] | masks["r"] | masks["q"] | masks["k"]
+    return (masks["P"] | masks["p"], masks["N"] | masks["n"], masks["B"] | masks["b"],
+            masks["R"] | masks["r"], masks["Q"] | masks["q"], masks["K"] | masks["k"],
+            promoted, white, black)
+
+
+def _parse_san_pattern(san):
+    # Returns the piece type (None for pawns), the mask of possible source
+    # squares, the target square and the promotion piece type of a SAN
+    # string, or None if it does not look like a normal move.
+    match = SAN_REGEX.match(san)
+    if not match:
+        return None
+
+    # Get target square.
+    to_square = SQUARE_NAMES.index(match.group(4))
+
+    # Get the promotion type.
+    p = match.group(5)
+    promotion = p and PIECE_SYMBOLS.index(p[-1].lower())
+
+    # Get the piece type.
+    piece_type = match.group(1) and PIECE_SYMBOLS.index(match.group(1).lower())
+
+    # Filter by source file.
+    from_mask = BB_ALL
+    if match.group(2):
+        from_mask &= BB_FILES[FILE_NAMES.index(match.group(2))]
+
+    # Filter by source rank.
+    if match.group(3):
+        from_mask &= BB_RANKS[int(match.group(3)) - 1]
+
+    return piece_type, from_mask, to_square, promotion
+
+
+class Outcome(collections.namedtuple("Outcome", "termination winner")):
+    """
+    How a game ended: the reason (one of the ``TERMINATION_*`` constants,
+    like :data:`chess.TERMINATION_CHECKMATE`) and the winning color, or
+    ``None`` for a draw.
+    """
+    __slots__ = ()
+
+    def result(self):
+        """Gets the game result, ``1-0``, ``0-1`` or ``1/2-1/2``."""
+        if self.winner is None:
+            return "1/2-1/2"
+        return "1-0" if self.winner == WHITE else "0-1"
+
 
 class Piece(object):
     """A piece with type and color."""
 
+    __slots__ = ("piece_type", "color")
+
     def __init__(self, piece_type, color):
         self.piece_type = piece_type
         self.color = color
@@ -341,6 +687,9 @@ class Piece(object):
     def __hash__(self):
         return hash(self.piece_type * (self.color + 1))
 
+    def __reduce__(self):
+        return type(self), (self.piece_type, self.color)
+
     def __repr__(self):
         return "Piece.from_symbol('{0}')".format(self.symbol())
 
@@ -385,8 +734,14 @@ class Move(object):
     piece type.
 
     Drops and null moves are supported.
+
+    Moves returned by move generators and :func:`~chess.Move.from_uci()` are
+    shared, read-only instances. Use :func:`copy.copy()` to get a move that
+    can be modified.
     """
 
+    __slots__ = ("from_square", "to_square", "promotion", "drop")
+
     def __init__(self, from_square, to_square, promotion=None, drop=None):
         self.from_square = from_square
         self.to_square = to_square
@@ -411,6 +766,17 @@ class Move(object):
         else:
             return "0000"
 
+    def packed(self):
+        """
+        Gets the move packed into a 16 bit integer.
+
+        Bits 0 to 5 hold the target square, bits 6 to 11 the source square
+        and bits 12 to 14 the promotion piece type. Drops have equal source
+        and target squares and the dropped piece type in bits 12 to 14.
+        The null move is ``0``.
+        """
+        return self.from_square << 6 | self.to_square | (self.promotion or self.drop or 0) << 12
+
     def __bool__(self):
         return bool(self.from_square or self.to_square or self.promotion or self.drop)
 
@@ -447,6 +813,11 @@ class Move(object):
     def __copy__(self):
         return type(self)(self.from_square, self.to_square, self.promotion, self.drop)
 
+    def __reduce__(self):
+        if type(self) is Move:
+            return _unpickle_move, (self.packed(), )
+        return type(self), (self.from_square, self.to_square, self.promotion, self.drop)
+
     def __deepcopy__(self, memo):
         move = self.__copy__()
         memo[id(self)] = move
@@ -459,20 +830,38 @@ class Move(object):
 
         :raises: :exc:`ValueError` if the UCI string is invalid.
         """
+        make = _interned_move if cls is Move else cls
+
         if uci == "0000":
             return cls.null()
         elif len(uci) == 4 and "@" == uci[1]:
             drop = PIECE_SYMBOLS.index(uci[0].lower())
             square = SQUARE_NAMES.index(uci[2:])
-            return cls(square, square, drop=drop)
+            return make(square, square, drop=drop)
         elif len(uci) == 4:
-            return cls(SQUARE_NAMES.index(uci[0:2]), SQUARE_NAMES.index(uci[2:4]))
+            return make(SQUARE_NAMES.index(uci[0:2]), SQUARE_NAMES.index(uci[2:4]))
         elif len(uci) == 5:
             promotion = PIECE_SYMBOLS.index(uci[4])
-            return cls(SQUARE_NAMES.index(uci[0:2]), SQUARE_NAMES.index(uci[2:4]), promotion=promotion)
+            return make(SQUARE_NAMES.index(uci[0:2]), SQUARE_NAMES.index(uci[2:4]), promotion=promotion)
         else:
             raise ValueError("expected uci string to be of length 4 or 5: {0}".format(repr(uci)))
 
+    @classmethod
+    def from_packed(cls, packed):
+        """
+        Unpacks a move from a 16 bit integer. See :func:`~chess.Move.packed()`.
+        """
+        make = _interned_move if cls is Move else cls
+
+        from_square = packed >> 6 & 0x3f
+        to_square = packed & 0x3f
+        piece_type = packed >> 12 & 0x7 or None
+
+        if piece_type and from_square == to_square:
+            return make(from_square, to_square, drop=piece_type)
+        else:
+            return make(from_square, to_square, piece_type)
+
     @classmethod
     def null(cls):
         """
@@ -490,6 +879,55 @@ class Move(object):
         return cls(0, 0)
 
 
+class _InternedMove(Move):
+    """A shared, read-only move from the interned move table."""
+
+    __slots__ = ()
+
+    def __init__(self, from_square, to_square, promotion=None, drop=None):
+        object.__setattr__(self, "from_square", from_square)
+        object.__setattr__(self, "to_square", to_square)
+        object.__setattr__(self, "promotion", promotion)
+        object.__setattr__(self, "drop", drop)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("interned moves are read-only, use copy.copy() to get a modifiable move")
+
+    def __delattr__(self, name):
+        raise AttributeError("interned moves are read-only, use copy.copy() to get a modifiable move")
+
+    def __copy__(self):
+        return Move(self.from_square, self.to_square, self.promotion, self.drop)
+
+    def __reduce__(self):
+        return _unpickle_interned_move, (self.packed(), )
+
+
+_INTERNED_MOVES = [[_InternedMove(from_square, to_square) for to_square in SQUARES] for from_square in SQUARES]
+
+_INTERNED_SPECIAL_MOVES = {}
+
+
+def _unpickle_move(packed):
+    return copy.copy(Move.from_packed(packed))
+
+
+def _unpickle_interned_move(packed):
+    return Move.from_packed(packed)
+
+
+def _interned_move(from_square, to_square, promotion=None, drop=None):
+    if promotion is None and drop is None:
+        return _INTERNED_MOVES[from_square][to_square]
+
+    key = from_square, to_square, promotion, drop
+    try:
+        return _INTERNED_SPECIAL_MOVES[key]
+    except KeyError:
+        move = _INTERNED_SPECIAL_MOVES[key] = _InternedMove(from_square, to_square, promotion, drop)
+        return move
+
+
 class BaseBoard(object):
     """
     A board representing the position of chess pieces. See
@@ -745,20 +1183,10 @@ class BaseBoard(object):
             if field_sum != 8:
                 raise ValueError("expected 8 columns per row in position part of fen: {0}".format(repr(fen)))
 
-        # Clear the board.
-        self._clear_board()
-
         # Put pieces on the board.
-        square_index = 0
-        for c in fen:
-            if c in ["1", "2", "3", "4", "5", "6", "7", "8"]:
-                square_index += int(c)
-            elif c.lower() in ["p", "n", "b", "r", "q", "k"]:
-                piece = Piece.from_symbol(c)
-                self._set_piece_at(SQUARES_180[square_index], piece.piece_type, piece.color)
-                square_index += 1
-            elif c == "~":
-                self.promoted |= BB_SQUARES[SQUARES_180[square_index - 1]]
+        (self.pawns, self.knights, self.bishops, self.rooks, self.queens, self.kings,
+         self.promoted, self.occupied_co[WHITE], self.occupied_co[BLACK]) = _parse_board_fen(fen)
+        self.occupied = self.occupied_co[WHITE] | self.occupied_co[BLACK]
 
     def set_board_fen(self, fen):
         """
@@ -1114,8 +1542,18 @@ class BaseBoard(object):
 
 
 class _BoardState(object):
-
-    def __init__(self, board):
+    # The state before a move, the move and the record of the previous move.
+    # Records are never modified, so the history they form can be shared by
+    # copies of a board.
+
+    __slots__ = ("pawns", "knights", "bishops", "rooks", "queens", "kings",
+                 "occupied_w", "occupied_b", "promoted",
+                 "turn", "castling_rights", "ep_square",
+                 "halfmove_clock", "fullmove_number",
+                 "variant_state", "zobrist_board", "check_info",
+                 "move", "previous", "length")
+
+    def __init__(self, board, move, previous):
         self.pawns = board.pawns
         self.knights = board.knights
         self.bishops = board.bishops
@@ -1125,7 +1563,6 @@ class _BoardState(object):
 
         self.occupied_w = board.occupied_co[WHITE]
         self.occupied_b = board.occupied_co[BLACK]
-        self.occupied = board.occupied
 
         self.promoted = board.promoted
 
@@ -1135,6 +1572,44 @@ class _BoardState(object):
         self.halfmove_clock = board.halfmove_clock
         self.fullmove_number = board.fullmove_number
 
+        self.variant_state = board._variant_state()
+        self.zobrist_board = board._zobrist_board
+        self.check_info = board._check_info
+
+        self.move = move
+        self.previous = previous
+        self.length = previous.length + 1 if previous else 1
+
+    def restore(self, board):
+        board.pawns = self.pawns
+        board.knights = self.knights
+        board.bishops = self.bishops
+        board.rooks = self.rooks
+        board.queens = self.queens
+        board.kings = self.kings
+
+        board.occupied_co[WHITE] = self.occupied_w
+        board.occupied_co[BLACK] = self.occupied_b
+        board.occupied = self.occupied_w | self.occupied_b
+
+        board.promoted = self.promoted
+
+        board.turn = self.turn
+        board.castling_rights = self.castling_rights
+        board.ep_square = self.ep_square
+        board.halfmove_clock = self.halfmove_clock
+        board.fullmove_number = self.fullmove_number
+
+        board._zobrist_board = self.zobrist_board
+        board._check_info = self.check_info
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
 
 class Board(BaseBoard):
     """
@@ -1157,6 +1632,11 @@ class Board(BaseBoard):
     It's safe to set :data:`~Board.turn`, :data:`~Board.castling_rights`,
     :data:`~Board.ep_square`, :data:`~Board.halfmove_clock` and
     :data:`~Board.fullmove_number` directly.
+
+    Boards are pickled as the :func:`binary encoding <chess.Board.to_bytes()>`
+    of the position before the first move and the packed moves of the move
+    stack, which are replayed when unpickling. Pickle
+    ``board.copy(stack=False)`` to leave out the move stack.
     """
 
     aliases = ["Standard", "Chess", "Classical", "Normal"]
@@ -1173,6 +1653,12 @@ class Board(BaseBoard):
     one_king = True
     captures_compulsory = False
 
+    # The fifty-move and seventy-five-move rules apply. Variants without
+    # these rules set this to False rather than overriding
+    # is_seventyfive_moves() and can_claim_fifty_moves(), so that outcome()
+    # can decide them without generating legal moves again.
+    _halfmove_clock_draws = True
+
     def __init__(self, fen=STARTING_FEN, chess960=False):
         BaseBoard.__init__(self, None)
 
@@ -1181,8 +1667,13 @@ class Board(BaseBoard):
         self.pseudo_legal_moves = PseudoLegalMoveGenerator(self)
         self.legal_moves = LegalMoveGenerator(self)
 
-        self.move_stack = []
-        self.stack = []
+        self._history = None
+        self._move_stack = None
+
+        self._zobrist_board = None
+        self._check_info = None
+        self._attack_maps = None
+        self._outcome = None
 
         if fen is None:
             self.clear()
@@ -1229,8 +1720,15 @@ class Board(BaseBoard):
 
     def clear_stack(self):
         """Clears the move stack."""
-        del self.move_stack[:]
-        del self.stack[:]
+        self._history = None
+        if self._move_stack is not None:
+            del self._move_stack[:]
+
+        # The position may have been set up from scratch.
+        self._zobrist_board = None
+        self._check_info = None
+        self._attack_maps = None
+        self._outcome = None
 
     def remove_piece_at(self, square):
         piece = super(Board, self).remove_piece_at(square)
@@ -1249,7 +1747,7 @@ class Board(BaseBoard):
         for from_square in scan_reversed(non_pawns):
             moves = self.attacks_mask(from_square) & ~our_pieces & to_mask
             for to_square in scan_reversed(moves):
-                yield Move(from_square, to_square)
+                yield _INTERNED_MOVES[from_square][to_square]
 
         # Generate castling moves.
         if from_mask & self.kings:
@@ -1270,12 +1768,12 @@ class Board(BaseBoard):
 
             for to_square in scan_reversed(targets):
                 if square_rank(to_square) in [0, 7]:
-                    yield Move(from_square, to_square, QUEEN)
-                    yield Move(from_square, to_square, ROOK)
-                    yield Move(from_square, to_square, BISHOP)
-                    yield Move(from_square, to_square, KNIGHT)
+                    yield _interned_move(from_square, to_square, QUEEN)
+                    yield _interned_move(from_square, to_square, ROOK)
+                    yield _interned_move(from_square, to_square, BISHOP)
+                    yield _interned_move(from_square, to_square, KNIGHT)
                 else:
-                    yield Move(from_square, to_square)
+                    yield _INTERNED_MOVES[from_square][to_square]
 
         # Prepare pawn advance generation.
         if self.turn == WHITE:
@@ -1293,17 +1791,17 @@ class Board(BaseBoard):
             from_square = to_square + (8 if self.turn == BLACK else -8)
 
             if square_rank(to_square) in [0, 7]:
-                yield Move(from_square, to_square, QUEEN)
-                yield Move(from_square, to_square, ROOK)
-                yield Move(from_square, to_square, BISHOP)
-                yield Move(from_square, to_square, KNIGHT)
+                yield _interned_move(from_square, to_square, QUEEN)
+                yield _interned_move(from_square, to_square, ROOK)
+                yield _interned_move(from_square, to_square, BISHOP)
+                yield _interned_move(from_square, to_square, KNIGHT)
             else:
-                yield Move(from_square, to_square)
+                yield _INTERNED_MOVES[from_square][to_square]
 
         # Generate double pawn moves.
         for to_square in scan_reversed(double_moves):
             from_square = to_square + (16 if self.turn == BLACK else -16)
-            yield Move(from_square, to_square)
+            yield _INTERNED_MOVES[from_square][to_square]
 
         # Generate en passant captures.
         if self.ep_square:
@@ -1323,7 +1821,7 @@ class Board(BaseBoard):
             BB_RANKS[4 if self.turn else 3])
 
         for capturer in scan_reversed(capturers):
-            yield Move(capturer, self.ep_square)
+            yield _INTERNED_MOVES[capturer][self.ep_square]
 
     def generate_pseudo_legal_captures(self, from_mask=BB_ALL, to_mask=BB_ALL):
         return itertools.chain(
@@ -1370,6 +1868,207 @@ class Board(BaseBoard):
         """
         return SquareSet(self.attackers_mask(color, square))
 
+    def attacked_mask(self, color):
+        """
+        Gets a mask of all squares attacked by the given side, computed in a
+        single pass over its pieces and cached until the next move is made
+        or taken back.
+
+        Pinned pieces still count as attackers.
+        """
+        return self._get_attack_maps(color)[0]
+
+    def attacked(self, color):
+        """
+        Gets a set of all squares attacked by the given side.
+
+        Returns a :class:`set of squares <chess.SquareSet>`.
+        """
+        return SquareSet(self.attacked_mask(color))
+
+    def attack_counts(self, color):
+        """
+        Gets the number of pieces of the given side attacking each square, as
+        a tuple indexed by square. Like
+        :func:`~chess.Board.attacked_mask()` it is cached.
+
+        Pinned pieces still count as attackers. Pieces that attack a square
+        only through other pieces are not counted.
+        """
+        maps = self._get_attack_maps(color)
+        if maps[1] is None:
+            maps[1] = self._attack_counts(color)
+        return maps[1]
+
+    def _get_attack_maps(self, color):
+        # Attacked mask and (lazily) attack counts for each color. Reset when
+        # pieces move.
+        attack_maps = self._attack_maps
+        if attack_maps is None:
+            attack_maps = self._attack_maps = [None, None]
+
+        maps = attack_maps[color]
+        if maps is None:
+            maps = attack_maps[color] = [self._attacked_mask(color), None]
+        return maps
+
+    def _attacked_mask(self, color):
+        ours = self.occupied_co[color]
+        occupied = self.occupied
+
+        attacked = pawn_attacks(color, self.pawns & ours)
+
+        for square in scan_reversed(self.knights & ours):
+            attacked |= BB_KNIGHT_ATTACKS[square]
+        for square in scan_reversed(self.kings & ours):
+            attacked |= BB_KING_ATTACKS[square]
+        for square in scan_reversed((self.bishops | self.queens) & ours):
+            attacked |= BB_DIAG_ATTACKS[square][BB_DIAG_MASKS[square] & occupied]
+        for square in scan_reversed((self.rooks | self.queens) & ours):
+            attacked |= (BB_RANK_ATTACKS[square][BB_RANK_MASKS[square] & occupied] |
+                         BB_FILE_ATTACKS[square][BB_FILE_MASKS[square] & occupied])
+
+        return attacked
+
+    def _attack_counts(self, color):
+        ours = self.occupied_co[color]
+
+        # Each of the two pawn capture directions attacks a square at most
+        # once.
+        pawns = self.pawns & ours
+        if color == WHITE:
+            attack_masks = [shift_up_left(pawns), shift_up_right(pawns)]
+        else:
+            attack_masks = [shift_down_left(pawns), shift_down_right(pawns)]
+
+        for square in scan_reversed(ours & ~self.pawns):
+            attack_masks.append(self.attacks_mask(square))
+
+        counts = [0] * 64
+        for attacks in attack_masks:
+            for square in scan_reversed(attacks):
+                counts[square] += 1
+        return tuple(counts)
+
+    def see(self, move):
+        """
+        Statically evaluates the exchange on the target square of the given
+        move, in centipawns (see :data:`chess.SEE_PIECE_VALUES`) from the point
+        of view of the side to move. The move must be legal.
+
+        After the move, both sides alternately recapture with their least
+        valuable attacker (including pieces that are uncovered behind other
+        attackers) and may stop whenever continuing would lose material.
+        Pins are ignored, but a king only recaptures if the square is not
+        defended anymore.
+
+        The board is not modified.
+
+        >>> import chess
+        >>>
+        >>> board = chess.Board("1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1")
+        >>> board.see(chess.Move.from_uci("e1e5"))
+        100
+        """
+        return self._see(move, None)
+
+    def see_ge(self, move, threshold=0):
+        """
+        Checks if the static exchange evaluation of the given move (see
+        :func:`~chess.Board.see()`) is at least *threshold*.
+
+        Cheaper than :func:`~chess.Board.see()`, because the exchange is not
+        played out when the outcome is clear from the first captures.
+        """
+        return self._see(move, threshold)
+
+    def _see(self, move, threshold):
+        if not move or self.is_castling(move):
+            return 0 if threshold is None else 0 >= threshold
+
+        to_square = move.to_square
+        to_bb = BB_SQUARES[to_square]
+        occupied = self.occupied
+
+        if move.drop:
+            piece_type = move.drop
+            captured = 0
+        else:
+            occupied &= ~BB_SQUARES[move.from_square]
+            piece_type = self.piece_type_at(move.from_square)
+            if self.is_en_passant(move):
+                captured = SEE_PIECE_VALUES[PAWN]
+                occupied &= ~BB_SQUARES[self.ep_square + (-8 if self.turn == WHITE else 8)]
+            else:
+                captured = SEE_PIECE_VALUES[self.piece_type_at(to_square) or 0] if self.occupied_co[not self.turn] & to_bb else 0
+
+        if move.promotion:
+            captured += SEE_PIECE_VALUES[move.promotion] - SEE_PIECE_VALUES[PAWN]
+            piece_type = move.promotion
+
+        on_square = SEE_PIECE_VALUES[piece_type]
+        promotes = bool(to_bb & BB_BACKRANKS)
+
+        if threshold is not None:
+            # The opponent can decline to recapture.
+            if captured < threshold:
+                return False
+
+            # Even losing the moved piece is good enough, unless a pawn could
+            # recapture with promotion.
+            if not promotes and captured - on_square >= threshold:
+                return True
+
+        queens_and_bishops = self.queens | self.bishops
+        queens_and_rooks = self.queens | self.rooks
+        attackers = (self._attackers_mask(WHITE, to_square, occupied) |
+                     self._attackers_mask(BLACK, to_square, occupied)) & occupied
+
+        gain = [captured]
+        color = not self.turn
+
+        while True:
+            # Find the least valuable attacker.
+            side_attackers = attackers & self.occupied_co[color]
+            if not side_attackers:
+                break
+
+            for attacker_type in PIECE_TYPES:
+                bb = side_attackers & self.pieces_mask(attacker_type, color)
+                if bb:
+                    break
+
+            square = lsb(bb)
+            bb = BB_SQUARES[square]
+            attackers &= ~bb
+
+            if attacker_type == KING and attackers & self.occupied_co[not color]:
+                break
+
+            value = on_square
+            on_square = SEE_PIECE_VALUES[attacker_type]
+            if attacker_type == PAWN and promotes:
+                value += SEE_PIECE_VALUES[QUEEN] - SEE_PIECE_VALUES[PAWN]
+                on_square = SEE_PIECE_VALUES[QUEEN]
+            gain.append(value - gain[-1])
+
+            # Add sliders uncovered behind the capturing piece.
+            occupied &= ~bb
+            ray = BB_RAYS[to_square][square]
+            if ray:
+                attackers |= ray & occupied & (
+                    (BB_DIAG_ATTACKS[to_square][BB_DIAG_MASKS[to_square] & occupied] & queens_and_bishops) |
+                    (BB_RANK_ATTACKS[to_square][BB_RANK_MASKS[to_square] & occupied] & queens_and_rooks) |
+                    (BB_FILE_ATTACKS[to_square][BB_FILE_MASKS[to_square] & occupied] & queens_and_rooks))
+
+            color = not color
+
+        # Each side only continues the exchange if that does not lose material.
+        for i in range(len(gain) - 1, 0, -1):
+            gain[i - 1] = -max(-gain[i - 1], gain[i])
+
+        return gain[0] if threshold is None else gain[0] >= threshold
+
     def attacks_mask(self, square):
         bb_square = BB_SQUARES[square]
 
@@ -1460,25 +2159,99 @@ class Board(BaseBoard):
 
     def is_check(self):
         """Returns if the current side to move is in check."""
-        king = self.king(self.turn)
-        return king is not None and self.is_attacked_by(not self.turn, king)
+        return bool(self._get_check_info()[3])
+
+    def gives_check(self, move):
+        """
+        Probes if the given move would put the opponent in check. The move
+        must be at least pseudo legal.
+
+        The board is not modified.
+        """
+        them = self.occupied_co[not self.turn]
+
+        if not move:
+            king = self.king(not self.turn)
+            return king is not None and self.is_attacked_by(self.turn, king)
+
+        move = self._to_chess960(move)
+        to_bb = BB_SQUARES[move.to_square]
+
+        # The king of the opponent, unless it is captured.
+        king_mask = them & self.kings & ~self.promoted & ~to_bb
+        if not king_mask:
+            return False
+        king = msb(king_mask)
+
+        # Our pieces after the move.
+        ours = self.occupied_co[self.turn]
+        if move.drop:
+            from_bb = BB_VOID
+            piece_type = move.drop
+        else:
+            from_bb = BB_SQUARES[move.from_square]
+            piece_type = move.promotion or self.piece_type_at(move.from_square)
+            ours &= ~from_bb
+
+        pawns = self.pawns & ours
+        knights = self.knights & ours
+        bishops = self.bishops & ours
+        rooks = self.rooks & ours
+        queens = self.queens & ours
+        kings = self.kings & ours
+        occupied = self.occupied & ~from_bb | to_bb
+
+        if piece_type == KING and ours & to_bb:
+            # Castling.
+            backrank = BB_RANK_1 if self.turn == WHITE else BB_RANK_8
+            if square_file(move.to_square) < square_file(move.from_square):
+                king_to, rook_to = BB_FILE_C & backrank, BB_FILE_D & backrank
+            else:
+                king_to, rook_to = BB_FILE_G & backrank, BB_FILE_F & backrank
+
+            rooks = rooks & ~to_bb | rook_to
+            kings |= king_to
+            occupied = occupied & ~to_bb | king_to | rook_to
+        elif piece_type == PAWN:
+            pawns |= to_bb
+
+            # Remove pawns captured en passant.
+            if move.to_square == self.ep_square and not self.occupied & to_bb and abs(move.to_square - move.from_square) in [7, 9]:
+                occupied &= ~BB_SQUARES[self.ep_square + (-8 if self.turn == WHITE else 8)]
+        elif piece_type == KNIGHT:
+            knights |= to_bb
+        elif piece_type == BISHOP:
+            bishops |= to_bb
+        elif piece_type == ROOK:
+            rooks |= to_bb
+        elif piece_type == QUEEN:
+            queens |= to_bb
+        elif piece_type == KING:
+            kings |= to_bb
+
+        return bool(
+            (BB_PAWN_ATTACKS[not self.turn][king] & pawns) |
+            (BB_KNIGHT_ATTACKS[king] & knights) |
+            (BB_KING_ATTACKS[king] & kings) |
+            (BB_DIAG_ATTACKS[king][BB_DIAG_MASKS[king] & occupied] & (bishops | queens)) |
+            (BB_RANK_ATTACKS[king][BB_RANK_MASKS[king] & occupied] & (rooks | queens)) |
+            (BB_FILE_ATTACKS[king][BB_FILE_MASKS[king] & occupied] & (rooks | queens)))
 
     def is_into_check(self, move):
         """
         Checks if the given move would leave the king in check or put it into
         check. The move must be at least pseudo legal.
         """
-        king = self.king(self.turn)
+        _, king, blockers, checkers = self._get_check_info()
         if king is None:
             return False
 
-        checkers = self.attackers_mask(not self.turn, king)
         if checkers:
             # If already in check, look if it is an evasion.
             if move not in self._generate_evasions(king, checkers, BB_SQUARES[move.from_square], BB_SQUARES[move.to_square]):
                 return True
 
-        return not self._is_safe(king, self._slider_blockers(king), move)
+        return not self._is_safe(king, blockers, move)
 
     def was_into_check(self):
         """
@@ -1566,6 +2339,69 @@ class Board(BaseBoard):
         """
         return False
 
+    def outcome(self, claim_draw=False):
+        """
+        Checks if the game is over and how it ended.
+
+        Returns an :class:`~chess.Outcome` for
+        :func:`checkmate <chess.Board.is_checkmate()>`,
+        :func:`stalemate <chess.Board.is_stalemate()>`,
+        :func:`insufficient material <chess.Board.is_insufficient_material()>`,
+        the :func:`seventyfive-move rule <chess.Board.is_seventyfive_moves()>`,
+        :func:`fivefold repetition <chess.Board.is_fivefold_repetition()>`
+        or a :func:`variant end condition <chess.Board.is_variant_end()>`,
+        and ``None`` if the game is not over.
+
+        Draws by :func:`threefold repetition <chess.Board.can_claim_threefold_repetition()>`
+        or the :func:`fifty-move rule <chess.Board.can_claim_fifty_moves()>`
+        are only considered if *claim_draw* is given.
+
+        Legal moves are generated at most once, and the outcome is cached
+        until the position changes.
+        """
+        key = self.turn, self.castling_rights, self.ep_square, self.halfmove_clock, self._variant_state(), claim_draw
+        cached = self._outcome
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        outcome = self._compute_outcome(claim_draw)
+        self._outcome = key, outcome
+        return outcome
+
+    def _compute_outcome(self, claim_draw):
+        # Variant support.
+        if self.is_variant_loss():
+            return Outcome(TERMINATION_VARIANT_LOSS, not self.turn)
+        if self.is_variant_win():
+            return Outcome(TERMINATION_VARIANT_WIN, self.turn)
+        if self.is_variant_draw():
+            return Outcome(TERMINATION_VARIANT_DRAW, None)
+
+        # Checkmate and stalemate.
+        has_legal_moves = any(self.generate_legal_moves())
+        if not has_legal_moves and self.is_check():
+            return Outcome(TERMINATION_CHECKMATE, not self.turn)
+        if self.is_insufficient_material():
+            return Outcome(TERMINATION_INSUFFICIENT_MATERIAL, None)
+        if not has_legal_moves:
+            return Outcome(TERMINATION_STALEMATE, None)
+
+        # Automatic draws. The side to move is known to have legal moves, so
+        # the halfmove clock decides is_seventyfive_moves().
+        if self.halfmove_clock >= 150 and self._halfmove_clock_draws:
+            return Outcome(TERMINATION_SEVENTYFIVE_MOVES, None)
+        if self.is_fivefold_repetition():
+            return Outcome(TERMINATION_FIVEFOLD_REPETITION, None)
+
+        # Claimable draws.
+        if claim_draw:
+            if self.halfmove_clock >= 100 and self._halfmove_clock_draws:
+                return Outcome(TERMINATION_FIFTY_MOVES, None)
+            if self.can_claim_threefold_repetition():
+                return Outcome(TERMINATION_THREEFOLD_REPETITION, None)
+
+        return None
+
     def is_game_over(self, claim_draw=False):
         """
         Checks if the game is over due to
@@ -1580,28 +2416,10 @@ class Board(BaseBoard):
         :func:`threefold repetition <chess.Board.can_claim_threefold_repetition()>`
         or the :func:`fifty-move rule <chess.Board.can_claim_fifty_moves()>`,
         unless *claim_draw* is given.
-        """
-        # Seventyfive-move rule.
-        if self.is_seventyfive_moves():
-            return True
-
-        # Insufficient material.
-        if self.is_insufficient_material():
-            return True
-
-        # Stalemate or checkmate.
-        if not any(self.generate_legal_moves()):
-            return True
 
-        # Fivefold repetition.
-        if self.is_fivefold_repetition():
-            return True
-
-        # Claim draw.
-        if claim_draw and self.can_claim_draw():
-            return True
-
-        return False
+        See :func:`~chess.Board.outcome()` to also get the reason.
+        """
+        return self.outcome(claim_draw) is not None
 
     def result(self, claim_draw=False):
         """
@@ -1611,43 +2429,15 @@ class Board(BaseBoard):
         :func:`game is over <chess.Board.is_game_over()>`. Otherwise, the
         result is undetermined: ``*``.
         """
-        # Chess variant support.
-        if self.is_variant_loss():
-            return "0-1" if self.turn == WHITE else "1-0"
-        elif self.is_variant_win():
-            return "1-0" if self.turn == WHITE else "0-1"
-        elif self.is_variant_draw():
-            return "1/2-1/2"
-
-        # Checkmate.
-        if self.is_checkmate():
-            return "0-1" if self.turn == WHITE else "1-0"
-
-        # Draw claimed.
-        if claim_draw and self.can_claim_draw():
-            return "1/2-1/2"
-
-        # Seventyfive-move rule or fivefold repetition.
-        if self.is_seventyfive_moves() or self.is_fivefold_repetition():
-            return "1/2-1/2"
-
-        # Insufficient material.
-        if self.is_insufficient_material():
-            return "1/2-1/2"
-
-        # Stalemate.
-        if not any(self.generate_legal_moves()):
-            return "1/2-1/2"
-
-        # Undetermined.
-        return "*"
+        outcome = self.outcome(claim_draw)
+        return outcome.result() if outcome else "*"
 
     def is_checkmate(self):
         """Checks if the current position is a checkmate."""
         if not self.is_check():
             return False
 
-        return not any(self.generate_legal_moves())
+        return not self._count_legal_moves()
 
     def is_stalemate(self):
         """Checks if the current position is a stalemate."""
@@ -1688,7 +2478,7 @@ class Board(BaseBoard):
         or pawn move is equal to or grather than 150. Other means to end a game
         take precedence.
         """
-        if self.halfmove_clock >= 150:
+        if self.halfmove_clock >= 150 and self._halfmove_clock_draws:
             if any(self.generate_legal_moves()):
                 return True
 
@@ -1700,29 +2490,14 @@ class Board(BaseBoard):
         a claim by one of the players) if a position occurs for the fifth time
         on consecutive alternating moves.
         """
-        transposition_key = self._transposition_key()
-
-        if len(self.move_stack) < 16:
+        if self._stack_length() < 16:
             return False
 
-        switchyard = collections.deque()
-
-        for _ in range(4):
-            # Go back two full moves each.
-            for _ in range(4):
-                switchyard.append(self.pop())
-
-            # Check if the position was the same as before.
-            if self._transposition_key() != transposition_key:
-                while switchyard:
-                    self.push(switchyard.pop())
-
-                return False
-
-        while switchyard:
-            self.push(switchyard.pop())
-
-        return True
+        # Compare with the positions two, four, six and eight full moves ago.
+        key = self._repetition_key()
+        ep_square = self._legal_ep_square()
+        states = self._states(16)
+        return all(self._is_transposition(key, ep_square, states[-plies]) for plies in (4, 8, 12, 16))
 
     def can_claim_draw(self):
         """
@@ -1738,7 +2513,7 @@ class Board(BaseBoard):
         and the side to move still has a legal move they can make.
         """
         # Fifty-move rule.
-        if self.halfmove_clock >= 100:
+        if self.halfmove_clock >= 100 and self._halfmove_clock_draws:
             if any(self.generate_legal_moves()):
                 return True
 
@@ -1749,41 +2524,59 @@ class Board(BaseBoard):
         Draw by threefold repetition can be claimed if the position on the
         board occured for the third time or if such a repetition is reached
         with one of the possible legal moves.
-        """
-        transposition_key = self._transposition_key()
-        transpositions = collections.Counter()
-        transpositions.update((transposition_key, ))
-
-        # Count positions.
-        switchyard = collections.deque()
-        while self.move_stack:
-            move = self.pop()
-            switchyard.append(move)
-
-            if self.is_irreversible(move):
-                break
 
-            transpositions.update((self._transposition_key(), ))
+        Positions are compared with the records in the move stack rather than
+        with a history of Zobrist hashes, which would have to be updated on
+        every move. Candidate moves that reach a position twice seen before
+        are still made and unmade.
+        """
+        key = self._repetition_key()
+        ep_square = self._legal_ep_square()
 
-        while switchyard:
-            self.push(switchyard.pop())
+        # Count positions since the last irreversible move.
+        states = self._reversible_states()
+        repetitions = 1
+        for state in states:
+            if self._is_transposition(key, ep_square, state):
+                repetitions += 1
 
         # Threefold repetition occured.
-        if transpositions[transposition_key] >= 3:
+        if repetitions >= 3:
             return True
 
-        # The next legal move is a threefold repetition.
-        for move in self.generate_legal_moves():
-            self.push(move)
-
-            if transpositions[self._transposition_key()] >= 2:
+        # The next legal move is a threefold repetition. Only positions that
+        # occured twice qualify. Moves reaching them must change our pieces
+        # on the squares where the positions differ.
+        keyed = [(self._state_key(state), state) for state in states if state.turn != self.turn]
+        transpositions = collections.Counter(key for key, _ in keyed)
+        candidates = dict((key, state) for key, state in keyed if transpositions[key] >= 2)
+
+        for state in candidates.values():
+            ours = state.occupied_w if self.turn == WHITE else state.occupied_b
+            changed = ours ^ self.occupied_co[self.turn]
+
+            for move in self.generate_legal_moves(changed, changed):
+                self.push(move)
+                key = self._repetition_key()
+                ep_square = self._legal_ep_square()
+                repetitions = sum(1 for other in states if self._is_transposition(key, ep_square, other))
                 self.pop()
-                return True
 
-            self.pop()
+                if repetitions >= 2:
+                    return True
 
         return False
 
+    def _repetition_window(self):
+        # Positions before the last capture or pawn move can not repeat.
+        return self.halfmove_clock
+
+    def _reversible_states(self):
+        window = self._repetition_window()
+        if window <= 0:
+            return []
+        return self._states(window)
+
     def _push_capture(self, move, capture_square, piece_type, was_promoted):
         pass
 
@@ -1808,8 +2601,12 @@ class Board(BaseBoard):
         :warning: Moves are not checked for legality.
         """
         # Remember game state.
-        self.stack.append(_BoardState(self))
-        self.move_stack.append(move)
+        self._history = _BoardState(self, move, self._history)
+        if self._move_stack is not None:
+            self._move_stack.append(move)
+        self._check_info = None
+        self._attack_maps = None
+        self._outcome = None
 
         move = self._to_chess960(move)
 
@@ -1830,6 +2627,7 @@ class Board(BaseBoard):
         # Drops.
         if move.drop:
             self._set_piece_at(move.to_square, move.drop, self.turn)
+            self._update_zobrist_board(self._history)
             self.turn = not self.turn
             return
 
@@ -1900,38 +2698,44 @@ class Board(BaseBoard):
             if captured_piece_type:
                 self._push_capture(move, capture_square, captured_piece_type, was_promoted)
 
+        # Update the incremental Zobrist hash.
+        self._update_zobrist_board(self._history)
+
         # Swap turn.
         self.turn = not self.turn
 
+    def push_packed(self, packed):
+        """
+        Pushes a move packed into a 16 bit integer, as generated by
+        :func:`~chess.Board.generate_legal_moves_packed()`.
+        See :func:`~chess.Move.packed()`.
+
+        The move is put onto the move stack as a :class:`~chess.Move`, so
+        :func:`~chess.Board.pop()` works as usual.
+
+        :warning: Moves are not checked for legality.
+        """
+        self.push(Move.from_packed(packed))
+
     def pop(self):
         """
         Restores the previous position and returns the last move from the stack.
 
         :raises: :exc:`IndexError` if the stack is empty.
         """
-        move = self.move_stack.pop()
-        state = self.stack.pop()
-
-        self.pawns = state.pawns
-        self.knights = state.knights
-        self.bishops = state.bishops
-        self.rooks = state.rooks
-        self.queens = state.queens
-        self.kings = state.kings
+        state = self._history
+        if state is None:
+            raise IndexError("pop from empty move stack")
 
-        self.occupied_co[WHITE] = state.occupied_w
-        self.occupied_co[BLACK] = state.occupied_b
-        self.occupied = state.occupied
+        self._history = state.previous
+        if self._move_stack is not None:
+            self._move_stack.pop()
 
-        self.promoted = state.promoted
+        state.restore(self)
+        self._attack_maps = None
+        self._outcome = None
 
-        self.turn = state.turn
-        self.castling_rights = state.castling_rights
-        self.ep_square = state.ep_square
-        self.halfmove_clock = state.halfmove_clock
-        self.fullmove_number = state.fullmove_number
-
-        return move
+        return state.move
 
     def peek(self):
         """
@@ -1939,7 +2743,41 @@ class Board(BaseBoard):
 
         :raises: :exc:`IndexError` if the move stack is empty.
         """
-        return self.move_stack[-1]
+        if self._history is None:
+            raise IndexError("peek from empty move stack")
+        return self._history.move
+
+    @property
+    def move_stack(self):
+        """
+        The moves that led to the current position, oldest first.
+
+        The list is created when first accessed and then kept up to date.
+        Do not modify it. Use :func:`~chess.Board.push()`,
+        :func:`~chess.Board.pop()` and :func:`~chess.Board.clear_stack()`.
+        """
+        move_stack = self._move_stack
+        if move_stack is None:
+            move_stack = self._move_stack = [state.move for state in self._states()]
+        return move_stack
+
+    @property
+    def stack(self):
+        # The undo records of the moves in the move stack, oldest first.
+        return self._states()
+
+    def _states(self, limit=None):
+        # The most recent *limit* undo records, oldest first.
+        states = []
+        state = self._history
+        while state is not None and limit != len(states):
+            states.append(state)
+            state = state.previous
+        states.reverse()
+        return states
+
+    def _stack_length(self):
+        return self._history.length if self._history else 0
 
     def castling_shredder_fen(self):
         castling_rights = self.clean_castling_rights()
@@ -2133,6 +2971,125 @@ class Board(BaseBoard):
         self._set_castling_fen(castling_fen)
         self.clear_stack()
 
+    def to_bytes(self):
+        """
+        Gets a compact binary encoding of the position.
+
+        The encoding starts with a 16 byte header: the occupied squares (8
+        bytes), the turn, the castling rights on the first and eighth rank,
+        the en passant square (64 if none), the half-move clock and the
+        full-move number (2 bytes each), all big endian. If one of the clocks
+        is 65535 or more, both fields are 65535 and the clocks follow as
+        8 bytes each. The header is followed by one nibble for each occupied
+        square in ascending order, with the piece type in the lower three
+        bits and the color in the highest bit (set for white). Variants
+        append their additional state.
+
+        The standard starting position takes 32 bytes.
+
+        :raises: :exc:`ValueError` if a clock is negative or does not fit
+            into 8 bytes.
+
+        >>> import chess
+        >>>
+        >>> data = chess.Board().to_bytes()
+        >>> len(data)
+        32
+        >>> chess.Board.from_bytes(data) == chess.Board()
+        True
+        """
+        castling_rights = self.castling_rights
+        try:
+            if self.halfmove_clock < 0xffff and self.fullmove_number < 0xffff:
+                header = _BYTES_HEADER.pack(
+                    self.occupied, self.turn,
+                    (castling_rights & BB_RANK_1) | (castling_rights >> 48 & 0xff00),
+                    64 if self.ep_square is None else self.ep_square,
+                    self.halfmove_clock, self.fullmove_number)
+            else:
+                header = _BYTES_HEADER.pack(
+                    self.occupied, self.turn,
+                    (castling_rights & BB_RANK_1) | (castling_rights >> 48 & 0xff00),
+                    64 if self.ep_square is None else self.ep_square,
+                    0xffff, 0xffff) + _BYTES_CLOCKS.pack(self.halfmove_clock, self.fullmove_number)
+        except struct.error:
+            raise ValueError("clocks out of range for binary encoding: {0} {1}".format(self.halfmove_clock, self.fullmove_number))
+
+        white = self.occupied_co[WHITE]
+        codes = bytearray()
+        for square in scan_forward(self.occupied):
+            piece_type = self.piece_type_at(square)
+            codes.append(piece_type | 8 if white & BB_SQUARES[square] else piece_type)
+        if len(codes) & 1:
+            codes.append(0)
+
+        return header + bytes(bytearray(high << 4 | low for high, low in zip(codes[0::2], codes[1::2])))
+
+    def set_bytes(self, data):
+        """
+        Sets the position from a binary encoding created by
+        :func:`~chess.Board.to_bytes()`.
+
+        :raises: :exc:`ValueError` if the data is invalid.
+        """
+        end = self._set_bytes(data)
+        if end != len(data):
+            raise ValueError("unexpected data after position: {0} of {1} bytes used".format(end, len(data)))
+
+    def _set_bytes(self, data):
+        # Sets the position and returns the offset after the consumed data.
+        try:
+            occupied, turn, castling_rights, ep_square, halfmove_clock, fullmove_number = _BYTES_HEADER.unpack_from(data)
+        except struct.error:
+            raise ValueError("position data too short: {0} bytes".format(len(data)))
+
+        if turn > 1:
+            raise ValueError("invalid turn in position data: {0}".format(turn))
+        if ep_square > 64:
+            raise ValueError("invalid en passant square in position data: {0}".format(ep_square))
+
+        start = _BYTES_HEADER.size
+        if halfmove_clock == fullmove_number == 0xffff:
+            try:
+                halfmove_clock, fullmove_number = _BYTES_CLOCKS.unpack_from(data, start)
+            except struct.error:
+                raise ValueError("position data too short: {0} bytes".format(len(data)))
+            start += _BYTES_CLOCKS.size
+
+        end = start + (popcount(occupied) + 1) // 2
+        if len(data) < end:
+            raise ValueError("position data too short: {0} bytes".format(len(data)))
+
+        codes = bytearray(data[start:end])
+        masks = [BB_VOID] * 16
+        for i, square in enumerate(scan_forward(occupied)):
+            code = codes[i >> 1]
+            masks[code & 15 if i & 1 else code >> 4] |= BB_SQUARES[square]
+
+        if masks[0] | masks[7] | masks[8] | masks[15]:
+            raise ValueError("invalid piece in position data")
+
+        self.pawns = masks[PAWN] | masks[PAWN | 8]
+        self.knights = masks[KNIGHT] | masks[KNIGHT | 8]
+        self.bishops = masks[BISHOP] | masks[BISHOP | 8]
+        self.rooks = masks[ROOK] | masks[ROOK | 8]
+        self.queens = masks[QUEEN] | masks[QUEEN | 8]
+        self.kings = masks[KING] | masks[KING | 8]
+        self.promoted = BB_VOID
+        self.occupied_co[WHITE] = masks[PAWN | 8] | masks[KNIGHT | 8] | masks[BISHOP | 8] | masks[ROOK | 8] | masks[QUEEN | 8] | masks[KING | 8]
+        self.occupied_co[BLACK] = occupied & ~self.occupied_co[WHITE]
+        self.occupied = occupied
+
+        self.turn = bool(turn)
+        self.castling_rights = (castling_rights & 0xff) | (castling_rights & 0xff00) << 48
+        self.ep_square = None if ep_square == 64 else ep_square
+        self.halfmove_clock = halfmove_clock
+        self.fullmove_number = fullmove_number or 1
+
+        self.clear_stack()
+
+        return end
+
     def set_board_fen(self, fen):
         super(Board, self).set_board_fen(fen)
         self.clear_stack()
@@ -2346,7 +3303,7 @@ class Board(BaseBoard):
                                         position.push(move)
 
                                     # Reset the position.
-                                    while position.move_stack:
+                                    while position._history is not None:
                                         position.pop()
                                 elif opcode in ("bm", "am"):
                                     # A set of moves.
@@ -2408,32 +3365,34 @@ class Board(BaseBoard):
             return "--"
 
         # Look ahead for check or checkmate.
-        self.push(move)
-        is_check = self.is_check()
-        is_checkmate = (is_check and self.is_checkmate()) or self.is_variant_loss() or self.is_variant_win()
-        self.pop()
+        is_check, is_checkmate = self._lookahead_check(move)
+
+        san = self._san_body(move)
+
+        # Add check or checkmate suffix.
+        if is_checkmate:
+            return san + "#"
+        elif is_check:
+            return san + "+"
+        else:
+            return san
+
+    def _san_body(self, move):
+        # Standard algebraic notation without the check or checkmate suffix.
 
         # Drops.
         if move.drop:
             san = ""
             if move.drop != PAWN:
                 san = PIECE_SYMBOLS[move.drop].upper()
-            san += "@" + SQUARE_NAMES[move.to_square]
+            return san + "@" + SQUARE_NAMES[move.to_square]
 
         # Castling.
         if self.is_castling(move):
             if square_file(move.to_square) < square_file(move.from_square):
-                san = "O-O-O"
-            else:
-                san = "O-O"
-
-        if move.drop or self.is_castling(move):
-            if is_checkmate:
-                return san + "#"
-            elif is_check:
-                return san + "+"
+                return "O-O-O"
             else:
-                return san
+                return "O-O"
 
         piece = self.piece_type_at(move.from_square)
 
@@ -2482,14 +3441,29 @@ class Board(BaseBoard):
         if move.promotion:
             san += "=" + PIECE_SYMBOLS[move.promotion].upper()
 
-        # Add check or checkmate suffix.
-        if is_checkmate:
-            san += "#"
-        elif is_check:
-            san += "+"
-
         return san
 
+    def _lookahead_check(self, move):
+        # Only moves that give check need to be made to test for checkmate.
+        if not self.gives_check(move):
+            return False, False
+
+        self.push(move)
+        try:
+            return True, self.is_checkmate()
+        finally:
+            self.pop()
+
+    def _lookahead_check_by_push(self, move):
+        # Variants with special end conditions mark moves that end the game
+        # like checkmates.
+        self.push(move)
+        try:
+            is_check = self.is_check()
+            return is_check, (is_check and self.is_checkmate()) or self.is_variant_loss() or self.is_variant_win()
+        finally:
+            self.pop()
+
     def variation_san(self, variation):
         """
         Given a sequence of moves, returns a string representing the sequence
@@ -2500,24 +3474,62 @@ class Board(BaseBoard):
 
         :raises: :exc:`ValueError` if any moves in the sequence are illegal.
         """
-        board = self.copy(stack=False)
+        turn = self.turn
+        fullmove_number = self.fullmove_number
         san = []
 
-        for move in variation:
-            if not board.is_legal(move):
-                raise ValueError("illegal move {0} in position {1}".format(move, board.fen()))
-
-            if board.turn == WHITE:
-                san.append("{0}. {1}".format(board.fullmove_number, board.san(move)))
+        for move_san in self.san_batch(variation):
+            if turn == WHITE:
+                san.append("{0}. {1}".format(fullmove_number, move_san))
             elif not san:
-                san.append("{0}...{1}".format(board.fullmove_number, board.san(move)))
+                san.append("{0}...{1}".format(fullmove_number, move_san))
             else:
-                san.append(board.san(move))
+                san.append(move_san)
 
-            board.push(move)
+            if turn == BLACK:
+                fullmove_number += 1
+            turn = not turn
 
         return " ".join(san)
 
+    def san_batch(self, moves):
+        """
+        Gets the standard algebraic notation of a sequence of moves, starting
+        from the current position.
+
+        Returns a list of strings. Each move is made exactly once on a single
+        working copy of the board, and the position reached is used to add
+        the check or checkmate suffix.
+
+        >>> import chess
+        >>>
+        >>> board = chess.Board()
+        >>> board.san_batch([chess.Move.from_uci(uci) for uci in ["f2f3", "e7e5", "g2g4", "d8h4"]])
+        ['f3', 'e5', 'g4', 'Qh4#']
+
+        The board will not be modified as a result of calling this.
+
+        :raises: :exc:`ValueError` if any moves in the sequence are illegal.
+        """
+        board = self.copy(stack=False)
+        sans = []
+
+        for move in moves:
+            if not board.is_legal(move):
+                raise ValueError("illegal move {0} in position {1}".format(move, board.fen()))
+
+            san = board._san_body(move)
+            board.push(move)
+
+            if board.is_variant_loss() or board.is_variant_win():
+                san += "#"
+            elif board.is_check():
+                san += "#" if board.is_checkmate() else "+"
+
+            sans.append(san)
+
+        return sans
+
     def parse_san(self, san):
         """
         Uses the current position as the context to parse a move in standard
@@ -2537,40 +3549,26 @@ class Board(BaseBoard):
             raise ValueError("illegal san: {0} in {1}".format(repr(san), self.fen()))
 
         # Match normal moves.
-        match = SAN_REGEX.match(san)
-        if not match:
+        pattern = _parse_san_pattern(san)
+        if not pattern:
             # Null moves.
             if san in ["--", "Z0"]:
                 return Move.null()
 
             raise ValueError("invalid san: {0}".format(repr(san)))
 
-        # Get target square.
-        to_square = SQUARE_NAMES.index(match.group(4))
-        to_mask = BB_SQUARES[to_square]
-
-        # Get the promotion type.
-        p = match.group(5)
-        promotion = p and PIECE_SYMBOLS.index(p[-1].lower())
+        return self._match_san(san, *pattern)
 
+    def _match_san(self, san, piece_type, from_mask, to_square, promotion):
         # Filter by piece type.
-        if match.group(1):
-            piece_type = PIECE_SYMBOLS.index(match.group(1).lower())
-            from_mask = self.pieces_mask(piece_type, self.turn)
+        if piece_type:
+            from_mask &= self.pieces_mask(piece_type, self.turn)
         else:
-            from_mask = self.pawns
-
-        # Filter by source file.
-        if match.group(2):
-            from_mask &= BB_FILES[FILE_NAMES.index(match.group(2))]
-
-        # Filter by source rank.
-        if match.group(3):
-            from_mask &= BB_RANKS[int(match.group(3)) - 1]
+            from_mask &= self.pawns
 
         # Match legal moves.
         matched_move = None
-        for move in self.generate_legal_moves(from_mask, to_mask):
+        for move in self.generate_legal_moves(from_mask, BB_SQUARES[to_square]):
             if move.promotion != promotion:
                 continue
 
@@ -2584,6 +3582,67 @@ class Board(BaseBoard):
 
         return matched_move
 
+    def _match_trusted_san(self, san, piece_type, from_mask, to_square, promotion):
+        # Assumes that the SAN is legal and finds the source square by
+        # looking only at how the piece type moves. Legal moves are matched
+        # only if that is ambiguous (because of pins) or fails.
+        if piece_type:
+            candidates = from_mask & self.pieces_mask(piece_type, self.turn) & self._attackers_mask(self.turn, to_square, self.occupied)
+        elif not from_mask & BB_FILES[square_file(to_square)]:
+            # Captures, hinting at a different file.
+            candidates = from_mask & self.pawns & self.occupied_co[self.turn] & BB_PAWN_ATTACKS[not self.turn][to_square]
+        else:
+            # Single and double pushes.
+            shift = shift_down if self.turn == WHITE else shift_up
+            single = shift(BB_SQUARES[to_square])
+            double = shift(single) if not single & self.occupied else BB_VOID
+            candidates = from_mask & self.pawns & self.occupied_co[self.turn] & (single | double)
+
+        if candidates and not candidates & (candidates - 1):
+            return _interned_move(msb(candidates), to_square, promotion)
+
+        return self._match_san(san, piece_type, from_mask, to_square, promotion)
+
+    def parse_san_line(self, sans):
+        """
+        Parses a sequence of moves in standard algebraic notation, starting
+        from the current position, and returns the list of moves.
+
+        Each distinct SAN string is only matched against the SAN pattern once
+        and the moves are made on a single working copy of the board.
+
+        >>> import chess
+        >>>
+        >>> board = chess.Board()
+        >>> board.parse_san_line(["e4", "e5", "Nf3", "Nc6", "Bb5"])
+        [Move.from_uci('e2e4'), Move.from_uci('e7e5'), Move.from_uci('g1f3'), Move.from_uci('b8c6'), Move.from_uci('f1b5')]
+
+        The board will not be modified as a result of calling this.
+
+        :raises: :exc:`ValueError` if any SAN is invalid, illegal or
+            ambiguous.
+        """
+        board = self.copy(stack=False)
+        patterns = {}
+        moves = []
+
+        for san in sans:
+            try:
+                pattern = patterns[san]
+            except KeyError:
+                pattern = patterns[san] = _parse_san_pattern(san)
+
+            if pattern:
+                move = board._match_san(san, *pattern)
+            else:
+                # Castling, drops, null moves and errors.
+                move = board.parse_san(san)
+
+            board.push(move)
+            moves.append(move)
+
+        return moves
+
     def push_san(self, san):
         """
         Parses a move in standard algebraic notation, makes the move and puts
@@ -2701,7 +3760,7 @@ class Board(BaseBoard):
         Returns valid castling rights filtered from
         :data:`~chess.Board.castling_rights`.
         """
-        if self.stack:
+        if self._history is not None:
             # Castling rights do not change in a game, so we can assume them to
             # be filtered already.
             return self.castling_rights
@@ -2960,6 +4019,20 @@ class Board(BaseBoard):
 
         return False
 
+    def _get_check_info(self):
+        # The king of the side to move, pieces pinned to it and checkers.
+        # Computed lazily and reset when pieces move. Tagged with the turn,
+        # since the turn may be changed directly.
+        check_info = self._check_info
+        if check_info is None or check_info[0] != self.turn:
+            king = self.king(self.turn)
+            if king is None:
+                check_info = self.turn, None, BB_VOID, BB_VOID
+            else:
+                check_info = self.turn, king, self._slider_blockers(king), self.attackers_mask(not self.turn, king)
+            self._check_info = check_info
+        return check_info
+
     def _slider_blockers(self, king):
         rooks_and_queens = self.rooks | self.queens
         bishops_and_queens = self.bishops | self.queens
@@ -3001,7 +4074,7 @@ class Board(BaseBoard):
 
         if BB_SQUARES[king] & from_mask:
             for to_square in scan_reversed(BB_KING_ATTACKS[king] & ~self.occupied_co[self.turn] & ~attacked & to_mask):
-                yield Move(king, to_square)
+                yield _INTERNED_MOVES[king][to_square]
 
         checker = msb(checkers)
         if BB_SQUARES[checker] == checkers:
@@ -3023,11 +4096,8 @@ class Board(BaseBoard):
         if self.is_variant_end():
             return
 
-        king_mask = self.kings & self.occupied_co[self.turn]
-        if king_mask:
-            king = msb(king_mask)
-            blockers = self._slider_blockers(king)
-            checkers = self.attackers_mask(not self.turn, king)
+        _, king, blockers, checkers = self._get_check_info()
+        if king is not None:
             if checkers:
                 for move in self._generate_evasions(king, checkers, from_mask, to_mask):
                     if self._is_safe(king, blockers, move):
@@ -3040,6 +4110,293 @@ class Board(BaseBoard):
             for move in self.generate_pseudo_legal_moves(from_mask, to_mask):
                 yield move
 
+    def _count_legal_moves(self, from_mask=BB_ALL, to_mask=BB_ALL):
+        # Counts the moves generate_legal_moves() would yield, using the same
+        # masks but popcounts instead of move objects.
+        if self.is_variant_end():
+            return 0
+
+        _, king, blockers, checkers = self._get_check_info()
+        if king is None:
+            return self._count_safe_moves(None, BB_VOID, from_mask, to_mask)
+        elif not checkers:
+            return self._count_safe_moves(king, blockers, from_mask, to_mask)
+
+        # Evasions.
+        count = 0
+
+        sliders = checkers & (self.bishops | self.rooks | self.queens)
+        attacked = 0
+        for checker in scan_reversed(sliders):
+            attacked |= BB_RAYS[king][checker] & ~BB_SQUARES[checker]
+
+        if BB_SQUARES[king] & from_mask:
+            for to_square in scan_reversed(BB_KING_ATTACKS[king] & ~self.occupied_co[self.turn] & ~attacked & to_mask):
+                if not self.is_attacked_by(not self.turn, to_square):
+                    count += 1
+
+        checker = msb(checkers)
+        if BB_SQUARES[checker] == checkers:
+            target = BB_BETWEEN[king][checker] | checkers
+            count += self._count_safe_moves(king, blockers, ~self.kings & from_mask, target & to_mask)
+
+            if self.ep_square and not BB_SQUARES[self.ep_square] & target:
+                last_double = self.ep_square + (-8 if self.turn == WHITE else 8)
+                if last_double == checker:
+                    for move in self.generate_pseudo_legal_ep(from_mask, to_mask):
+                        if self._is_safe(king, blockers, move):
+                            count += 1
+
+        return count
+
+    def _count_safe_moves(self, king, blockers, from_mask, to_mask):
+        # Counts the pseudo legal moves that pass _is_safe(). Pieces in
+        # blockers are pinned and may only move along the ray to the king.
+        our_pieces = self.occupied_co[self.turn]
+        count = 0
+
+        # Count piece moves.
+        targets = ~our_pieces & to_mask
+        occupied = self.occupied
+
+        for from_square in scan_reversed(our_pieces & self.knights & from_mask):
+            moves = BB_KNIGHT_ATTACKS[from_square] & targets
+            if moves and blockers & BB_SQUARES[from_square]:
+                moves &= BB_RAYS[king][from_square]
+            count += popcount(moves)
+
+        for from_square in scan_reversed(our_pieces & (self.bishops | self.queens) & from_mask):
+            moves = BB_DIAG_ATTACKS[from_square][BB_DIAG_MASKS[from_square] & occupied] & targets
+            if blockers & BB_SQUARES[from_square]:
+                moves &= BB_RAYS[king][from_square]
+            count += popcount(moves)
+
+        for from_square in scan_reversed(our_pieces & (self.rooks | self.queens) & from_mask):
+            moves = (BB_RANK_ATTACKS[from_square][BB_RANK_MASKS[from_square] & occupied] |
+                     BB_FILE_ATTACKS[from_square][BB_FILE_MASKS[from_square] & occupied]) & targets
+            if blockers & BB_SQUARES[from_square]:
+                moves &= BB_RAYS[king][from_square]
+            count += popcount(moves)
+
+        for from_square in scan_reversed(our_pieces & self.kings & from_mask):
+            moves = BB_KING_ATTACKS[from_square] & targets
+            if from_square == king:
+                for to_square in scan_reversed(moves):
+                    if not self.attackers_mask(not self.turn, to_square):
+                        count += 1
+            else:
+                if blockers & BB_SQUARES[from_square]:
+                    moves &= BB_RAYS[king][from_square]
+                count += popcount(moves)
+
+        # Count castling moves.
+        if from_mask & self.kings:
+            for move in self.generate_castling_moves(from_mask, to_mask):
+                if king is None or self._is_safe(king, blockers, move):
+                    count += 1
+
+        # The remaining moves are all pawn moves.
+        pawns = self.pawns & our_pieces & from_mask
+        if not pawns:
+            return count
+
+        # Count pawn captures. Promotions count four times.
+        unpinned = pawns & ~blockers
+        them = self.occupied_co[not self.turn] & to_mask
+        if self.turn == WHITE:
+            left_captures = (unpinned & ~BB_FILE_A) << 7 & them
+            right_captures = (unpinned & ~BB_FILE_H) << 9 & them
+        else:
+            left_captures = (unpinned & ~BB_FILE_A) >> 9 & them
+            right_captures = (unpinned & ~BB_FILE_H) >> 7 & them
+
+        for captures in (left_captures, right_captures):
+            count += popcount(captures & ~BB_BACKRANKS) + 4 * popcount(captures & BB_BACKRANKS)
+
+        # Count pawn advances.
+        count += self._count_pawn_advances(unpinned, to_mask)
+
+        # Pinned pawns may only move along the ray to the king.
+        for from_square in scan_reversed(pawns & blockers):
+            ray = BB_RAYS[king][from_square]
+            captures = BB_PAWN_ATTACKS[self.turn][from_square] & them & ray
+            count += popcount(captures & ~BB_BACKRANKS) + 4 * popcount(captures & BB_BACKRANKS)
+            count += self._count_pawn_advances(BB_SQUARES[from_square], to_mask & ray)
+
+        # Count en passant captures.
+        if self.ep_square:
+            for move in self.generate_pseudo_legal_ep(from_mask, to_mask):
+                if king is None or self._is_safe(king, blockers, move):
+                    count += 1
+
+        return count
+
+    def _count_pawn_advances(self, pawns, to_mask):
+        if self.turn == WHITE:
+            single_moves = pawns << 8 & ~self.occupied
+            double_moves = single_moves << 8 & ~self.occupied & (BB_RANK_3 | BB_RANK_4)
+        else:
+            single_moves = pawns >> 8 & ~self.occupied
+            double_moves = single_moves >> 8 & ~self.occupied & (BB_RANK_6 | BB_RANK_5)
+
+        single_moves &= to_mask
+        double_moves &= to_mask
+
+        return (popcount(single_moves & ~BB_BACKRANKS) + 4 * popcount(single_moves & BB_BACKRANKS) +
+                popcount(double_moves))
+
+    def generate_pseudo_legal_moves_packed(self, from_mask=BB_ALL, to_mask=BB_ALL):
+        """
+        Generates the same moves as
+        :func:`~chess.Board.generate_pseudo_legal_moves()` (in the same order),
+        but returns an ``array('H')`` of packed moves instead of
+        :class:`~chess.Move` objects. See :func:`~chess.Move.packed()`.
+        """
+        moves = array.array("H")
+        self._append_safe_packed(moves, None, BB_VOID, from_mask, to_mask)
+        return moves
+
+    def generate_legal_moves_packed(self, from_mask=BB_ALL, to_mask=BB_ALL):
+        """
+        Generates the same moves as :func:`~chess.Board.generate_legal_moves()`
+        (in the same order), but returns an ``array('H')`` of packed moves
+        instead of :class:`~chess.Move` objects.
+        See :func:`~chess.Move.packed()`.
+
+        >>> import chess
+        >>>
+        >>> board = chess.Board()
+        >>> moves = board.generate_legal_moves_packed()
+        >>> len(moves)
+        20
+        >>> chess.Move.from_packed(moves[0])
+        Move.from_uci('g1h3')
+        """
+        moves = array.array("H")
+        if self.is_variant_end():
+            return moves
+
+        _, king, blockers, checkers = self._get_check_info()
+        if king is None:
+            self._append_safe_packed(moves, None, BB_VOID, from_mask, to_mask)
+            return moves
+        elif not checkers:
+            self._append_safe_packed(moves, king, blockers, from_mask, to_mask)
+            return moves
+
+        # Evasions.
+        sliders = checkers & (self.bishops | self.rooks | self.queens)
+        attacked = 0
+        for checker in scan_reversed(sliders):
+            attacked |= BB_RAYS[king][checker] & ~BB_SQUARES[checker]
+
+        if BB_SQUARES[king] & from_mask:
+            for to_square in scan_reversed(BB_KING_ATTACKS[king] & ~self.occupied_co[self.turn] & ~attacked & to_mask):
+                if not self.attackers_mask(not self.turn, to_square):
+                    moves.append(king << 6 | to_square)
+
+        checker = msb(checkers)
+        if BB_SQUARES[checker] == checkers:
+            target = BB_BETWEEN[king][checker] | checkers
+            self._append_safe_packed(moves, king, blockers, ~self.kings & from_mask, target & to_mask)
+
+            if self.ep_square and not BB_SQUARES[self.ep_square] & target:
+                last_double = self.ep_square + (-8 if self.turn == WHITE else 8)
+                if last_double == checker:
+                    for move in self.generate_pseudo_legal_ep(from_mask, to_mask):
+                        if self._is_safe(king, blockers, move):
+                            moves.append(move.from_square << 6 | move.to_square)
+
+        return moves
+
+    def _append_safe_packed(self, moves, king, blockers, from_mask, to_mask):
+        # Appends the pseudo legal moves that pass _is_safe(), in the order of
+        # generate_pseudo_legal_moves(). Without a king all pseudo legal
+        # moves are appended.
+        append = moves.append
+        our_pieces = self.occupied_co[self.turn]
+
+        # Generate piece moves.
+        non_pawns = our_pieces & ~self.pawns & from_mask
+        for from_square in scan_reversed(non_pawns):
+            targets = self.attacks_mask(from_square) & ~our_pieces & to_mask
+            if from_square == king:
+                for to_square in scan_reversed(targets):
+                    if not self.attackers_mask(not self.turn, to_square):
+                        append(from_square << 6 | to_square)
+            else:
+                if blockers & BB_SQUARES[from_square]:
+                    targets &= BB_RAYS[king][from_square]
+                for to_square in scan_reversed(targets):
+                    append(from_square << 6 | to_square)
+
+        # Generate castling moves.
+        if from_mask & self.kings:
+            for move in self.generate_castling_moves(from_mask, to_mask):
+                if king is None or self._is_safe(king, blockers, move):
+                    append(move.from_square << 6 | move.to_square)
+
+        # The remaining moves are all pawn moves.
+        pawns = self.pawns & our_pieces & from_mask
+        if not pawns:
+            return
+
+        # Generate pawn captures.
+        for from_square in scan_reversed(pawns):
+            targets = BB_PAWN_ATTACKS[self.turn][from_square] & self.occupied_co[not self.turn] & to_mask
+            if blockers & BB_SQUARES[from_square]:
+                targets &= BB_RAYS[king][from_square]
+
+            for to_square in scan_reversed(targets):
+                packed = from_square << 6 | to_square
+                if BB_SQUARES[to_square] & BB_BACKRANKS:
+                    append(packed | QUEEN << 12)
+                    append(packed | ROOK << 12)
+                    append(packed | BISHOP << 12)
+                    append(packed | KNIGHT << 12)
+                else:
+                    append(packed)
+
+        # Prepare pawn advance generation.
+        if self.turn == WHITE:
+            single_moves = pawns << 8 & ~self.occupied
+            double_moves = single_moves << 8 & ~self.occupied & (BB_RANK_3 | BB_RANK_4)
+        else:
+            single_moves = pawns >> 8 & ~self.occupied
+            double_moves = single_moves >> 8 & ~self.occupied & (BB_RANK_6 | BB_RANK_5)
+
+        single_moves &= to_mask
+        double_moves &= to_mask
+
+        # Generate single pawn moves.
+        for to_square in scan_reversed(single_moves):
+            from_square = to_square + (8 if self.turn == BLACK else -8)
+            if blockers & BB_SQUARES[from_square] and not BB_RAYS[king][from_square] & BB_SQUARES[to_square]:
+                continue
+
+            packed = from_square << 6 | to_square
+            if BB_SQUARES[to_square] & BB_BACKRANKS:
+                append(packed | QUEEN << 12)
+                append(packed | ROOK << 12)
+                append(packed | BISHOP << 12)
+                append(packed | KNIGHT << 12)
+            else:
+                append(packed)
+
+        # Generate double pawn moves.
+        for to_square in scan_reversed(double_moves):
+            from_square = to_square + (16 if self.turn == BLACK else -16)
+            if blockers & BB_SQUARES[from_square] and not BB_RAYS[king][from_square] & BB_SQUARES[to_square]:
+                continue
+
+            append(from_square << 6 | to_square)
+
+        # Generate en passant captures.
+        if self.ep_square:
+            for move in self.generate_pseudo_legal_ep(from_mask, to_mask):
+                if king is None or self._is_safe(king, blockers, move):
+                    append(move.from_square << 6 | move.to_square)
+
     def generate_legal_ep(self, from_mask=BB_ALL, to_mask=BB_ALL):
         if self.is_variant_end():
             return
@@ -3054,7 +4411,10 @@ class Board(BaseBoard):
             self.generate_legal_ep(from_mask, to_mask))
 
     def _attacked_for_king(self, path, occupied):
-        return any(self._attackers_mask(not self.turn, sq, occupied) for sq in scan_reversed(path))
+        # The path always includes the king. If the king is not attacked,
+        # lifting it uncovers no attacks, so the cached attack map of the
+        # opponent is exact.
+        return bool(path & self.attacked_mask(not self.turn))
 
     def _castling_uncovers_rank_attack(self, rook_bb, king_to):
         # Test the special case where we castle and our rook shielded us from
@@ -3070,7 +4430,7 @@ class Board(BaseBoard):
         backrank = BB_RANK_1 if self.turn == WHITE else BB_RANK_8
         king = self.occupied_co[self.turn] & self.kings & ~self.promoted & backrank & from_mask
         king = king & -king
-        if not king or self._attacked_for_king(king, self.occupied):
+        if not king:
             return
 
         bb_c = BB_FILE_C & backrank
@@ -3099,8 +4459,9 @@ class Board(BaseBoard):
                 if not king & bb_g:
                     empty_for_king = BB_BETWEEN[msb(king)][king_to] | bb_g
 
+            # The king may not castle out of, through or into check.
             if not ((self.occupied ^ king ^ rook) & (empty_for_king | empty_for_rook) or
-                    self._attacked_for_king(empty_for_king, self.occupied ^ king) or
+                    self._attacked_for_king(empty_for_king | king, self.occupied ^ king) or
                     self._castling_uncovers_rank_attack(rook, king_to)):
                 yield self._from_chess960(self.chess960, msb(king), candidate)
 
@@ -3108,31 +4469,190 @@ class Board(BaseBoard):
         if not chess960 and drop is None:
             if from_square == E1 and self.kings & BB_E1:
                 if to_square == H1:
-                    return Move(E1, G1)
+                    return _INTERNED_MOVES[E1][G1]
                 elif to_square == A1:
-                    return Move(E1, C1)
+                    return _INTERNED_MOVES[E1][C1]
             elif from_square == E8 and self.kings & BB_E8:
                 if to_square == H8:
-                    return Move(E8, G8)
+                    return _INTERNED_MOVES[E8][G8]
                 elif to_square == A8:
-                    return Move(E8, C8)
+                    return _INTERNED_MOVES[E8][C8]
 
-        return Move(from_square, to_square, promotion, drop)
+        return _interned_move(from_square, to_square, promotion, drop)
 
     def _to_chess960(self, move):
         if move.from_square == E1 and self.kings & BB_E1:
             if move.to_square == G1 and not self.rooks & BB_G1:
-                return Move(E1, H1)
+                return _INTERNED_MOVES[E1][H1]
             elif move.to_square == C1 and not self.rooks & BB_C1:
-                return Move(E1, A1)
+                return _INTERNED_MOVES[E1][A1]
         elif move.from_square == E8 and self.kings & BB_E8:
             if move.to_square == G8 and not self.rooks & BB_G8:
-                return Move(E8, H8)
+                return _INTERNED_MOVES[E8][H8]
             elif move.to_square == C8 and not self.rooks & BB_C8:
-                return Move(E8, A8)
+                return _INTERNED_MOVES[E8][A8]
 
         return move
 
+    def _zobrist_hash(self, ep_square, _array=POLYGLOT_RANDOM_ARRAY):
+        if self._zobrist_board is None:
+            self._zobrist_board = self._zobrist_board_hash()
+
+        zobrist_hash = self._zobrist_board
+
+        # Hash in the castling flags.
+        if self.castling_rights:
+            if self.has_kingside_castling_rights(WHITE):
+                zobrist_hash ^= _array[768]
+            if self.has_queenside_castling_rights(WHITE):
+                zobrist_hash ^= _array[768 + 1]
+            if self.has_kingside_castling_rights(BLACK):
+                zobrist_hash ^= _array[768 + 2]
+            if self.has_queenside_castling_rights(BLACK):
+                zobrist_hash ^= _array[768 + 3]
+
+        # Hash in the en passant file, but only if there is a pawn ready to
+        # capture. Legality of the capture is irrelevant.
+        if ep_square:
+            if self.turn == WHITE:
+                ep_mask = shift_down(BB_SQUARES[ep_square])
+            else:
+                ep_mask = shift_up(BB_SQUARES[ep_square])
+            ep_mask = shift_left(ep_mask) | shift_right(ep_mask)
+
+            if ep_mask & self.pawns & self.occupied_co[self.turn]:
+                zobrist_hash ^= _array[772 + square_file(ep_square)]
+
+        # Hash in the turn.
+        if self.turn == WHITE:
+            zobrist_hash ^= _array[780]
+
+        return zobrist_hash
+
+    def _zobrist_board_hash(self, _array=POLYGLOT_RANDOM_ARRAY):
+        zobrist_board = 0
+
+        for pivot, squares in enumerate(self.occupied_co):
+            for square in scan_reversed(squares):
+                zobrist_board ^= _array[128 * (self.piece_type_at(square) - 1) + 64 * pivot + square]
+
+        return zobrist_board
+
+    def _update_zobrist_board(self, state, _array=POLYGLOT_RANDOM_ARRAY):
+        # Apply the difference to the position before the move, where the
+        # hash is known.
+        zobrist_board = state.zobrist_board
+        if zobrist_board is None:
+            return
+
+        white_before = state.occupied_w
+        white = self.occupied_co[WHITE]
+        recolored = white_before ^ white
+
+        for offset, before, after in ((0, state.pawns, self.pawns),
+                                      (128, state.knights, self.knights),
+                                      (256, state.bishops, self.bishops),
+                                      (384, state.rooks, self.rooks),
+                                      (512, state.queens, self.queens),
+                                      (640, state.kings, self.kings)):
+            for square in scan_reversed((before ^ after) | (before & after & recolored)):
+                bb_square = BB_SQUARES[square]
+                if before & bb_square:
+                    zobrist_board ^= _array[offset + (64 if white_before & bb_square else 0) + square]
+                if after & bb_square:
+                    zobrist_board ^= _array[offset + (64 if white & bb_square else 0) + square]
+
+        self._zobrist_board = zobrist_board
+
+    @property
+    def zobrist_key(self):
+        """
+        The Polyglot compatible Zobrist hash of the position.
+
+        The hash of the piece placement is computed once and then
+        incrementally updated by :func:`~chess.Board.push()` and restored by
+        :func:`~chess.Board.pop()`. Castling rights, the en passant file and
+        the turn are hashed in on access, so that it is still safe to set
+        :data:`~chess.Board.castling_rights`, :data:`~chess.Board.ep_square`
+        and :data:`~chess.Board.turn` directly.
+
+        >>> import chess
+        >>>
+        >>> board = chess.Board()
+        >>> hex(board.zobrist_key)
+        '0x463b96181691fc9c'
+
+        Also see :func:`chess.polyglot.zobrist_hash()`.
+        """
+        return self._zobrist_hash(self.ep_square)
+
+    def _transposition_hash(self):
+        # Like _transposition_key(), but as an integer that is cheap to
+        # compute from the incremental Zobrist hash. The en passant square
+        # is left out. Deciding if en passant is legal would be too
+        # expensive for every position.
+        transposition_hash = self._zobrist_hash(None)
+
+        if self.promoted:
+            transposition_hash ^= hash((self.promoted, ))
+
+        return transposition_hash
+
+    def _legal_ep_square(self):
+        return self.ep_square if self.has_legal_en_passant() else None
+
+    def _variant_state(self):
+        # Additional state of variants that is part of the position, but not
+        # restored from the undo records.
+        return None
+
+    def _repetition_key(self):
+        # Like _state_key(), for the current position.
+        return (self.pawns, self.knights, self.bishops, self.rooks, self.queens, self.kings,
+                self.occupied_co[WHITE], self.occupied_co[BLACK], self.promoted,
+                self.clean_castling_rights(), self._variant_state())
+
+    def _state_key(self, state):
+        # The parts of a position from the history that have to match for a
+        # repetition, except for the turn and the en passant square.
+        castling_rights = state.castling_rights
+        if state.previous is None:
+            # Only the castling rights of the starting position may not have
+            # been filtered by push().
+            board = self.copy(stack=False)
+            state.restore(board)
+            castling_rights = board.clean_castling_rights()
+
+        return (state.pawns, state.knights, state.bishops, state.rooks, state.queens, state.kings,
+                state.occupied_w, state.occupied_b, state.promoted,
+                castling_rights, state.variant_state)
+
+    def _is_transposition(self, key, ep_square, state):
+        # Checks if a position from the history is the same as the current
+        # position with the given repetition key and legal en passant
+        # square. The turn and the occupancy rule out most positions
+        # cheaply. There is no hash history: the incremental Zobrist hash is
+        # only maintained after zobrist_key has been used, since keeping it
+        # up to date halves the speed of push() and pop(). If it is, it
+        # serves as an additional filter. Merely pseudo-legal en passant
+        # does not count.
+        if state.turn != self.turn:
+            return False
+        elif state.occupied_w != self.occupied_co[WHITE] or state.occupied_b != self.occupied_co[BLACK]:
+            return False
+        elif state.zobrist_board is not None and self._zobrist_board is not None and state.zobrist_board != self._zobrist_board:
+            return False
+        elif self._state_key(state) != key:
+            return False
+        elif state.ep_square == self.ep_square:
+            return True
+        elif state.ep_square is None:
+            return ep_square is None
+        else:
+            board = self.copy(stack=False)
+            board.ep_square = state.ep_square
+            return board._legal_ep_square() == ep_square
+
     def _transposition_key(self):
         return (self.pawns, self.knights, self.bishops, self.rooks,
                 self.queens, self.kings,
@@ -3148,7 +4668,7 @@ class Board(BaseBoard):
 
     def _repr_svg_(self):
         import chess.svg
-        lastmove = self.peek() if self.move_stack else None
+        lastmove = self.peek() if self._history is not None else None
         check = self.king(self.turn) if self.is_check() else None
         return chess.svg.board(board=self, lastmove=lastmove, check=check, size=400)
 
@@ -3193,12 +4713,27 @@ class Board(BaseBoard):
         board.fullmove_number = self.fullmove_number
         board.halfmove_clock = self.halfmove_clock
 
+        board._zobrist_board = self._zobrist_board
+        board._check_info = self._check_info
+
         if stack:
-            board.move_stack = copy.deepcopy(self.move_stack)
-            board.stack = copy.copy(self.stack)
+            # The history is immutable and shared.
+            board._history = self._history
 
         return board
 
+    def __reduce__(self):
+        # Pickled as the binary encoding of the starting position and the
+        # moves packed into 16 bit integers. Other instance attributes (of
+        # subclasses) are pickled as usual.
+        moves = array.array("H", [state.move.packed() for state in self._states()])
+        board = self.copy()
+        while board._history is not None:
+            board.pop()
+
+        state = dict((name, value) for name, value in self.__dict__.items() if name not in _BOARD_ATTRIBUTES)
+        return _unpickle_board, (type(self), self.chess960, board.to_bytes(), moves), state or None
+
     @classmethod
     def empty(cls, chess960=False):
         """Creates a new empty board. Also see :func:`~chess.Board.clear()`."""
@@ -3215,6 +4750,16 @@ class Board(BaseBoard):
         board = cls.empty(chess960=chess960)
         return board, board.set_epd(epd)
 
+    @classmethod
+    def from_bytes(cls, data, chess960=False):
+        """
+        Creates a new board from a binary encoding created by
+        :func:`~chess.Board.to_bytes()`. See :func:`~chess.Board.set_bytes()`.
+        """
+        board = cls.empty(chess960=chess960)
+        board.set_bytes(data)
+        return board
+
     @classmethod
     def from_chess960_pos(cls, sharnagl):
         board = cls.empty(chess960=True)
@@ -3222,6 +4767,22 @@ class Board(BaseBoard):
         return board
 
 
+# Instance attributes that are restored by _unpickle_board().
+_BOARD_ATTRIBUTES = frozenset([
+    "pawns", "knights", "bishops", "rooks", "queens", "kings", "promoted",
+    "occupied_co", "occupied", "turn", "castling_rights", "ep_square",
+    "halfmove_clock", "fullmove_number", "chess960", "legal_moves",
+    "pseudo_legal_moves", "_history", "_move_stack", "_zobrist_board",
+    "_check_info", "_attack_maps", "_outcome"])
+
+
+def _unpickle_board(cls, chess960, data, moves):
+    board = cls.from_bytes(data, chess960=chess960)
+    for packed in moves:
+        board.push(Move.from_packed(packed))
+    return board
+
+
 class PseudoLegalMoveGenerator(object):
 
     def __init__(self, board):
@@ -3267,8 +4828,7 @@ class LegalMoveGenerator(object):
     __nonzero__ = __bool__
 
     def count(self):
-        # List conversion is faster than iterating.
-        return len(list(self))
+        return self.board._count_legal_moves()
 
     def __iter__(self):
         return self.board.generate_legal_moves()
@@ -3391,6 +4951,9 @@ class SquareSet(object):
     def copy(self):
         return type(self)(self.mask)
 
+    def __reduce__(self):
+        return type(self), (self.mask, )
+
     def add(self, square):
         """Adds a square to the set."""
         self.mask |= BB_SQUARES[square]
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the python-chess library.
+# Copyright (C) 2012-2017 Niklas Fiekas <niklas.fiekas@backscattering.de>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import chess
+
+try:
+    import numpy
+except ImportError:
+    raise ImportError("chess.arrays requires numpy")
+
+
+PIECE_PLANES = [(color, piece_type) for color in chess.COLORS for piece_type in chess.PIECE_TYPES]
+"""
+The order of the 12 piece planes and bitboards: white pawns, knights,
+bishops, rooks, queens and kings, followed by the black pieces in the same
+order.
+"""
+
+STATE_FIELDS = ["turn", "white_kingside", "white_queenside", "black_kingside", "black_queenside",
+                "ep_square", "halfmove_clock", "fullmove_number"]
+"""
+The columns of the state vectors: the side to move (1 for white), the four
+castling rights (1 if available), :data:`~chess.Board.ep_square` (-1 if
+none), :data:`~chess.Board.halfmove_clock` and
+:data:`~chess.Board.fullmove_number`.
+"""
+
+_SQUARE_SHIFTS = numpy.arange(64, dtype=numpy.uint64)
+
+BB_KNIGHT_ATTACKS = numpy.array(chess.BB_KNIGHT_ATTACKS, dtype=numpy.uint64)
+"""Knight attacks from each square, as an array of 64 ``uint64`` masks."""
+
+BB_KING_ATTACKS = numpy.array(chess.BB_KING_ATTACKS, dtype=numpy.uint64)
+"""King attacks from each square, as an array of 64 ``uint64`` masks."""
+
+BB_PAWN_ATTACKS = numpy.array(chess.BB_PAWN_ATTACKS, dtype=numpy.uint64)
+"""
+Pawn attacks indexed by ``int(color)`` and square, as a ``(2, 64)`` array
+of ``uint64`` masks. Note that NumPy treats ``bool`` indexes like
+:data:`chess.WHITE` as masks.
+"""
+
+_NOT_FILE_A = numpy.uint64(chess.BB_ALL & ~chess.BB_FILE_A)
+_NOT_FILE_AB = numpy.uint64(chess.BB_ALL & ~chess.BB_FILE_A & ~chess.BB_FILE_B)
+_NOT_FILE_H = numpy.uint64(chess.BB_ALL & ~chess.BB_FILE_H)
+_NOT_FILE_GH = numpy.uint64(chess.BB_ALL & ~chess.BB_FILE_G & ~chess.BB_FILE_H)
+
+_M1 = numpy.uint64(0x5555555555555555)
+_M2 = numpy.uint64(0x3333333333333333)
+_M4 = numpy.uint64(0x0f0f0f0f0f0f0f0f)
+_H01 = numpy.uint64(0x0101010101010101)
+
+
+def export(boards, bitboards=None, planes=None, state=None, offset=0, board_type=chess.Board, chunk_size=4096):
+    """
+    Writes the given positions into preallocated NumPy arrays and returns the
+    number of positions written.
+
+    *boards* is an iterable of boards or of binary encodings created by
+    :func:`~chess.Board.to_bytes()` (decoded as *board_type*).
+
+    Position *i* is written to row ``offset + i`` of each of the given
+    arrays:
+
+    * *bitboards*: ``(N, 12)`` array of ``uint64`` with one mask per piece
+      type and color, in the order of :data:`~chess.arrays.PIECE_PLANES`.
+    * *planes*: ``(N, 12, 64)`` array (typically ``uint8``), set to 1 where a
+      piece of the plane stands, indexed by square.
+    * *state*: ``(N, 8)`` integer array with the columns in
+      :data:`~chess.arrays.STATE_FIELDS`.
+
+    >>> import chess
+    >>> import chess.arrays
+    >>> import numpy
+    >>>
+    >>> planes = numpy.zeros((2, 12, 64), dtype=numpy.uint8)
+    >>> chess.arrays.export([chess.Board(), chess.Board().to_bytes()], planes=planes)
+    2
+    >>> int(planes[0, 5, chess.E1])
+    1
+
+    Only a fixed amount of work is done per position in Python. The piece
+    planes are expanded from the bitboards with array operations, in chunks
+    of *chunk_size* positions.
+
+    :raises: :exc:`ValueError` if there are more positions than rows.
+    """
+    arrays = [array for array in (bitboards, planes, state) if array is not None]
+    if not arrays:
+        raise ValueError("need at least one of bitboards, planes or state")
+    capacity = min(len(array) for array in arrays)
+
+    scratch = board_type.empty()
+    rows = []
+    states = []
+    count = 0
+
+    for board in boards:
+        if offset + count + len(rows) >= capacity:
+            raise ValueError("more positions than rows in the arrays ({0})".format(capacity))
+
+        if not isinstance(board, chess.BaseBoard):
+            scratch.set_bytes(board)
+            board = scratch
+
+        white = board.occupied_co[chess.WHITE]
+        black = board.occupied_co[chess.BLACK]
+        rows.append((
+            board.pawns & white, board.knights & white, board.bishops & white,
+            board.rooks & white, board.queens & white, board.kings & white,
+            board.pawns & black, board.knights & black, board.bishops & black,
+            board.rooks & black, board.queens & black, board.kings & black))
+
+        if state is not None:
+            states.append((
+                board.turn,
+                board.has_kingside_castling_rights(chess.WHITE),
+                board.has_queenside_castling_rights(chess.WHITE),
+                board.has_kingside_castling_rights(chess.BLACK),
+                board.has_queenside_castling_rights(chess.BLACK),
+                -1 if board.ep_square is None else board.ep_square,
+                board.halfmove_clock,
+                board.fullmove_number))
+
+        if len(rows) >= chunk_size:
+            _write_chunk(offset + count, rows, states, bitboards, planes, state)
+            count += len(rows)
+            rows = []
+            states = []
+
+    if rows:
+        _write_chunk(offset + count, rows, states, bitboards, planes, state)
+        count += len(rows)
+
+    return count
+
+
+def _write_chunk(start, rows, states, bitboards, planes, state):
+    end = start + len(rows)
+    chunk = numpy.array(rows, dtype=numpy.uint64)
+
+    if bitboards is not None:
+        bitboards[start:end] = chunk
+
+    if planes is not None:
+        planes[start:end] = (chunk[:, :, numpy.newaxis] >> _SQUARE_SHIFTS) & numpy.uint64(1)
+
+    if state is not None:
+        state[start:end] = states
+
+
+def _bitboards(bbs):
+    return numpy.asarray(bbs, dtype=numpy.uint64)
+
+def _shift(bbs, n):
+    return numpy.left_shift(_bitboards(bbs), numpy.uint64(n)) if n >= 0 else numpy.right_shift(_bitboards(bbs), numpy.uint64(-n))
+
+
+def popcount(bbs):
+    """Counts the set bits of each element of an array of bitboards."""
+    bbs = _bitboards(bbs)
+    try:
+        return numpy.bitwise_count(bbs).astype(numpy.int64)
+    except AttributeError:
+        # SWAR popcount for NumPy before 2.0.
+        bbs = bbs - ((bbs >> numpy.uint64(1)) & _M1)
+        bbs = (bbs & _M2) + ((bbs >> numpy.uint64(2)) & _M2)
+        bbs = (bbs + (bbs >> numpy.uint64(4))) & _M4
+        return ((bbs * _H01) >> numpy.uint64(56)).astype(numpy.int64)
+
+def lsb(bbs):
+    """
+    Gets the index of the least significant bit of each element of an array
+    of bitboards, or -1 for empty bitboards.
+    """
+    bbs = _bitboards(bbs)
+    count = popcount((bbs & (~bbs + numpy.uint64(1))) - numpy.uint64(1))
+    count[count == 64] = -1
+    return count
+
+def msb(bbs):
+    """
+    Gets the index of the most significant bit of each element of an array
+    of bitboards, or -1 for empty bitboards.
+    """
+    bbs = _bitboards(bbs)
+    for n in [1, 2, 4, 8, 16, 32]:
+        bbs = bbs | (bbs >> numpy.uint64(n))
+    return popcount(bbs) - 1
+
+def bswap(bbs):
+    """Flips each bitboard of an array vertically."""
+    return _bitboards(bbs).byteswap()
+
+
+def shift_down(bbs):
+    return _shift(bbs, -8)
+
+def shift_2_down(bbs):
+    return _shift(bbs, -16)
+
+def shift_up(bbs):
+    return _shift(bbs, 8)
+
+def shift_2_up(bbs):
+    return _shift(bbs, 16)
+
+def shift_right(bbs):
+    return _shift(bbs, 1) & _NOT_FILE_A
+
+def shift_2_right(bbs):
+    return _shift(bbs, 2) & _NOT_FILE_AB
+
+def shift_left(bbs):
+    return _shift(bbs, -1) & _NOT_FILE_H
+
+def shift_2_left(bbs):
+    return _shift(bbs, -2) & _NOT_FILE_GH
+
+def shift_up_left(bbs):
+    return _shift(bbs, 7) & _NOT_FILE_H
+
+def shift_up_right(bbs):
+    return _shift(bbs, 9) & _NOT_FILE_A
+
+def shift_down_left(bbs):
+    return _shift(bbs, -9) & _NOT_FILE_H
+
+def shift_down_right(bbs):
+    return _shift(bbs, -7) & _NOT_FILE_A
+
+
+def knight_attacks(bbs):
+    """
+    Gets the squares attacked by the knights in each bitboard of an array.
+    """
+    bbs = _bitboards(bbs)
+    return (((_shift(bbs, 17) | _shift(bbs, -15)) & _NOT_FILE_A) |
+            ((_shift(bbs, 15) | _shift(bbs, -17)) & _NOT_FILE_H) |
+            ((_shift(bbs, 10) | _shift(bbs, -6)) & _NOT_FILE_AB) |
+            ((_shift(bbs, 6) | _shift(bbs, -10)) & _NOT_FILE_GH))
+
+def king_attacks(bbs):
+    """
+    Gets the squares attacked by the kings in each bitboard of an array.
+    """
+    bbs = _bitboards(bbs)
+    return (shift_left(bbs) | shift_right(bbs) | shift_up(bbs) | shift_down(bbs) |
+            shift_up_left(bbs) | shift_up_right(bbs) | shift_down_left(bbs) | shift_down_right(bbs))
+
+def pawn_attacks(color, bbs):
+    """
+    Gets the squares attacked by the pawns of the given color in each
+    bitboard of an array.
+    """
+    if color == chess.WHITE:
+        return shift_up_left(bbs) | shift_up_right(bbs)
+    else:
+        return shift_down_left(bbs) | shift_down_right(bbs)
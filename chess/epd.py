@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the python-chess library.
+# Copyright (C) 2012-2017 Niklas Fiekas <niklas.fiekas@backscattering.de>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import chess
+import functools
+import itertools
+import multiprocessing
+
+
+def read_epd(handle, board_type=chess.Board, chess960=False, trusted=False, bitboards=False):
+    """
+    Reads positions from a file-like object (or any iterable of lines) with
+    one FEN or EPD per line. Empty lines and lines starting with ``#`` are
+    skipped.
+
+    Yields ``(board, operations)`` tuples, where *operations* is the
+    dictionary of EPD operations (see :func:`~chess.Board.set_epd()`). It is
+    empty for FENs.
+
+    >>> import chess.epd
+    >>>
+    >>> lines = ["1R6/3k4/8/8/8/1K6/8/2q5 b - - wdl 2; dtz 3;"]
+    >>> for board, operations in chess.epd.read_epd(lines):
+    ...     print(board.fen(), operations["dtz"])
+    1R6/3k4/8/8/8/1K6/8/2q5 b - - 0 1 3
+
+    By default every line is validated. :exc:`ValueError` is raised for
+    syntax errors and for positions that are not
+    :func:`valid <chess.Board.is_valid()>`.
+
+    With *trusted* the input is assumed to be well formed. The position part
+    is then parsed in a single pass without syntax checks, and
+    :func:`~chess.Board.status()` is not checked. The result for malformed
+    input is undefined. Variants with additional position state in their
+    FENs (like crazyhouse pockets) are still parsed by the board.
+
+    With *bitboards* a tuple ``(pawns, knights, bishops, rooks, queens,
+    kings, occupied_white, occupied_black, turn, castling_rights,
+    ep_square, halfmove_clock, fullmove_number)`` is yielded in place of
+    each board, and no board objects are created for the results.
+    """
+    parse_line = _line_parser(board_type, chess960, trusted, bitboards)
+
+    for line in handle:
+        result = parse_line(line)
+        if result is not None:
+            yield result
+
+
+def read_epd_parallel(handle, board_type=chess.Board, chess960=False, trusted=False, bitboards=False, processes=None, chunk_size=10000):
+    """
+    Like :func:`~chess.epd.read_epd()`, but parses the lines in a pool of
+    *processes* (defaults to the number of CPUs).
+
+    Lines are read in the current process and sent to the workers in chunks
+    of *chunk_size* lines. Results are yielded in the order of the input.
+    Returning *bitboards* is considerably cheaper than transferring boards
+    between processes.
+    """
+    parse_chunk = functools.partial(_parse_chunk, board_type, chess960, trusted, bitboards)
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        for results in pool.imap(parse_chunk, _chunks(handle, chunk_size)):
+            for result in results:
+                yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _chunks(handle, chunk_size):
+    lines = iter(handle)
+    while True:
+        chunk = list(itertools.islice(lines, chunk_size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def _parse_chunk(board_type, chess960, trusted, bitboards, chunk):
+    parse_line = _line_parser(board_type, chess960, trusted, bitboards)
+    return [result for result in map(parse_line, chunk) if result is not None]
+
+
+def _line_parser(board_type, chess960, trusted, bitboards):
+    # Variants with additional position state must parse their own FENs.
+    plain = board_type.set_fen == chess.Board.set_fen and board_type.set_epd == chess.Board.set_epd
+
+    # Bitboards are extracted from a single scratch board.
+    scratch = board_type.empty(chess960=chess960)
+
+    def parse_line(line):
+        parts = line.split()
+        if not parts or parts[0].startswith("#"):
+            return None
+
+        board = scratch if bitboards else board_type.empty(chess960=chess960)
+
+        if trusted and plain:
+            operations = _set_trusted(board, line, parts)
+        elif _is_fen(line, parts):
+            board.set_fen(line)
+            operations = {}
+        else:
+            operations = board.set_epd(line)
+
+        if not trusted and not board.is_valid():
+            raise ValueError("invalid position (status {0:#x}): {1}".format(board.status(), repr(line.strip())))
+
+        if bitboards:
+            return (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+                    board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK],
+                    board.turn, board.castling_rights, board.ep_square,
+                    board.halfmove_clock, board.fullmove_number), operations
+        else:
+            return board, operations
+
+    return parse_line
+
+
+def _is_fen(line, parts):
+    # EPDs have no move counters, but may have operations.
+    return len(parts) == 6 and parts[4].isdigit() and parts[5].isdigit() and ";" not in line
+
+
+def _set_trusted(board, line, parts):
+    # Sets the position from the whitespace separated parts of a FEN or EPD
+    # without validation and returns the EPD operations.
+    (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+     board.promoted, board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]) = chess._parse_board_fen(parts[0])
+    board.occupied = board.occupied_co[chess.WHITE] | board.occupied_co[chess.BLACK]
+
+    board.turn = parts[1] == "w"
+    board._set_castling_fen(parts[2])
+    board.ep_square = None if parts[3] == "-" else chess.SQUARE_NAMES.index(parts[3])
+    board.clear_stack()
+
+    if _is_fen(line, parts):
+        board.halfmove_clock = int(parts[4])
+        board.fullmove_number = int(parts[5]) or 1
+        operations = {}
+    else:
+        board.halfmove_clock = 0
+        board.fullmove_number = 1
+
+        operation_part = line.strip().rstrip(";").split(None, 4)[4:]
+        operations = board._parse_epd_ops(operation_part[0] if operation_part else "", lambda: board.copy(stack=False))
+        board.halfmove_clock = int(operations.get("hmvc", 0))
+        board.fullmove_number = int(operations.get("fmvn", 1)) or 1
+
+    return operations
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of the python-chess library.
+# Copyright (C) 2012-2017 Niklas Fiekas <niklas.fiekas@backscattering.de>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import multiprocessing
+
+
+def perft(board, depth, hash_table=None):
+    """
+    Counts the leaf nodes of the legal move tree of the given depth.
+
+    Moves at the last ply are counted in bulk, without making them.
+
+    >>> import chess
+    >>> import chess.perft
+    >>>
+    >>> chess.perft.perft(chess.Board(), 3)
+    8902
+
+    Optionally pass a *hash_table* (for example a :class:`dict`) to reuse
+    the counts of transpositions. Entries are keyed by the Zobrist hash of
+    the position (including variant specific state) and the remaining
+    depth. The table can be shared across calls and grows without bounds.
+
+    Works with all boards from :mod:`chess.variant`. The board is restored
+    to its original position after counting.
+    """
+    if depth < 1:
+        return 1
+    elif hash_table is None:
+        return _perft(board, depth)
+    else:
+        return _perft_hashed(board, depth, hash_table)
+
+
+def divide(board, depth, hash_table=None):
+    """
+    Counts the leaf nodes of the legal move tree of the given depth
+    separately for each legal move.
+
+    Returns a list of ``(move, nodes)`` tuples in move generation order.
+
+    >>> import chess
+    >>> import chess.perft
+    >>>
+    >>> board = chess.Board()
+    >>> for move, nodes in chess.perft.divide(board, 2)[:2]:
+    ...     print(move, nodes)
+    g1h3 20
+    g1f3 20
+    """
+    result = []
+
+    for move in list(board.generate_legal_moves()):
+        board.push(move)
+        try:
+            result.append((move, perft(board, depth - 1, hash_table)))
+        finally:
+            board.pop()
+
+    return result
+
+
+def parallel_perft(board, depth, processes=None, hashing=False, pool=None):
+    """
+    Like :func:`~chess.perft.perft()`, but distributes the work to a pool
+    of *processes* (defaults to the number of CPUs).
+
+    The move tree is expanded until there are enough subtrees to keep all
+    processes busy. The subtrees are then scheduled largest first.
+
+    With *hashing* each worker process keeps its own hash table.
+
+    Pass an existing :class:`multiprocessing.Pool` with *processes* workers
+    as *pool* to reuse the worker processes (and their hash tables) across
+    calls.
+    """
+    if depth < 3:
+        return perft(board, depth)
+
+    processes = processes or multiprocessing.cpu_count()
+    tasks = [(subtree, subtree_depth, hashing) for subtree, subtree_depth in _split(board, depth, 8 * processes)]
+
+    if pool is not None:
+        return sum(pool.imap_unordered(_perft_task, tasks))
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        return sum(pool.imap_unordered(_perft_task, tasks))
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _perft(board, depth):
+    if depth == 1:
+        return board.legal_moves.count()
+
+    nodes = 0
+
+    for move in list(board.generate_legal_moves()):
+        board.push(move)
+        nodes += _perft(board, depth - 1)
+        board.pop()
+
+    return nodes
+
+
+def _perft_hashed(board, depth, hash_table):
+    if depth == 1:
+        return board.legal_moves.count()
+
+    key = board._transposition_hash(), board.castling_rights, board.ep_square, depth
+    try:
+        return hash_table[key]
+    except KeyError:
+        pass
+
+    nodes = 0
+
+    for move in list(board.generate_legal_moves()):
+        board.push(move)
+        nodes += _perft_hashed(board, depth - 1, hash_table)
+        board.pop()
+
+    hash_table[key] = nodes
+    return nodes
+
+
+def _split(board, depth, min_tasks):
+    # Expand the move tree until there are enough subtrees, but keep at
+    # least two plies in each of them, so that leaves are still counted in
+    # bulk.
+    tasks = [board.copy(stack=False)]
+
+    while len(tasks) < min_tasks and depth > 2:
+        depth -= 1
+
+        children = []
+        for parent in tasks:
+            for move in parent.generate_legal_moves():
+                child = parent.copy(stack=False)
+                child.push(move)
+                children.append(child)
+        tasks = children
+
+    # Schedule the subtrees with the most moves first.
+    tasks.sort(key=lambda subtree: subtree.legal_moves.count(), reverse=True)
+    return [(subtree, depth) for subtree in tasks]
+
+
+_worker_hash_table = None
+
+
+def _perft_task(task):
+    global _worker_hash_table
+
+    board, depth, hashing = task
+
+    if not hashing:
+        return perft(board, depth)
+
+    if _worker_hash_table is None:
+        _worker_hash_table = {}
+    return perft(board, depth, _worker_hash_table)
@@ -16,11 +16,19 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+import array
 import chess
+import codecs
 import collections
+import functools
+import io
 import itertools
+import multiprocessing
+import os
 import re
 import logging
+import struct
+import zlib
 
 
 LOGGER = logging.getLogger(__name__)
@@ -78,6 +86,19 @@ NAG_BLACK_SEVERE_TIME_PRESSURE = 139
 NAG_NOVELTY = 146
 
 
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+"""The number of characters :func:`~chess.pgn.read_games()` reads at once."""
+
+DEFAULT_INDEX_TAGS = ["White", "Black", "Result", "Date", "ECO", "WhiteElo", "BlackElo"]
+"""The header tags stored in a :class:`~chess.pgn.PgnIndex` by default."""
+
+SKIP = object()
+"""
+Return from :func:`BaseVisitor.begin_game() <chess.pgn.BaseVisitor.begin_game()>`
+or :func:`BaseVisitor.end_headers() <chess.pgn.BaseVisitor.end_headers()>`
+to skip the rest of the game.
+"""
+
 TAG_REGEX = re.compile(r"^\[([A-Za-z0-9_]+)\s+\"(.*)\"\]\s*$")
 
 MOVETEXT_REGEX = re.compile(r"""
@@ -99,6 +120,45 @@ MOVETEXT_REGEX = re.compile(r"""
     """, re.DOTALL | re.VERBOSE)
 
 
+# Tokens of whole blocks of PGN text. Header tags and escape lines must start
+# at the beginning of a line. Empty lines are matched without their final
+# newline, so that each of them is a separate token.
+_BLOCK_TOKEN_REGEX = re.compile(r"""
+    (?P<empty>\n[ \t\r]*(?=\n))
+    |(?P<tag>^\[(?P<tagname>[A-Za-z0-9_]+)\s+\"(?P<tagvalue>.*)\"\][ \t\r]*$)
+    |(?P<escape>^%.*)
+    |(?P<comment>\{[^}]*\}?)
+    |(?P<line_comment>;.*)
+    |(?P<token>
+        [NBKRQ]?[a-h]?[1-8]?[\-x]?[a-h][1-8](?:=?[nbrqkNBRQK])?
+        |[PNBRQK]?@[a-h][1-8]
+        |--
+        |Z0
+        |O-O(?:-O)?
+        |0-0(?:-0)?
+        |\$[0-9]+
+        |\(
+        |\)
+        |\*|1-0|0-1|1/2-1/2
+        |[\?!]{1,2}
+    )
+    """, re.MULTILINE | re.VERBOSE)
+
+# Skipped games only need the tokens that can end them, and the comments that
+# can hide those. Lines start after a newline (blocks are split after one), so
+# that all alternatives start with a literal character, which is much faster
+# to search for.
+_BLOCK_SKIP_REGEX = re.compile(r"""
+    \n(?:
+        (?P<empty>[ \t\r]*(?=\n))
+        |(?P<tag>\[(?P<tagname>[A-Za-z0-9_]+)\s+\"(?P<tagvalue>.*)\"\][ \t\r]*$)
+        |(?P<escape>%.*)
+    )
+    |(?P<comment>\{[^}]*\}?)
+    |(?P<line_comment>;.*)
+    """, re.MULTILINE | re.VERBOSE)
+
+
 class GameNode(object):
 
     def __init__(self):
@@ -433,19 +493,19 @@ class Game(GameNode):
         Traverses the game in PGN order using the given *visitor*. Returns
         the visitor result.
         """
-        visitor.begin_game()
+        if visitor.begin_game() is not SKIP:
+            visitor.begin_headers()
+            for tagname, tagvalue in self.headers.items():
+                visitor.visit_header(tagname, tagvalue)
 
-        visitor.begin_headers()
-        for tagname, tagvalue in self.headers.items():
-            visitor.visit_header(tagname, tagvalue)
-        visitor.end_headers()
+            if visitor.end_headers() is not SKIP:
+                if self.comment:
+                    visitor.visit_comment(self.comment)
 
-        if self.comment:
-            visitor.visit_comment(self.comment)
+                super(Game, self).accept(visitor, _board=self.board())
 
-        super(Game, self).accept(visitor, _board=self.board())
+                visitor.visit_result(self.headers.get("Result", "*"))
 
-        visitor.visit_result(self.headers.get("Result", "*"))
         visitor.end_game()
         return visitor.result()
 
@@ -480,6 +540,44 @@ class Game(GameNode):
         game.errors = []
         return game
 
+    def __reduce__(self):
+        # Pickle the tree as flat columns in PGN order, because pickling
+        # nested variations recursively fails for long games.
+        parents = array.array("i")
+        moves = array.array("H")
+        annotations = {}
+
+        stack = [(0, self)]
+        while stack:
+            parent_index, node = stack.pop()
+            if node is not self:
+                parents.append(parent_index)
+                moves.append(node.move.packed())
+            index = len(moves)
+            if node.nags or node.starting_comment or node.comment:
+                annotations[index] = node.nags, node.starting_comment, node.comment
+            stack.extend((index, child) for child in reversed(node.variations))
+
+        return _unpickle_game, (type(self), self.headers, self.errors, parents, moves, annotations)
+
+
+def _unpickle_game(cls, headers, errors, parents, moves, annotations):
+    game = cls.without_tag_roster()
+    game.headers = headers
+    game.errors = errors
+
+    tree = [game]
+    for parent_index, packed in zip(parents, moves):
+        tree.append(tree[parent_index].add_variation(chess.Move.from_packed(packed)))
+
+    for index, (nags, starting_comment, comment) in annotations.items():
+        node = tree[index]
+        node.nags = nags
+        node.starting_comment = starting_comment
+        node.comment = comment
+
+    return game
+
 
 class BaseVisitor(object):
     """
@@ -492,7 +590,13 @@ class BaseVisitor(object):
     """
 
     def begin_game(self):
-        """Called at the start of a game."""
+        """
+        Called at the start of a game.
+
+        Return :data:`~chess.pgn.SKIP` to skip the game. Only
+        :func:`~chess.pgn.BaseVisitor.end_game()` and
+        :func:`~chess.pgn.BaseVisitor.result()` are called for it then.
+        """
         pass
 
     def begin_headers(self):
@@ -504,7 +608,13 @@ class BaseVisitor(object):
         pass
 
     def end_headers(self):
-        """Called at the end of the game headers."""
+        """
+        Called at the end of the game headers.
+
+        Return :data:`~chess.pgn.SKIP` to skip the movetext. The parsers then
+        search for the end of the game without parsing any moves, which is
+        much faster if only the headers are needed.
+        """
         pass
 
     def visit_move(self, board, move):
@@ -768,7 +878,7 @@ class FileExporter(StringExporter):
         return self.__repr__()
 
 
-def read_game(handle, Visitor=GameModelCreator):
+def read_game(handle, Visitor=GameModelCreator, trusted=False):
     """
     Reads a game from a file opened in text mode.
 
@@ -820,12 +930,15 @@ def read_game(handle, Visitor=GameModelCreator):
     The parser is relatively forgiving when it comes to errors. It skips over
     tokens it can not parse. Any exceptions are logged.
 
+    With *trusted* the moves are assumed to be legal, for example in PGNs
+    written by this module. The source square of a move is then found by
+    looking only at how the piece moves, and legal moves are generated only
+    if that is ambiguous (because of pins). The result for illegal moves is
+    undefined.
+
     Returns the parsed game or ``None`` if the end of file is reached.
     """
-    visitor = Visitor()
-
-    dummy_game = Game.without_tag_roster()
-    found_game = False
+    parser = _GameParser(Visitor, trusted)
 
     # Skip leading empty lines and comments.
     line = handle.readline()
@@ -842,36 +955,26 @@ def read_game(handle, Visitor=GameModelCreator):
         # Read header tags.
         tag_match = TAG_REGEX.match(line)
         if tag_match:
-            if not found_game:
-                found_game = True
-                visitor.begin_game()
-                visitor.begin_headers()
-
-            dummy_game.headers[tag_match.group(1)] = tag_match.group(2)
-            visitor.visit_header(tag_match.group(1), tag_match.group(2))
+            parser.visit_header(tag_match.group(1), tag_match.group(2))
         else:
             break
 
         line = handle.readline()
 
-    if found_game:
-        visitor.end_headers()
+    parser.end_headers()
 
     # Skip a single empty line after headers.
     if line.isspace():
         line = handle.readline()
 
-    # Movetext parser state.
-    try:
-        board_stack = [dummy_game.board()]
-    except ValueError as error:
-        visitor.handle_error(error)
-        board_stack = [chess.Board()]
-
     # Parse movetext.
     while line:
         read_next_line = True
 
+        if parser.skip:
+            _skip_movetext(handle, line)
+            break
+
         if line.startswith("%") or line.startswith(";"):
             # Ignore comments.
             line = handle.readline()
@@ -879,17 +982,12 @@ def read_game(handle, Visitor=GameModelCreator):
 
         # An empty line means the end of a game. But gracefully try to find
         # at least some content if we didn't even see headers so far.
-        if found_game and line.isspace():
-            visitor.end_game()
-            return visitor.result()
+        if parser.found_game and line.isspace():
+            return parser.end_game()
 
         for match in MOVETEXT_REGEX.finditer(line):
             token = match.group(0)
 
-            if not found_game:
-                found_game = True
-                visitor.begin_game()
-
             if token.startswith("{"):
                 # Consume until the end of the comment.
                 line = token[1:]
@@ -904,7 +1002,7 @@ def read_game(handle, Visitor=GameModelCreator):
                 else:
                     line = ""
 
-                visitor.visit_comment("\n".join(comment_lines).strip())
+                parser.visit_comment("\n".join(comment_lines).strip())
 
                 # Continue with the current or the next line.
                 if line:
@@ -912,60 +1010,391 @@ def read_game(handle, Visitor=GameModelCreator):
                 break
             elif token.startswith(";"):
                 break
-            elif token.startswith("$"):
-                # Found a NAG.
-                try:
-                    nag = int(token[1:])
-                except ValueError as error:
-                    visitor.handle_error(error)
-                else:
-                    visitor.visit_nag(nag)
-            elif token == "?":
-                visitor.visit_nag(NAG_MISTAKE)
-            elif token == "??":
-                visitor.visit_nag(NAG_BLUNDER)
-            elif token == "!":
-                visitor.visit_nag(NAG_GOOD_MOVE)
-            elif token == "!!":
-                visitor.visit_nag(NAG_BRILLIANT_MOVE)
-            elif token == "!?":
-                visitor.visit_nag(NAG_SPECULATIVE_MOVE)
-            elif token == "?!":
-                visitor.visit_nag(NAG_DUBIOUS_MOVE)
-            elif token == "(" and board_stack[-1].move_stack:
-                visitor.begin_variation()
-
-                board = board_stack[-1].copy()
-                board.pop()
-                board_stack.append(board)
-            elif token == ")" and len(board_stack) > 1:
-                # Always leave at least the root node on the stack.
-                visitor.end_variation()
-                board_stack.pop()
-            elif token in ["1-0", "0-1", "1/2-1/2", "*"] and len(board_stack) == 1:
-                visitor.visit_result(token)
             else:
-                # Replace zeros castling notation.
-                if token == "0-0":
-                    token = "O-O"
-                elif token == "0-0-0":
-                    token = "O-O-O"
-
-                # Parse SAN tokens.
-                try:
-                    move = board_stack[-1].parse_san(token)
-                except ValueError as error:
-                    visitor.handle_error(error)
-                else:
-                    visitor.visit_move(board_stack[-1], move)
-                    board_stack[-1].push(move)
+                parser.visit_token(token)
 
         if read_next_line:
             line = handle.readline()
 
-    if found_game:
-        visitor.end_game()
-        return visitor.result()
+    return parser.end_game()
+
+
+def _skip_movetext(handle, line):
+    # Consumes the lines up to the end of the game, only keeping track of
+    # comments.
+    in_comment = False
+
+    while line:
+        if not in_comment:
+            if line.isspace():
+                return
+            elif line.startswith("%"):
+                line = handle.readline()
+                continue
+
+        while line:
+            if in_comment:
+                end = line.find("}")
+                if end == -1:
+                    break
+                line = line[end + 1:]
+                in_comment = False
+            else:
+                start = line.find("{")
+                if start == -1 or -1 < line.find(";") < start:
+                    break
+                line = line[start + 1:]
+                in_comment = True
+
+        line = handle.readline()
+
+
+def read_games(handle, Visitor=GameModelCreator, block_size=DEFAULT_BLOCK_SIZE, trusted=False):
+    """
+    Reads all remaining games from a file opened in text mode, and yields
+    the visitor result for each of them.
+
+    Unlike :func:`~chess.pgn.read_game()`, which reads one line at a time,
+    the text is read in blocks of *block_size* characters and split into
+    tokens with a single regular expression per block, which takes less time
+    than splitting individual lines. The handle is exhausted, so do not
+    interleave reading it in other ways.
+
+    >>> import chess.pgn
+    >>>
+    >>> with open("data/pgn/kasparov-deep-blue-1997.pgn") as pgn:
+    ...     for game in chess.pgn.read_games(pgn):
+    ...         print(game.headers["Result"])
+    ...
+    1-0
+    1-0
+    1/2-1/2
+    1/2-1/2
+    1/2-1/2
+    1-0
+
+    Games end at an empty line (outside of comments) or the end of the file,
+    just like with :func:`~chess.pgn.read_game()`. A header tag after the
+    movetext also starts a new game. See :func:`~chess.pgn.read_game()` for
+    *trusted*.
+    """
+    parser = None
+    in_headers = False
+    san_patterns = {}
+
+    for kind, match in _tokenize_blocks(handle, block_size, lambda: parser is not None and parser.skip):
+        if kind == "tag":
+            if parser is not None and not in_headers:
+                yield parser.end_game()
+                parser = None
+
+            if parser is None:
+                parser = _GameParser(Visitor, trusted, san_patterns)
+                in_headers = True
+
+            parser.visit_header(match.group("tagname"), match.group("tagvalue"))
+        elif kind == "empty":
+            if parser is None:
+                continue
+            elif in_headers:
+                # Skip a single empty line after headers.
+                parser.end_headers()
+                in_headers = False
+            else:
+                # An empty line means the end of a game.
+                yield parser.end_game()
+                parser = None
+        elif kind == "escape" or kind == "line_comment":
+            continue
+        else:
+            if parser is None:
+                parser = _GameParser(Visitor, trusted, san_patterns)
+                in_headers = True
+            if in_headers:
+                parser.end_headers()
+                in_headers = False
+
+            if parser.skip:
+                continue
+            elif kind == "comment":
+                comment = match.group(0)[1:]
+                if comment.endswith("}"):
+                    comment = comment[:-1]
+                parser.visit_comment("\n".join(line.rstrip() for line in comment.split("\n")).strip())
+            else:
+                parser.visit_token(match.group(0))
+
+    if parser is not None:
+        if in_headers:
+            parser.end_headers()
+        yield parser.end_game()
+
+
+def _tokenize_blocks(handle, block_size, skipping=lambda: False):
+    # Yields the kind and match of each token. Only complete lines are
+    # tokenized, except at the end of the file, and comments are not split.
+    # While skipping() is true, movetext tokens are passed over.
+    buf = ""
+    eof = False
+
+    while not eof:
+        block = handle.read(block_size)
+        eof = not block
+        buf += block
+
+        if eof:
+            end = endpos = len(buf)
+        else:
+            # Tokenize up to the last newline. It is included, so that an
+            # empty line before it is found, but also kept for the next
+            # block, so that an empty line after it is found.
+            end = buf.rfind("\n")
+            if end <= 0:
+                continue
+            endpos = end + 1
+
+        pos = 0
+        while pos is not None:
+            skip = skipping()
+            regex = _BLOCK_SKIP_REGEX if skip else _BLOCK_TOKEN_REGEX
+            start, pos = pos, None
+            for match in regex.finditer(buf, start, endpos):
+                kind = match.lastgroup
+                if kind == "comment" and not eof and not match.group(0).endswith("}"):
+                    # Continue the comment with the next block.
+                    rest = match.start()
+                    break
+                yield kind, match
+                if skipping() != skip:
+                    # Continue with the other regular expression.
+                    pos = match.end()
+                    break
+            else:
+                rest = end
+
+        buf = buf[rest:]
+
+
+def read_games_parallel(path, Visitor=GameModelCreator, processes=None, ordered=True, chunk_size=1024 * 1024, encoding="utf-8-sig", trusted=False):
+    """
+    Like :func:`~chess.pgn.read_games()`, but parses the PGN file at *path*
+    in a pool of *processes* (defaults to the number of CPUs).
+
+    The file is split into ranges of *chunk_size* bytes without reading it.
+    Each worker moves both ends of its range forward to the next line that
+    starts with an ``[Event`` tag, and then reads, decodes (with
+    *encoding*) and parses the games in between. Visitor results are
+    yielded as soon as a range is parsed, in the order of the file unless
+    *ordered* is ``False``. They are sent between processes, so they have
+    to be picklable. See :func:`~chess.pgn.read_game()` for *trusted*.
+    """
+    read_range = functools.partial(_read_range, path, Visitor, encoding, trusted)
+
+    size = os.path.getsize(path)
+    ranges = [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        imap = pool.imap if ordered else pool.imap_unordered
+        for results in imap(read_range, ranges):
+            for result in results:
+                yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _seek_event(handle, pos):
+    # Returns the offset of the first line at or after pos that starts with
+    # an Event tag, or the end of the file. The start of the file is always a
+    # boundary.
+    if pos == 0:
+        return 0
+
+    handle.seek(pos - 1)
+    pos += len(handle.readline()) - 1
+
+    while True:
+        line = handle.readline()
+        if not line or line.startswith(b"[Event "):
+            return pos
+        pos += len(line)
+
+
+def _scan_games(handle, pos=0):
+    # Yields the byte offset and the header tag lines of each game in a file
+    # opened in binary mode, starting at pos. A game starts with a header tag
+    # line that does not follow another one (like in read_games()). Comments
+    # are tracked like in scan_offsets().
+    handle.seek(pos)
+    if pos == 0 and handle.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8:
+        pos = len(codecs.BOM_UTF8)
+    handle.seek(pos)
+
+    in_comment = False
+    in_headers = False
+    start = None
+    tags = []
+
+    for line in handle:
+        if in_comment:
+            in_headers = False
+            if b"}" in line:
+                in_comment = line.rfind(b"{") > line.rfind(b"}")
+        elif line.startswith(b"["):
+            if not in_headers:
+                if start is not None:
+                    yield start, tags
+                start, tags = pos, []
+                in_headers = True
+            tags.append(line)
+        elif not line.startswith(b"%"):
+            in_headers = False
+            if b"{" in line:
+                in_comment = line.rfind(b"{") > line.rfind(b"}")
+
+        pos += len(line)
+
+    if start is not None:
+        yield start, tags
+
+
+def _read_range(path, Visitor, encoding, trusted, byte_range):
+    with io.open(path, "rb") as handle:
+        start = _seek_event(handle, byte_range[0])
+        end = _seek_event(handle, byte_range[1])
+        if start >= end:
+            return []
+
+        handle.seek(start)
+        text = handle.read(end - start).decode(encoding)
+    return list(read_games(io.StringIO(text), Visitor, trusted=trusted))
+
+
+class _GameParser(object):
+    # Feeds the tokens of a single game to a visitor, keeping track of the
+    # boards of the main line and the open variations. In trusted mode the
+    # SAN patterns are cached in san_patterns, which may be shared between
+    # games.
+
+    def __init__(self, Visitor, trusted=False, san_patterns=None):
+        self.visitor = Visitor()
+        self.trusted = trusted
+        self.san_patterns = {} if san_patterns is None else san_patterns
+        self.dummy_game = Game.without_tag_roster()
+        self.found_game = False
+        self.skip = False
+        self.board_stack = None
+
+    def begin_game(self):
+        if not self.found_game:
+            self.found_game = True
+            self.skip = self.visitor.begin_game() is SKIP
+
+    def visit_header(self, tagname, tagvalue):
+        if not self.found_game:
+            self.begin_game()
+            if not self.skip:
+                self.visitor.begin_headers()
+
+        if not self.skip:
+            self.dummy_game.headers[tagname] = tagvalue
+            self.visitor.visit_header(tagname, tagvalue)
+
+    def end_headers(self):
+        if self.skip:
+            return
+        elif self.found_game:
+            self.skip = self.visitor.end_headers() is SKIP
+            if self.skip:
+                return
+
+        try:
+            self.board_stack = [self.dummy_game.board()]
+        except ValueError as error:
+            self.visitor.handle_error(error)
+            self.board_stack = [chess.Board()]
+
+    def visit_comment(self, comment):
+        self.begin_game()
+        if not self.skip:
+            self.visitor.visit_comment(comment)
+
+    def visit_token(self, token):
+        self.begin_game()
+        if self.skip:
+            return
+
+        visitor = self.visitor
+        board_stack = self.board_stack
+
+        if token.startswith("$"):
+            # Found a NAG.
+            try:
+                nag = int(token[1:])
+            except ValueError as error:
+                visitor.handle_error(error)
+            else:
+                visitor.visit_nag(nag)
+        elif token == "?":
+            visitor.visit_nag(NAG_MISTAKE)
+        elif token == "??":
+            visitor.visit_nag(NAG_BLUNDER)
+        elif token == "!":
+            visitor.visit_nag(NAG_GOOD_MOVE)
+        elif token == "!!":
+            visitor.visit_nag(NAG_BRILLIANT_MOVE)
+        elif token == "!?":
+            visitor.visit_nag(NAG_SPECULATIVE_MOVE)
+        elif token == "?!":
+            visitor.visit_nag(NAG_DUBIOUS_MOVE)
+        elif token == "(" and board_stack[-1].move_stack:
+            visitor.begin_variation()
+
+            board = board_stack[-1].copy()
+            board.pop()
+            board_stack.append(board)
+        elif token == ")" and len(board_stack) > 1:
+            # Always leave at least the root node on the stack.
+            visitor.end_variation()
+            board_stack.pop()
+        elif token in ["1-0", "0-1", "1/2-1/2", "*"] and len(board_stack) == 1:
+            visitor.visit_result(token)
+        else:
+            # Replace zeros castling notation.
+            if token == "0-0":
+                token = "O-O"
+            elif token == "0-0-0":
+                token = "O-O-O"
+
+            # Parse SAN tokens.
+            try:
+                if self.trusted:
+                    move = self._parse_trusted_san(board_stack[-1], token)
+                else:
+                    move = board_stack[-1].parse_san(token)
+            except ValueError as error:
+                visitor.handle_error(error)
+            else:
+                visitor.visit_move(board_stack[-1], move)
+                board_stack[-1].push(move)
+
+    def _parse_trusted_san(self, board, san):
+        try:
+            pattern = self.san_patterns[san]
+        except KeyError:
+            pattern = self.san_patterns[san] = chess._parse_san_pattern(san)
+
+        if pattern:
+            return board._match_trusted_san(san, *pattern)
+        else:
+            # Castling, drops, null moves and errors.
+            return board.parse_san(san)
+
+    def end_game(self):
+        if self.found_game:
+            self.visitor.end_game()
+            return self.visitor.result()
 
 
 def scan_headers(handle):
@@ -1079,3 +1508,274 @@ def scan_offsets(handle):
 
         last_pos = handle.tell()
         line = handle.readline()
+
+
+_INDEX_MAGIC = b"PGNI"
+_INDEX_VERSION = 2
+_INDEX_HEADER = struct.Struct("<4sHQQdI")
+_INDEX_CHUNK_SIZE = 1 << 20
+
+
+class PgnIndex(object):
+    """
+    An index of the games in a PGN file with their byte offsets, lengths and
+    the values of selected header tags, stored in a sidecar file. Use
+    :func:`~chess.pgn.open_index()` to load or create one.
+
+    Games are numbered from 0 in the order of the file and read with
+    :func:`~chess.pgn.PgnIndex.read_game()`, which only seeks to the game.
+    :func:`~chess.pgn.PgnIndex.find()` returns the numbers of all games with
+    a given header value.
+
+    The sidecar file stores each column separately, with header values as
+    indexes into a table of distinct values. It also records the
+    modification time of the PGN file and a CRC-32 checksum of the indexed
+    part. If the modification time changed,
+    :func:`~chess.pgn.PgnIndex.refresh()` verifies the checksum. When games
+    were only appended, it scans just the new part (starting at the last
+    indexed game, in case it was not complete yet). If the PGN file was
+    changed in any other way, the index is rebuilt.
+    """
+
+    def __init__(self, path, index_path=None, tagnames=DEFAULT_INDEX_TAGS, encoding="utf-8-sig"):
+        self.path = path
+        self.index_path = index_path or path + ".idx"
+        self.tagnames = list(tagnames)
+        self.encoding = encoding
+        self._clear()
+
+        try:
+            with open(self.index_path, "rb") as handle:
+                self._load(handle)
+        except (IOError, OSError, EOFError, ValueError, struct.error):
+            self._clear()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def offset(self, index):
+        """Gets the byte offset of a game."""
+        return self._offsets[index]
+
+    def length(self, index):
+        """Gets the length of a game in bytes."""
+        end = self._offsets[index + 1] if index + 1 < len(self._offsets) else self.size
+        return end - self._offsets[index]
+
+    def headers(self, index):
+        """Gets the indexed header tags of a game, if present."""
+        headers = collections.OrderedDict()
+        for tagname, column in zip(self.tagnames, self._columns):
+            value = column.get(index)
+            if value is not None:
+                headers[tagname] = value
+        return headers
+
+    def find(self, tagname, value):
+        """
+        Gets the numbers of all games where the indexed header tag *tagname*
+        has the given *value*.
+        """
+        return self._columns[self.tagnames.index(tagname)].find(value)
+
+    def read_game(self, index, Visitor=GameModelCreator):
+        """Reads a game, like :func:`~chess.pgn.read_game()`."""
+        with io.open(self.path, "rb") as handle:
+            handle.seek(self._offsets[index])
+            text = handle.read(self.length(index)).decode(self.encoding)
+        return read_game(io.StringIO(text), Visitor=Visitor)
+
+    def refresh(self):
+        """
+        Indexes the games that were added to the PGN file and saves the
+        sidecar file if anything changed.
+
+        Returns the number of new games.
+        """
+        with io.open(self.path, "rb") as handle:
+            stat = os.fstat(handle.fileno())
+            if stat.st_size == self.size and stat.st_mtime == self.mtime:
+                return 0
+            elif stat.st_size < self.size or _checksum(handle, 0, self.size) != self.checksum:
+                self._clear()
+
+            count = len(self._offsets)
+            pos = 0
+            if count:
+                # Rescan the last game, which may have been incomplete.
+                pos = self._offsets[-1]
+                self._truncate(count - 1)
+
+            for offset, tags in _scan_games(handle, pos):
+                self._append(offset, tags)
+
+            size = handle.tell()
+            self.checksum = _checksum(handle, self.size, size, self.checksum)
+            self.size = size
+            self.mtime = stat.st_mtime
+
+        self.save()
+        return len(self._offsets) - count
+
+    def save(self):
+        """Writes the sidecar file."""
+        with open(self.index_path, "wb") as handle:
+            handle.write(_INDEX_HEADER.pack(_INDEX_MAGIC, _INDEX_VERSION, self.size, len(self._offsets), self.mtime, self.checksum))
+            _write_strings(handle, self.tagnames)
+            _write_integers(handle, "Q", self._offsets)
+            for column in self._columns:
+                column.write(handle)
+
+    def _load(self, handle):
+        magic, version, size, count, mtime, checksum = _INDEX_HEADER.unpack(handle.read(_INDEX_HEADER.size))
+        if magic != _INDEX_MAGIC or version != _INDEX_VERSION:
+            raise ValueError("invalid pgn index: {0}".format(self.index_path))
+
+        if _read_strings(handle) != self.tagnames:
+            raise ValueError("pgn index has different tags: {0}".format(self.index_path))
+
+        offsets = _read_integers(handle, "Q", count)
+        columns = [_IndexColumn() for _ in self.tagnames]
+        for column in columns:
+            column.read(handle, count)
+
+        self.size = size
+        self.mtime = mtime
+        self.checksum = checksum
+        self._offsets = offsets
+        self._columns = columns
+
+    def _clear(self):
+        self.size = 0
+        self.mtime = 0.0
+        self.checksum = 0
+        self._offsets = []
+        self._columns = [_IndexColumn() for _ in self.tagnames]
+
+    def _truncate(self, count):
+        del self._offsets[count:]
+        for column in self._columns:
+            column.truncate(count)
+
+    def _append(self, offset, tags):
+        values = {}
+        for line in tags:
+            match = TAG_REGEX.match(line.decode(self.encoding, "replace"))
+            if match:
+                values[match.group(1)] = match.group(2)
+
+        self._offsets.append(offset)
+        for tagname, column in zip(self.tagnames, self._columns):
+            column.append(values.get(tagname))
+
+
+class _IndexColumn(object):
+    # The values of a header tag, stored as indexes into a table of distinct
+    # values. Index 0 stands for a missing tag.
+
+    def __init__(self):
+        self.values = [None]
+        self.lookup = {None: 0}
+        self.codes = array.array("I")
+        self.games = None
+
+    def get(self, index):
+        return self.values[self.codes[index]]
+
+    def find(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            return []
+
+        if self.games is None:
+            # The game numbers for each code, built on first use.
+            self.games = collections.defaultdict(list)
+            for index, other in enumerate(self.codes):
+                self.games[other].append(index)
+
+        return list(self.games.get(code, ()))
+
+    def append(self, value):
+        try:
+            code = self.lookup[value]
+        except KeyError:
+            code = self.lookup[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+        self.games = None
+
+    def truncate(self, count):
+        del self.codes[count:]
+        self.games = None
+
+    def write(self, handle):
+        _write_strings(handle, self.values[1:])
+        _write_integers(handle, "I", self.codes)
+
+    def read(self, handle, count):
+        self.values = [None] + _read_strings(handle)
+        self.lookup = dict((value, code) for code, value in enumerate(self.values))
+        self.codes = array.array("I", _read_integers(handle, "I", count))
+        self.games = None
+
+
+def open_index(path, index_path=None, tagnames=DEFAULT_INDEX_TAGS, encoding="utf-8-sig"):
+    """
+    Opens the :class:`~chess.pgn.PgnIndex` of the PGN file at *path*.
+
+    The index is loaded from the sidecar file *index_path* (defaults to
+    *path* with ``.idx`` appended) and refreshed, or built and saved if it
+    does not exist yet or was built for different *tagnames*.
+    """
+    index = PgnIndex(path, index_path, tagnames, encoding)
+    index.refresh()
+    return index
+
+
+def _checksum(handle, start, end, checksum=0):
+    # CRC-32 of the given part of the file, continuing from a previous
+    # checksum.
+    handle.seek(start)
+    while start < end:
+        chunk = handle.read(min(_INDEX_CHUNK_SIZE, end - start))
+        if not chunk:
+            break
+        checksum = zlib.crc32(chunk, checksum) & 0xffffffff
+        start += len(chunk)
+    return checksum
+
+
+def _write_integers(handle, format, values):
+    # Integers are stored little endian with the standard size of the struct
+    # format, independent of the platform.
+    handle.write(struct.pack("<{0}{1}".format(len(values), format), *values))
+
+
+def _read_integers(handle, format, count):
+    size = struct.calcsize("<{0}{1}".format(count, format))
+    blob = handle.read(size)
+    if len(blob) != size:
+        raise EOFError("truncated pgn index")
+    return list(struct.unpack("<{0}{1}".format(count, format), blob))
+
+
+def _write_strings(handle, strings):
+    encoded = [string.encode("utf-8") for string in strings]
+    _write_integers(handle, "I", [len(encoded)])
+    _write_integers(handle, "I", [len(string) for string in encoded])
+    handle.write(b"".join(encoded))
+
+
+def _read_strings(handle):
+    count, = _read_integers(handle, "I", 1)
+    lengths = _read_integers(handle, "I", count)
+    blob = handle.read(sum(lengths))
+    if len(blob) != sum(lengths):
+        raise EOFError("truncated pgn index")
+
+    strings = []
+    pos = 0
+    for length in lengths:
+        strings.append(blob[pos:pos + length].decode("utf-8"))
+        pos += length
+    return strings
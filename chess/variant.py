@@ -16,9 +16,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
+import array
 import chess
 import copy
 import itertools
+import struct
 
 
 class SuicideBoard(chess.Board):
@@ -53,9 +55,15 @@ class SuicideBoard(chess.Board):
     def is_into_check(self, move):
         return False
 
+    def gives_check(self, move):
+        return False
+
     def was_into_check(self):
         return False
 
+    def _lookahead_check(self, move):
+        return self._lookahead_check_by_push(move)
+
     def _material_balance(self):
         return (chess.popcount(self.occupied_co[self.turn]) -
                 chess.popcount(self.occupied_co[not self.turn]))
@@ -121,7 +129,7 @@ class SuicideBoard(chess.Board):
         for move in super(SuicideBoard, self).generate_pseudo_legal_moves(from_mask, to_mask):
             # Add king promotions.
             if move.promotion == chess.QUEEN:
-                yield chess.Move(move.from_square, move.to_square, chess.KING)
+                yield chess._interned_move(move.from_square, move.to_square, chess.KING)
 
             yield move
 
@@ -143,6 +151,15 @@ class SuicideBoard(chess.Board):
                 if not self.is_en_passant(move):
                     yield move
 
+    def _count_legal_moves(self, from_mask=chess.BB_ALL, to_mask=chess.BB_ALL):
+        return sum(1 for _ in self.generate_legal_moves(from_mask, to_mask))
+
+    def generate_legal_moves_packed(self, from_mask=chess.BB_ALL, to_mask=chess.BB_ALL):
+        return array.array("H", [move.packed() for move in self.generate_legal_moves(from_mask, to_mask)])
+
+    def generate_pseudo_legal_moves_packed(self, from_mask=chess.BB_ALL, to_mask=chess.BB_ALL):
+        return array.array("H", [move.packed() for move in self.generate_pseudo_legal_moves(from_mask, to_mask)])
+
     def is_legal(self, move):
         if not super(SuicideBoard, self).is_legal(move):
             return False
@@ -250,7 +267,8 @@ class AtomicBoard(chess.Board):
         for enemy_king in chess.scan_forward(enemy_kings):
             path &= ~chess.BB_KING_ATTACKS[enemy_king]
 
-        return super(AtomicBoard, self)._attacked_for_king(path, occupied)
+        # The king may be attacked, so attacks through it must be found.
+        return any(self._attackers_mask(not self.turn, sq, occupied) for sq in chess.scan_reversed(path))
 
     def _castling_uncovers_rank_attack(self, rook_bb, king_to):
         return (not chess.BB_KING_ATTACKS[king_to] & self.kings & self.occupied_co[not self.turn] and
@@ -285,6 +303,16 @@ class AtomicBoard(chess.Board):
         self.pop()
         return was_into_check
 
+    def gives_check(self, move):
+        self.push(move)
+        try:
+            return self.is_check()
+        finally:
+            self.pop()
+
+    def _lookahead_check(self, move):
+        return self._lookahead_check_by_push(move)
+
     def is_legal(self, move):
         if self.is_variant_end():
             return False
@@ -306,6 +334,12 @@ class AtomicBoard(chess.Board):
             if self.is_legal(move):
                 yield move
 
+    def _count_legal_moves(self, from_mask=chess.BB_ALL, to_mask=chess.BB_ALL):
+        return sum(1 for _ in self.generate_legal_moves(from_mask, to_mask))
+
+    def generate_legal_moves_packed(self, from_mask=chess.BB_ALL, to_mask=chess.BB_ALL):
+        return array.array("H", [move.packed() for move in self.generate_legal_moves(from_mask, to_mask)])
+
     def status(self):
         status = super(AtomicBoard, self).status()
         status &= ~chess.STATUS_OPPOSITE_CHECK
@@ -326,6 +360,9 @@ class KingOfTheHillBoard(chess.Board):
     tbw_suffix = tbz_suffix = None
     tbw_magic = tbz_magic = None
 
+    def _lookahead_check(self, move):
+        return self._lookahead_check_by_push(move)
+
     def is_variant_end(self):
         return self.kings & BB_HILL
 
@@ -354,20 +391,23 @@ class RacingKingsBoard(chess.Board):
     def reset(self):
         self.set_fen(type(self).starting_fen)
 
-    def _gives_check(self, move):
-        self.push(move)
-        gives_check = self.is_check()
-        self.pop()
-        return gives_check
-
     def is_legal(self, move):
-        return super(RacingKingsBoard, self).is_legal(move) and not self._gives_check(move)
+        return super(RacingKingsBoard, self).is_legal(move) and not self.gives_check(move)
 
     def generate_legal_moves(self, from_mask=chess.BB_ALL, to_mask=chess.BB_ALL):
         for move in super(RacingKingsBoard, self).generate_legal_moves(from_mask, to_mask):
-            if not self._gives_check(move):
+            if not self.gives_check(move):
                 yield move
 
+    def _count_legal_moves(self, from_mask=chess.BB_ALL, to_mask=chess.BB_ALL):
+        return sum(1 for _ in self.generate_legal_moves(from_mask, to_mask))
+
+    def generate_legal_moves_packed(self, from_mask=chess.BB_ALL, to_mask=chess.BB_ALL):
+        return array.array("H", [move.packed() for move in self.generate_legal_moves(from_mask, to_mask)])
+
+    def _lookahead_check(self, move):
+        return self._lookahead_check_by_push(move)
+
     def is_variant_end(self):
         if not self.kings & chess.BB_RANK_8:
             return False
@@ -435,6 +475,9 @@ class HordeBoard(chess.Board):
     def reset(self):
         self.set_fen(type(self).starting_fen)
 
+    def _lookahead_check(self, move):
+        return self._lookahead_check_by_push(move)
+
     def is_variant_end(self):
         return not all(has_pieces for has_pieces in self.occupied_co)
 
@@ -467,6 +510,9 @@ class HordeBoard(chess.Board):
         return status
 
 
+# Remaining checks of white and black.
+_THREE_CHECK_BYTES = struct.Struct(">bb")
+
 class ThreeCheckBoard(chess.Board):
 
     aliases = ["Three-check", "Three check", "Threecheck", "Three check chess"]
@@ -558,6 +604,23 @@ class ThreeCheckBoard(chess.Board):
             epd.append(self._epd_operations(operations))
         return " ".join(epd)
 
+    def to_bytes(self):
+        return super(ThreeCheckBoard, self).to_bytes() + _THREE_CHECK_BYTES.pack(
+            self.remaining_checks[chess.WHITE], self.remaining_checks[chess.BLACK])
+
+    def _set_bytes(self, data):
+        offset = super(ThreeCheckBoard, self)._set_bytes(data)
+        try:
+            wc, bc = _THREE_CHECK_BYTES.unpack_from(data, offset)
+        except struct.error:
+            raise ValueError("three-check position data too short: {0} bytes".format(len(data)))
+        self.remaining_checks[chess.WHITE] = wc
+        self.remaining_checks[chess.BLACK] = bc
+        return offset + _THREE_CHECK_BYTES.size
+
+    def _lookahead_check(self, move):
+        return self._lookahead_check_by_push(move)
+
     def is_variant_end(self):
         return any(remaining_checks <= 0 for remaining_checks in self.remaining_checks)
 
@@ -583,6 +646,13 @@ class ThreeCheckBoard(chess.Board):
         return (super(ThreeCheckBoard, self)._transposition_key(),
                 self.remaining_checks[chess.WHITE], self.remaining_checks[chess.BLACK])
 
+    def _transposition_hash(self):
+        return (super(ThreeCheckBoard, self)._transposition_hash() ^
+                hash((self.remaining_checks[chess.WHITE], self.remaining_checks[chess.BLACK])))
+
+    def _variant_state(self):
+        return self.remaining_checks[chess.WHITE], self.remaining_checks[chess.BLACK]
+
     def copy(self, stack=True):
         board = super(ThreeCheckBoard, self).copy(stack=stack)
         board.remaining_checks[chess.WHITE] = self.remaining_checks[chess.WHITE]
@@ -590,6 +660,10 @@ class ThreeCheckBoard(chess.Board):
         return board
 
 
+# Promoted pieces, then the number of pieces of each type in the white and
+# black pocket.
+_CRAZYHOUSE_BYTES = struct.Struct(">Q12B")
+
 class CrazyhousePocket(object):
 
     def __init__(self, symbols=""):
@@ -632,6 +706,8 @@ class CrazyhouseBoard(chess.Board):
     tbw_suffix = tbz_suffix = None
     tbw_magic = tbz_magic = None
 
+    _halfmove_clock_draws = False
+
     def __init__(self, fen=starting_fen, chess960=False):
         self.pockets = [CrazyhousePocket(), CrazyhousePocket()]
         super(CrazyhouseBoard, self).__init__(fen, chess960=chess960)
@@ -647,11 +723,11 @@ class CrazyhouseBoard(chess.Board):
         self.pockets[chess.BLACK].reset()
 
     def push(self, move):
-        if move.drop:
-            self.pockets[self.turn].remove(move.drop)
-
         super(CrazyhouseBoard, self).push(move)
 
+        if move.drop:
+            self.pockets[not self.turn].remove(move.drop)
+
     def pop(self):
         move = super(CrazyhouseBoard, self).pop()
         if move.drop:
@@ -669,12 +745,6 @@ class CrazyhouseBoard(chess.Board):
         else:
             self.pockets[self.turn].add(piece_type)
 
-    def can_claim_fifty_moves(self):
-        return False
-
-    def is_seventyfive_moves(self):
-        return False
-
     def is_irreversible(self, move):
         backrank = chess.BB_RANK_1 if self.turn == chess.WHITE else chess.BB_RANK_8
         castling_rights = self.clean_castling_rights() & backrank
@@ -686,13 +756,23 @@ class CrazyhouseBoard(chess.Board):
         return (super(CrazyhouseBoard, self)._transposition_key(),
                 str(self.pockets[chess.WHITE]), str(self.pockets[chess.BLACK]))
 
+    def _transposition_hash(self):
+        return (super(CrazyhouseBoard, self)._transposition_hash() ^
+                hash(tuple(pocket.count(pt) for pocket in self.pockets for pt in chess.PIECE_TYPES)))
+
+    def _variant_state(self):
+        return tuple(pocket.count(pt) for pocket in self.pockets for pt in chess.PIECE_TYPES)
+
+    def _repetition_window(self):
+        # Captured pieces can be dropped again, so positions can repeat
+        # across captures.
+        return self._stack_length()
+
     def legal_drop_squares_mask(self):
-        king = self.king(self.turn)
+        _, king, _, king_attackers = self._get_check_info()
         if king is None:
             return ~self.occupied
 
-        king_attackers = self.attackers_mask(not self.turn, king)
-
         if not king_attackers:
             return ~self.occupied
         elif chess.popcount(king_attackers) == 1:
@@ -728,7 +808,7 @@ class CrazyhouseBoard(chess.Board):
         for to_square in chess.scan_forward(to_mask & ~self.occupied):
             for pt, count in self.pockets[self.turn].pieces.items():
                 if count and (pt != chess.PAWN or not chess.BB_BACKRANKS & chess.BB_SQUARES[to_square]):
-                    yield chess.Move(to_square, to_square, drop=pt)
+                    yield chess._interned_move(to_square, to_square, drop=pt)
 
     def generate_legal_drops(self, to_mask=chess.BB_ALL):
         return self.generate_pseudo_legal_drops(to_mask=self.legal_drop_squares_mask() & to_mask)
@@ -738,6 +818,27 @@ class CrazyhouseBoard(chess.Board):
             super(CrazyhouseBoard, self).generate_legal_moves(from_mask, to_mask),
             self.generate_legal_drops(from_mask & to_mask))
 
+    def generate_legal_moves_packed(self, from_mask=chess.BB_ALL, to_mask=chess.BB_ALL):
+        moves = super(CrazyhouseBoard, self).generate_legal_moves_packed(from_mask, to_mask)
+
+        drop_mask = self.legal_drop_squares_mask() & from_mask & to_mask
+        for to_square in chess.scan_forward(drop_mask & ~self.occupied):
+            for pt, pocket_count in self.pockets[self.turn].pieces.items():
+                if pocket_count and (pt != chess.PAWN or not chess.BB_BACKRANKS & chess.BB_SQUARES[to_square]):
+                    moves.append(pt << 12 | to_square << 6 | to_square)
+
+        return moves
+
+    def _count_legal_moves(self, from_mask=chess.BB_ALL, to_mask=chess.BB_ALL):
+        count = super(CrazyhouseBoard, self)._count_legal_moves(from_mask, to_mask)
+
+        drop_mask = self.legal_drop_squares_mask() & from_mask & to_mask & ~self.occupied
+        for pt, pocket_count in self.pockets[self.turn].pieces.items():
+            if pocket_count:
+                count += chess.popcount(drop_mask & ~chess.BB_BACKRANKS if pt == chess.PAWN else drop_mask)
+
+        return count
+
     def parse_san(self, san):
         if "@" in san:
             uci = san.rstrip("+# ")
@@ -787,6 +888,29 @@ class CrazyhouseBoard(chess.Board):
         board_part, info_part = epd.split(" ", 1)
         return "%s[%s%s] %s" % (board_part, str(self.pockets[chess.WHITE]).upper(), str(self.pockets[chess.BLACK]), info_part)
 
+    def to_bytes(self):
+        return super(CrazyhouseBoard, self).to_bytes() + _CRAZYHOUSE_BYTES.pack(
+            self.promoted,
+            *[self.pockets[color].count(pt) for color in chess.COLORS for pt in chess.PIECE_TYPES])
+
+    def _set_bytes(self, data):
+        offset = super(CrazyhouseBoard, self)._set_bytes(data)
+        try:
+            values = _CRAZYHOUSE_BYTES.unpack_from(data, offset)
+        except struct.error:
+            raise ValueError("crazyhouse position data too short: {0} bytes".format(len(data)))
+
+        self.promoted = values[0] & self.occupied
+        for i, color in enumerate(chess.COLORS):
+            pocket = CrazyhousePocket()
+            for j, pt in enumerate(chess.PIECE_TYPES):
+                count = values[1 + i * len(chess.PIECE_TYPES) + j]
+                if count:
+                    pocket.pieces[pt] = count
+            self.pockets[color] = pocket
+
+        return offset + _CRAZYHOUSE_BYTES.size
+
     def copy(self, stack=True):
         board = super(CrazyhouseBoard, self).copy(stack=stack)
         board.pockets[chess.WHITE] = self.pockets[chess.WHITE].copy()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measure the time to import chess in a fresh interpreter, for example to
+guard against startup regressions. Exits with status 1 if the fastest run
+exceeds --max-ms.
+"""
+
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+SNIPPET = "import time; start = time.time(); import chess; print(time.time() - start)"
+
+
+def import_time(python, module_path):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [module_path, env.get("PYTHONPATH")]))
+    output = subprocess.check_output([python, "-c", SNIPPET], env=env)
+    return float(output.decode("ascii").strip()) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--runs", type=int, default=10, help="number of fresh interpreters")
+    parser.add_argument("--max-ms", type=float, help="fail if the fastest import takes longer")
+    parser.add_argument("--python", default=sys.executable, help="interpreter to measure")
+    args = parser.parse_args()
+
+    module_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+    # Warm up the bytecode cache.
+    import_time(args.python, module_path)
+
+    timings = sorted(import_time(args.python, module_path) for _ in range(args.runs))
+    print("import chess: min {0:.1f} ms, median {1:.1f} ms".format(timings[0], timings[len(timings) // 2]))
+
+    if args.max_ms is not None and timings[0] > args.max_ms:
+        print("slower than {0:.1f} ms".format(args.max_ms))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
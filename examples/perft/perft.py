@@ -9,49 +9,14 @@ from __future__ import division
 from __future__ import print_function
 
 import chess
+import chess.perft
 import chess.variant
 import multiprocessing
-import functools
 import time
 import argparse
 import sys
 
 
-def perft(depth, board):
-    if depth < 1:
-        return 1
-    elif depth > 1:
-        count = 0
-
-        for move in board.legal_moves:
-            board.push(move)
-            count += perft(depth - 1, board)
-            board.pop()
-
-        return count
-    elif depth == 1:
-        return board.legal_moves.count()
-    else:
-        return 1
-
-
-def parallel_perft(pool, depth, board):
-    if depth < 1:
-        return 1
-    elif depth > 1:
-        def successors(board):
-            for move in board.legal_moves:
-                board_after = board.copy(stack=False)
-                board_after.push(move)
-                yield board_after
-
-        return sum(pool.imap_unordered(functools.partial(perft, depth - 1), successors(board)))
-    elif depth == 1:
-        return board.legal_moves.count()
-    else:
-        return 1
-
-
 def sdiv(a, b):
     try:
         return a / b
@@ -92,10 +57,8 @@ def main(perft_file, VariantBoard, perft_f, max_depth, max_nodes):
                 print()
                 print(board)
                 print()
-                for move in sorted(board.legal_moves, key=lambda m: m.uci()):
-                    board.push(move)
-                    print("%s: %d" % (move, perft_f(depth - 1, board)))
-                    board.pop()
+                for move, nodes in sorted(chess.perft.divide(board, depth), key=lambda item: item[0].uci()):
+                    print("%s: %d" % (move, nodes))
                 sys.exit(1)
 
             total_nodes += perft_nodes
@@ -125,15 +88,23 @@ if __name__ == "__main__":
     parser.add_argument("-v", "--variant", default="standard",
         help="Use a non-standard chess variant")
     parser.add_argument("-t", "--threads", type=int, help="Number of threads")
+    parser.add_argument("--hash", action="store_true",
+        help="Reuse counts of transpositions")
 
     args = parser.parse_args()
     VariantBoard = chess.variant.find_variant(args.variant)
 
     if args.threads == 1:
-        perft_f = perft
+        hash_table = {} if args.hash else None
+
+        def perft_f(depth, board):
+            return chess.perft.perft(board, depth, hash_table)
     else:
-        pool = multiprocessing.Pool(args.threads)
-        perft_f = functools.partial(parallel_perft, pool)
+        processes = args.threads or multiprocessing.cpu_count()
+        pool = multiprocessing.Pool(processes)
+
+        def perft_f(depth, board):
+            return chess.perft.parallel_perft(board, depth, processes, args.hash, pool)
 
     for perft_file in args.perft:
         print("###", perft_file.name)
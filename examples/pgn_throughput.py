@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measure PGN parsing throughput in games per second, reading one game at a
+time with chess.pgn.read_game() and in blocks with chess.pgn.read_games(),
+with and without trusted SAN parsing. Without a file, random games with
+comments and variations are generated.
+"""
+
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import io
+import random
+import time
+
+import chess
+import chess.pgn
+
+
+def random_pgn(games, seed=0):
+    rng = random.Random(seed)
+    exporter = chess.pgn.StringExporter()
+
+    for _ in range(games):
+        game = chess.pgn.Game()
+        node = game
+        board = chess.Board()
+        while not board.is_game_over() and len(board.move_stack) < 120:
+            move = rng.choice(list(board.legal_moves))
+            if rng.random() < 0.05:
+                node.add_variation(move).comment = "an alternative"
+            else:
+                node = node.add_variation(move)
+                board.push(move)
+                if rng.random() < 0.05:
+                    node.comment = "a comment\nspanning lines"
+        game.headers["Result"] = board.result()
+        game.accept(exporter)
+        exporter.write_line()
+
+    return str(exporter) + "\n"
+
+
+def read_one_by_one(handle, Visitor, trusted):
+    count = 0
+    while chess.pgn.read_game(handle, Visitor=Visitor, trusted=trusted) is not None:
+        count += 1
+    return count
+
+
+def read_blocks(handle, Visitor, trusted):
+    return sum(1 for _ in chess.pgn.read_games(handle, Visitor=Visitor, trusted=trusted))
+
+
+def games_per_second(text, reader, Visitor, trusted):
+    start = time.time()
+    count = reader(io.StringIO(text), Visitor, trusted)
+    return count, count / (time.time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pgn", nargs="?", help="PGN file to parse")
+    parser.add_argument("-n", "--games", type=int, default=500, help="number of random games")
+    args = parser.parse_args()
+
+    if args.pgn:
+        with io.open(args.pgn, encoding="utf-8-sig") as pgn:
+            text = pgn.read()
+    else:
+        text = random_pgn(args.games)
+
+    for Visitor in [chess.pgn.GameModelCreator, chess.pgn.BaseVisitor]:
+        for reader in [read_one_by_one, read_blocks]:
+            for trusted in [False, True]:
+                count, rate = games_per_second(text, reader, Visitor, trusted)
+                print("{0} with {1}{2}: {3} games, {4:.0f} games/s".format(
+                    reader.__name__, Visitor.__name__, " (trusted)" if trusted else "", count, rate))
+
+
+if __name__ == "__main__":
+    main()
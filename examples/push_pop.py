@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measure the memory used by the move stack (bytes per ply) and the
+throughput of Board.push() and Board.pop().
+
+The package is imported from the Python path, so revisions can be compared
+by running the script with PYTHONPATH pointing to their checkouts.
+"""
+
+from __future__ import division
+from __future__ import print_function
+
+import chess
+import os
+import random
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+def random_game(rng):
+    board = chess.Board()
+    while not board.is_game_over():
+        board.push(rng.choice(list(board.legal_moves)))
+    return board.move_stack
+
+
+def replay(games):
+    boards = []
+    for moves in games:
+        board = chess.Board()
+        for move in moves:
+            board.push(move)
+        boards.append(board)
+    return boards
+
+
+def bytes_per_ply(games):
+    if tracemalloc is None:
+        return None
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    boards = replay(games)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return size / sum(len(board.move_stack) for board in boards)
+
+
+def push_pop_throughput(games, number=5):
+    def push_pop():
+        for moves in games:
+            board = chess.Board()
+            for move in moves:
+                board.push(move)
+            while board.move_stack:
+                board.pop()
+
+    seconds = timeit.timeit(push_pop, number=number)
+    return number * sum(len(moves) for moves in games) / seconds
+
+
+def main():
+    rng = random.Random(0)
+    games = [random_game(rng) for _ in range(20)]
+
+    print("python-chess {0} from {1}".format(chess.__version__, os.path.dirname(os.path.abspath(chess.__file__))))
+
+    size = bytes_per_ply(games)
+    if size is not None:
+        print("{0:.0f} bytes per ply".format(size))
+    else:
+        print("bytes per ply: tracemalloc not available")
+
+    print("{0:.0f} push/pop pairs per second".format(push_pop_throughput(games)))
+
+
+if __name__ == "__main__":
+    main()
@@ -67,6 +67,8 @@ def extra_dependencies():
         else:
             extras["gaviota"] = []
 
+    extras["arrays"] = ["numpy"]
+
     extras["test"] = extras["engine"] + extras.get("gaviota", [])
 
     if platform.python_implementation() == "CPython":
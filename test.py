@@ -25,10 +25,17 @@ import chess.xboard
 import chess.syzygy
 import chess.gaviota
 import chess.variant
+import chess.perft
+import chess.epd
 import collections
 import copy
+import functools
+import operator
 import os
 import os.path
+import pickle
+import shutil
+import tempfile
 import textwrap
 import sys
 import time
@@ -91,6 +98,11 @@ class SquareTestCase(unittest.TestCase):
                 self.assertLessEqual(c, 1)
                 self.assertEqual(c, chess.popcount(shifted & chess.BB_ALL))
 
+    def test_popcount(self):
+        self.assertEqual(chess.popcount(chess.BB_VOID), 0)
+        self.assertEqual(chess.popcount(chess.BB_ALL), 64)
+        self.assertEqual(chess.popcount(chess.SquareSet(7)), 3)
+
 
 class MoveTestCase(unittest.TestCase):
 
@@ -137,6 +149,32 @@ class MoveTestCase(unittest.TestCase):
         self.assertEqual(copy.copy(b), b)
         self.assertEqual(copy.copy(c), c)
 
+    def test_interned(self):
+        a = chess.Move.from_uci("g7g8r")
+        self.assertIs(a, chess.Move.from_uci("g7g8r"))
+        self.assertIs(chess.Move.from_uci("g1f3"), next(chess.Board().generate_legal_moves(chess.BB_G1, chess.BB_F3)))
+
+        # Interned moves are read-only, but copies can be modified.
+        with self.assertRaises(AttributeError):
+            a.promotion = chess.QUEEN
+        b = copy.copy(a)
+        b.promotion = chess.QUEEN
+        self.assertEqual(b, chess.Move.from_uci("g7g8q"))
+        self.assertEqual(a, chess.Move.from_uci("g7g8r"))
+
+        # Plain constructors still create new moves.
+        c = chess.Move(chess.G7, chess.G8, chess.ROOK)
+        self.assertIsNot(c, a)
+        self.assertEqual(c, a)
+        self.assertEqual(hash(c), hash(a))
+
+    def test_packed(self):
+        for uci in ["e2e4", "a7a8q", "h2h1n", "N@f3", "P@a2", "0000"]:
+            move = chess.Move.from_uci(uci)
+            self.assertEqual(chess.Move.from_packed(move.packed()), move)
+        self.assertEqual(chess.Move.null().packed(), 0)
+        self.assertEqual(chess.Move.from_uci("a7a8q").packed(), chess.A7 << 6 | chess.A8 | chess.QUEEN << 12)
+
 
 class PieceTestCase(unittest.TestCase):
 
@@ -214,6 +252,44 @@ class BoardTestCase(unittest.TestCase):
         board.push(chess.Move.from_uci("f3d2"))
         self.assertEqual(board.fen(), "6k1/pb3pp1/1p2p2p/1Bn1P3/8/8/PP1N1PPP/6K1 b - - 0 24")
 
+    def test_bytes(self):
+        board = chess.Board()
+        self.assertEqual(len(board.to_bytes()), 32)
+        self.assertEqual(chess.Board.from_bytes(board.to_bytes()), board)
+
+        fen = "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4"
+        board = chess.Board(fen)
+        self.assertEqual(chess.Board.from_bytes(board.to_bytes()).fen(), fen)
+
+        fen = "6k1/8/8/2pP4/8/8/8/4K3 w - c6 0 37"
+        board = chess.Board(fen)
+        self.assertEqual(chess.Board.from_bytes(board.to_bytes()).fen(), fen)
+
+        xfen = "rn2k1r1/ppp1pp1p/3p2p1/5bn1/P7/2N2B2/1PPPPP2/2BNK1RR w Gkq - 4 11"
+        board = chess.Board.from_bytes(chess.Board(xfen, chess960=True).to_bytes(), chess960=True)
+        self.assertEqual(board.fen(), xfen)
+        self.assertTrue(board.chess960)
+
+        data = chess.Board().to_bytes()
+        with self.assertRaises(ValueError):
+            chess.Board.from_bytes(data[:-1])
+        with self.assertRaises(ValueError):
+            chess.Board.from_bytes(data + b"\x00")
+        with self.assertRaises(ValueError):
+            chess.Board.from_bytes(data[:-1] + b"\xff")
+
+        # Large clocks.
+        for fen in ["8/8/8/8/8/8/8/K1k5 w - - 0 65534", "8/8/8/8/8/8/8/K1k5 w - - 0 65535", "8/8/8/8/8/8/8/K1k5 b - - 70000 1"]:
+            board = chess.Board(fen)
+            self.assertEqual(chess.Board.from_bytes(board.to_bytes()).fen(), fen)
+            self.assertEqual(pickle.loads(pickle.dumps(board)).fen(), fen)
+        self.assertEqual(len(chess.Board("8/8/8/8/8/8/8/K1k5 w - - 0 65534").to_bytes()), 17)
+        self.assertEqual(len(chess.Board("8/8/8/8/8/8/8/K1k5 w - - 0 65535").to_bytes()), 33)
+        board = chess.Board("8/8/8/8/8/8/8/K1k5 w - - 0 1")
+        board.fullmove_number = 1 << 64
+        with self.assertRaises(ValueError):
+            board.to_bytes()
+
     def test_xfen(self):
         # https://de.wikipedia.org/wiki/Forsyth-Edwards-Notation#Beispiel
         xfen = "rn2k1r1/ppp1pp1p/3p2p1/5bn1/P7/2N2B2/1PPPPP2/2BNK1RR w Gkq - 4 11"
@@ -525,6 +601,51 @@ class BoardTestCase(unittest.TestCase):
         self.assertEqual(board.result(), "*")
         self.assertEqual(board.result(claim_draw=True), "1/2-1/2")
 
+    def test_outcome(self):
+        board = chess.Board()
+        self.assertIsNone(board.outcome(claim_draw=True))
+
+        board = chess.Board("rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3")
+        outcome = board.outcome()
+        self.assertEqual(outcome, chess.Outcome(chess.TERMINATION_CHECKMATE, chess.BLACK))
+        self.assertEqual(outcome.result(), "0-1")
+
+        board = chess.Board("7K/7P/7k/8/6q1/8/8/8 w - - 0 1")
+        self.assertEqual(board.outcome(), chess.Outcome(chess.TERMINATION_STALEMATE, None))
+
+        board = chess.Board("4k3/8/8/8/8/5B2/8/4K3 w - - 0 1")
+        self.assertEqual(board.outcome().termination, chess.TERMINATION_INSUFFICIENT_MATERIAL)
+
+        board = chess.Board("4k3/8/6r1/8/8/8/2R5/4K3 w - - 369 1")
+        self.assertEqual(board.outcome().termination, chess.TERMINATION_SEVENTYFIVE_MOVES)
+
+        board = chess.Board("4k3/8/6r1/8/8/8/2R5/4K3 w - - 120 1")
+        self.assertIsNone(board.outcome())
+        self.assertEqual(board.outcome(claim_draw=True).termination, chess.TERMINATION_FIFTY_MOVES)
+        self.assertIsNone(board.outcome())
+
+        board = chess.Board()
+        for _ in range(2):
+            for san in ["Nf3", "Nf6", "Ng1", "Ng8"]:
+                board.push_san(san)
+        self.assertIsNone(board.outcome())
+        self.assertEqual(board.outcome(claim_draw=True).termination, chess.TERMINATION_THREEFOLD_REPETITION)
+        for _ in range(2):
+            for san in ["Nf3", "Nf6", "Ng1", "Ng8"]:
+                board.push_san(san)
+        self.assertEqual(board.outcome().termination, chess.TERMINATION_FIVEFOLD_REPETITION)
+
+        # The cached outcome is reset when the position changes.
+        board = chess.Board("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1")
+        self.assertIsNone(board.outcome())
+        board.push_san("Ra8#")
+        self.assertEqual(board.outcome(), chess.Outcome(chess.TERMINATION_CHECKMATE, chess.WHITE))
+        board.pop()
+        self.assertIsNone(board.outcome())
+        board.turn = chess.BLACK
+        board.set_piece_at(chess.A8, chess.Piece.from_symbol("R"))
+        self.assertEqual(board.result(), "1-0")
+
     def test_san(self):
         # Castling with check.
         fen = "rnbk1b1r/ppp2pp1/5n1p/4p1B1/2P5/2N5/PP2PPPP/R3KBNR w KQ - 0 7"
@@ -609,6 +730,34 @@ class BoardTestCase(unittest.TestCase):
         self.assertIn('f3h6', message,
                       msg="Illegal move f3h6 appears in message [{0}]".format(message))
 
+    def test_san_batch(self):
+        fen = "rn1qr1k1/1p2bppp/p3p3/3pP3/P2P1B2/2RB1Q1P/1P3PP1/R5K1 w - - 0 19"
+        board = chess.Board(fen)
+        variation = [chess.Move.from_uci(m) for m in ['d3h7', 'g8h7', 'f3h5', 'h7g8', 'c3g3', 'e7f8']]
+        self.assertEqual(board.san_batch(variation), ["Bxh7+", "Kxh7", "Qh5+", "Kg8", "Rg3", "Bf8"])
+        self.assertEqual(board.san_batch([]), [])
+        self.assertEqual(board.fen(), fen)
+
+        board = chess.Board("6k1/5ppp/8/8/8/8/8/3R2K1 w - - 0 1")
+        self.assertEqual(board.san_batch([chess.Move.from_uci("d1d8")]), ["Rd8#"])
+
+        with self.assertRaises(ValueError):
+            chess.Board().san_batch([chess.Move.from_uci("e2e4"), chess.Move.from_uci("e2e4")])
+
+    def test_parse_san_line(self):
+        board = chess.Board("r3k2r/8/8/8/8/8/8/R3K1NR w KQkq - 0 1")
+        sans = ["Nf3", "O-O-O", "O-O", "Rh2", "Nh4", "Rd1", "Raxd1"]
+        moves = board.parse_san_line(sans)
+        self.assertEqual(board.san_batch(moves), sans)
+        self.assertEqual(board.fen(), "r3k2r/8/8/8/8/8/8/R3K1NR w KQkq - 0 1")
+        self.assertEqual(board.parse_san_line(["Ng1f3", "--", "N3h4"]), [
+            chess.Move.from_uci("g1f3"), chess.Move.null(), chess.Move.from_uci("f3h4")])
+
+        with self.assertRaises(ValueError):
+            board.parse_san_line(["Nf3", "Nf3"])
+        with self.assertRaises(ValueError):
+            board.parse_san_line(["Nf3", "O-O-O", "O-O", "Rh2", "Nh4", "Rd1", "Rxd1"])
+
     def test_move_stack_usage(self):
         board = chess.Board()
         board.push_uci("d2d4")
@@ -623,6 +772,88 @@ class BoardTestCase(unittest.TestCase):
         san = chess.Board().variation_san(board.move_stack)
         self.assertEqual(san, "1. d4 d5 2. Nf3 Bf5 3. e3 e6 4. Bd3 Bd6 5. O-O")
 
+    def test_copy_shares_history(self):
+        board = chess.Board()
+        for san in ["e4", "e5", "Nf3", "Nc6"]:
+            board.push_san(san)
+
+        copy = board.copy()
+        self.assertEqual(copy.move_stack, board.move_stack)
+        self.assertIsNot(copy.move_stack, board.move_stack)
+
+        # The boards diverge after the copy.
+        board.push_san("Bb5")
+        copy.push_san("Bc4")
+        copy.push_san("Bc5")
+        self.assertEqual(board.peek(), chess.Move.from_uci("f1b5"))
+        self.assertEqual(len(board.move_stack), 5)
+        self.assertEqual(len(copy.move_stack), 6)
+
+        board.pop()
+        self.assertEqual(copy.pop(), chess.Move.from_uci("f8c5"))
+        copy.pop()
+        self.assertEqual(copy.fen(), board.fen())
+        while copy.move_stack:
+            copy.pop()
+        self.assertEqual(copy.fen(), chess.STARTING_FEN)
+        self.assertEqual(len(board.move_stack), 4)
+        self.assertEqual(len(board.copy(stack=False).move_stack), 0)
+
+        with self.assertRaises(IndexError):
+            copy.pop()
+        with self.assertRaises(IndexError):
+            copy.peek()
+
+        # Copies can still detect repetitions.
+        for _ in range(2):
+            for san in ["Ng1", "Nb8", "Nf3", "Nc6"]:
+                board.push_san(san)
+                board = board.copy()
+        self.assertTrue(board.can_claim_threefold_repetition())
+
+    def test_pickle(self):
+        board = chess.Board("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+        for uci in ["f1c4", "g8f6", "0000", "e8e7"]:
+            board.push_uci(uci)
+
+        unpickled = pickle.loads(pickle.dumps(board))
+        self.assertEqual(unpickled, board)
+        self.assertEqual(unpickled.move_stack, board.move_stack)
+        while unpickled.move_stack:
+            unpickled.pop()
+        self.assertEqual(unpickled.fen(), "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3")
+
+        self.assertEqual(pickle.loads(pickle.dumps(board.copy(stack=False))).move_stack, [])
+
+        # Other instance attributes are kept.
+        board.comment = "after 4...Ke7"
+        self.assertEqual(pickle.loads(pickle.dumps(board)).comment, "after 4...Ke7")
+
+        board = chess.variant.CrazyhouseBoard("r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R[] w KQkq - 0 1")
+        for san in ["Bxf7+", "Kxf7", "Ng5+", "Ke7", "P@f7"]:
+            board.push_san(san)
+        unpickled = pickle.loads(pickle.dumps(board))
+        self.assertIsInstance(unpickled, chess.variant.CrazyhouseBoard)
+        self.assertEqual(unpickled.fen(), board.fen())
+        self.assertEqual(unpickled.move_stack, board.move_stack)
+
+        board = chess.Board("rk2r3/pppppppp/8/8/8/8/PPPPPPPP/RK2R3 w EAea - 0 1", chess960=True)
+        board.push_san("O-O")
+        unpickled = pickle.loads(pickle.dumps(board))
+        self.assertTrue(unpickled.chess960)
+        self.assertEqual(unpickled.fen(), board.fen())
+
+        # Moves keep whether they are shared and read-only.
+        move = pickle.loads(pickle.dumps(chess.Move.from_uci("e7e8q")))
+        self.assertIs(move, chess.Move.from_uci("e7e8q"))
+        move = pickle.loads(pickle.dumps(chess.Move(chess.E7, chess.E8, chess.QUEEN)))
+        self.assertEqual(move, chess.Move.from_uci("e7e8q"))
+        move.promotion = chess.KNIGHT
+        self.assertEqual(pickle.loads(pickle.dumps(chess.Move.from_uci("N@f3"))).drop, chess.KNIGHT)
+
+        squares = pickle.loads(pickle.dumps(chess.SquareSet(chess.BB_BACKRANKS)))
+        self.assertEqual(squares, chess.SquareSet(chess.BB_BACKRANKS))
+
     def test_is_legal_move(self):
         fen = "3k4/6P1/7P/8/K7/8/8/4R3 w - - 0 1"
         board = chess.Board(fen)
@@ -644,6 +875,164 @@ class BoardTestCase(unittest.TestCase):
         board = chess.Board("1N2k3/P7/8/8/3n4/8/2PP4/R3K2R w KQ - 0 1")
         self.assertEqual(board.pseudo_legal_moves.count(), 8 + 4 + 3 + 2 + 1 + 6 + 9)
 
+    def test_legal_move_count(self):
+        fens = [
+            chess.STARTING_FEN,
+            "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+            "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+            "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+            "8/8/8/1k6/3Pp3/8/8/4KQ2 b - d3 0 1",  # Pinned en passant.
+            "4k3/8/8/8/1b6/8/3P4/4K3 w - - 0 1",  # Pinned pawn.
+            "4k3/8/8/8/7b/8/4r3/4K3 w - - 0 1",  # Double check.
+            "6k1/5ppp/8/8/8/8/5PPP/3r2K1 w - - 0 1",  # Checkmate.
+        ]
+        for fen in fens:
+            board = chess.Board(fen)
+            self.assertEqual(board.legal_moves.count(), len(list(board.generate_legal_moves())), fen)
+
+            from_mask = chess.BB_RANK_2 | chess.BB_FILE_E
+            to_mask = chess.BB_RANK_4 | chess.BB_RANK_8 | chess.BB_FILE_C
+            self.assertEqual(board._count_legal_moves(from_mask, to_mask),
+                             len(list(board.generate_legal_moves(from_mask, to_mask))), fen)
+
+    def test_check_info_cache(self):
+        board = chess.Board("4k3/8/8/8/8/8/4R3/4K3 b - - 0 1")
+        self.assertTrue(board.is_check())
+        self.assertEqual(board.legal_moves.count(), 4)
+
+        # Moves, undos and direct changes of the turn are noticed.
+        board.push_san("Kd8")
+        self.assertFalse(board.is_check())
+        board.pop()
+        self.assertTrue(board.is_check())
+        board.turn = chess.WHITE
+        self.assertFalse(board.is_check())
+        self.assertEqual(board.legal_moves.count(), 4 + 13)
+        board.turn = chess.BLACK
+        self.assertTrue(board.is_check())
+
+        # So are changes of the pieces.
+        board.remove_piece_at(chess.E2)
+        self.assertFalse(board.is_check())
+        self.assertEqual(board.legal_moves.count(), 5)
+        board.set_piece_at(chess.D2, chess.Piece(chess.ROOK, chess.WHITE))
+        self.assertFalse(board.is_check())
+        self.assertEqual(board.legal_moves.count(), 3)
+
+    def test_gives_check(self):
+        fens = [
+            "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+            "8/8/8/R2pP2k/8/8/8/4K3 w - d6 0 1",  # Discovered check en passant.
+            "5k2/8/8/8/8/8/8/4K2R w K - 0 1",  # Check by castling.
+            "3k4/1P6/8/8/8/8/8/4K3 w - - 0 1",  # Check by promotion.
+            "4k3/8/8/8/8/8/8/Q2qK3 w - - 0 1",  # Capture with discovered check.
+        ]
+        for fen in fens:
+            board = chess.Board(fen)
+            for move in board.generate_pseudo_legal_moves():
+                board.push(move)
+                is_check = board.is_check()
+                board.pop()
+                self.assertEqual(board.gives_check(move), is_check, "{0} {1}".format(fen, move))
+
+        board = chess.Board("8/8/8/R2pP2k/8/8/8/4K3 w - d6 0 1")
+        self.assertTrue(board.gives_check(board.parse_san("exd6")))
+        self.assertEqual(board.san(chess.Move.from_uci("e5d6")), "exd6+")
+        self.assertEqual(board.fen(), "8/8/8/R2pP2k/8/8/8/4K3 w - d6 0 1")
+
+        board = chess.Board("5k2/8/8/8/8/8/8/4K2R w K - 0 1")
+        self.assertTrue(board.gives_check(board.parse_san("O-O")))
+
+        board = chess.Board("3k4/1P6/8/8/8/8/8/4K3 w - - 0 1")
+        self.assertTrue(board.gives_check(chess.Move.from_uci("b7b8q")))
+        self.assertFalse(board.gives_check(chess.Move.from_uci("b7b8n")))
+
+    def test_see(self):
+        # Undefended pawn.
+        board = chess.Board("1k1r4/1pp4p/p7/4p3/8/P5P1/1PP4P/2K1R3 w - - 0 1")
+        move = chess.Move.from_uci("e1e5")
+        self.assertEqual(board.see(move), 100)
+        self.assertTrue(board.see_ge(move, 100))
+        self.assertFalse(board.see_ge(move, 101))
+
+        # Knight for pawn, with x-ray attackers on both sides.
+        board = chess.Board("1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1")
+        move = chess.Move.from_uci("d3e5")
+        self.assertEqual(board.see(move), -200)
+        self.assertTrue(board.see_ge(move, -200))
+        self.assertFalse(board.see_ge(move))
+        self.assertEqual(board.fen(), "1k1r3q/1ppn3p/p4b2/4p3/8/P2N2P1/1PP1R1BP/2K1Q3 w - - 0 1")
+
+        # Queen behind the rook recaptures.
+        board = chess.Board("3r2k1/8/8/3p4/8/8/3R4/3Q2K1 w - - 0 1")
+        self.assertEqual(board.see(chess.Move.from_uci("d2d5")), 100)
+        self.assertEqual(board.see(chess.Move.from_uci("d2d7")), -500)
+        board = chess.Board("3r2k1/8/8/3p4/8/8/3Q4/3R2K1 w - - 0 1")
+        self.assertEqual(board.see(chess.Move.from_uci("d2d5")), -300)
+
+        # The king can not recapture a defended piece.
+        board = chess.Board("4k3/4r3/8/8/8/8/4R3/4R1K1 b - - 0 1")
+        self.assertEqual(board.see(chess.Move.from_uci("e7e2")), 0)
+        board = chess.Board("4k3/8/8/8/8/8/4r3/1K2R3 b - - 0 1")
+        self.assertEqual(board.see(chess.Move.from_uci("e2e1")), 500)
+
+        # En passant, promotion and quiet moves.
+        board = chess.Board("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1")
+        self.assertEqual(board.see(chess.Move.from_uci("e5d6")), 100)
+        board = chess.Board("1r2k3/P7/8/8/8/8/8/4K3 w - - 0 1")
+        self.assertEqual(board.see(chess.Move.from_uci("a7b8q")), 1300)
+        self.assertEqual(board.see(chess.Move.from_uci("a7a8q")), -100)
+        board = chess.Board()
+        self.assertEqual(board.see(chess.Move.from_uci("e2e4")), 0)
+        self.assertEqual(board.see(chess.Move.null()), 0)
+
+    def test_attack_maps(self):
+        board = chess.Board("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+        for move in [None] + list(board.legal_moves):
+            if move:
+                board.push(move)
+            for color in chess.COLORS:
+                attacked = board.attacked_mask(color)
+                counts = board.attack_counts(color)
+                for square in chess.SQUARES:
+                    self.assertEqual(counts[square], len(board.attackers(color, square)))
+                    self.assertEqual(bool(attacked & chess.BB_SQUARES[square]), board.is_attacked_by(color, square))
+                self.assertEqual(board.attacked(color), chess.SquareSet(attacked))
+            if move:
+                board.pop()
+
+        # Cached maps are reset when the position changes.
+        board = chess.Board()
+        self.assertFalse(board.attacked_mask(chess.WHITE) & chess.BB_E5)
+        board.push_san("e4")
+        self.assertTrue(board.attacked_mask(chess.WHITE) & chess.BB_D5)
+        self.assertEqual(board.attack_counts(chess.WHITE)[chess.F3], 3)
+        board.pop()
+        self.assertFalse(board.attacked_mask(chess.WHITE) & chess.BB_D5)
+        board.set_piece_at(chess.E5, chess.Piece.from_symbol("N"))
+        self.assertTrue(board.attacked_mask(chess.WHITE) & chess.BB_F7)
+
+        self.assertEqual(chess.pawn_attacks(chess.WHITE, chess.BB_A2 | chess.BB_H2), chess.BB_B3 | chess.BB_G3)
+        self.assertEqual(chess.pawn_attacks(chess.BLACK, chess.BB_E7), chess.BB_D6 | chess.BB_F6)
+
+    def test_packed_move_generation(self):
+        board = chess.Board("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1")
+        self.assertEqual(list(board.generate_legal_moves_packed()), [move.packed() for move in board.generate_legal_moves()])
+        self.assertEqual(list(board.generate_pseudo_legal_moves_packed()), [move.packed() for move in board.generate_pseudo_legal_moves()])
+
+        # Evasions.
+        board.push_san("c5")
+        board.push_san("Bxc5+")
+        self.assertTrue(board.is_check())
+        self.assertEqual(list(board.generate_legal_moves_packed()), [move.packed() for move in board.generate_legal_moves()])
+
+        # Push and pop.
+        fen = board.fen()
+        board.push_packed(chess.Move.from_uci("g1h1").packed())
+        self.assertEqual(board.peek(), chess.Move.from_uci("g1h1"))
+        self.assertEqual(board.pop(), chess.Move.from_uci("g1h1"))
+        self.assertEqual(board.fen(), fen)
+
     def test_polyglot(self):
         # Test polyglot compability using test data from
         # http://hardy.uhasselt.be/Toga/book_format.html. Forfeiting castling
@@ -1066,6 +1455,23 @@ class BoardTestCase(unittest.TestCase):
         self.assertFalse(board.is_fivefold_repetition())
         self.assertEqual(board.fen().split()[0], fen.split()[0])
 
+    def test_repetition_en_passant(self):
+        # The en passant capture is pinned, so the position after d5 repeats.
+        board = chess.Board("1n2r1k1/3p4/8/4P3/8/8/8/4K1N1 b - - 0 1")
+        for san in ["d5", "Nf3", "Nc6", "Ng1", "Nb8", "Nf3", "Nc6", "Ng1"]:
+            board.push_san(san)
+        move_stack = list(board.move_stack)
+        self.assertTrue(board.can_claim_threefold_repetition())
+        self.assertEqual(board.move_stack, move_stack)
+
+        # Here exd6 is legal, so the position after d5 is different.
+        board = chess.Board("1n4k1/3p4/8/4P3/8/8/8/4K1N1 b - - 0 1")
+        for san in ["d5", "Nf3", "Nc6", "Ng1", "Nb8", "Nf3", "Nc6", "Ng1"]:
+            board.push_san(san)
+        self.assertFalse(board.can_claim_threefold_repetition())
+        board.push_san("Nb8")
+        self.assertTrue(board.can_claim_threefold_repetition())
+
     def test_fifty_moves(self):
         # Test positions from Timman - Lutz (1995).
         board = chess.Board()
@@ -1388,6 +1794,18 @@ class LegalMoveGeneratorTestCase(unittest.TestCase):
 
 class BaseBoardTestCase(unittest.TestCase):
 
+    def test_attack_tables(self):
+        tables = [
+            (chess.BB_DIAG_MASKS, chess.BB_DIAG_ATTACKS, [-9, -7, 7, 9]),
+            (chess.BB_FILE_MASKS, chess.BB_FILE_ATTACKS, [-8, 8]),
+            (chess.BB_RANK_MASKS, chess.BB_RANK_ATTACKS, [-1, 1]),
+        ]
+        for masks, attacks, deltas in tables:
+            for square in chess.SQUARES:
+                self.assertEqual(len(attacks[square]), 1 << chess.popcount(masks[square]))
+                for subset in list(attacks[square])[::17]:
+                    self.assertEqual(attacks[square][subset], chess._sliding_attacks(square, subset, deltas))
+
     def test_set_chess960_pos(self):
         board = chess.BaseBoard()
 
@@ -1677,6 +2095,42 @@ class PolyglotTestCase(unittest.TestCase):
             with self.assertRaises(IndexError):
                 book.find(chess.Board(), minimum_weight=2)
 
+    def test_incremental_zobrist_hash(self):
+        hasher = chess.polyglot.ZobristHasher(chess.polyglot.POLYGLOT_RANDOM_ARRAY)
+
+        for board, sans in [
+                (chess.Board(), "e4 d5 exd5 c5 dxc6 Nf6 cxb7 e6 bxa8=Q Bc5 Nf3 O-O Bd3 Qd5 O-O Qxa8".split()),
+                (chess.Board("r3k2r/1p4p1/8/P7/8/8/6P1/R3K2R w KQkq - 0 1"), "O-O-O b5 axb6 g5 b7 Kf8 b8=N Rxh1 Rxh1".split()),
+                (chess.variant.AtomicBoard(), "e4 d5 exd5 Qxd5 Nc3 Qxa2 d4 e5 dxe5".split()),
+                (chess.variant.CrazyhouseBoard(), "e4 d5 exd5 Qxd5 Nc3 Qe6+ Qe2 Qxe2+ Bxe2 Q@e4 Nxe4 P@d3".split())]:
+            board.zobrist_key
+            for san in sans:
+                board.push_san(san)
+                self.assertEqual(board.zobrist_key, hasher(board))
+
+            while board.move_stack:
+                board.pop()
+                self.assertEqual(board.zobrist_key, hasher(board))
+
+        # Castling rights, the turn and the en passant square can be set
+        # directly.
+        board = chess.Board()
+        board.push_san("e4")
+        board.push_san("d5")
+        board.push_san("e5")
+        board.push_san("f5")
+        self.assertEqual(board.zobrist_key, hasher(board))
+        board.ep_square = None
+        board.castling_rights = chess.BB_A1
+        board.turn = chess.BLACK
+        self.assertEqual(board.zobrist_key, hasher(board))
+
+        # Copies share the hash.
+        copy = board.copy(stack=False)
+        self.assertEqual(copy.zobrist_key, board.zobrist_key)
+        copy.push_san("Nc6")
+        self.assertEqual(copy.zobrist_key, hasher(copy))
+
 
 class PgnTestCase(unittest.TestCase):
 
@@ -2032,6 +2486,202 @@ class PgnTestCase(unittest.TestCase):
             self.assertEqual(first_drawn_game.headers["Site"], "03")
             self.assertEqual(first_drawn_game.variation(0).move, chess.Move.from_uci("d2d3"))
 
+    def test_read_games(self):
+        for path in ["data/pgn/kasparov-deep-blue-1997.pgn", "data/pgn/anastasian-lewis.pgn", "data/pgn/molinari-bordais-1979.pgn"]:
+            with open(path) as pgn:
+                expected = []
+                while True:
+                    game = chess.pgn.read_game(pgn)
+                    if game is None:
+                        break
+                    expected.append(str(game))
+
+                for block_size in [1, 7, chess.pgn.DEFAULT_BLOCK_SIZE]:
+                    pgn.seek(0)
+                    games = [str(game) for game in chess.pgn.read_games(pgn, block_size=block_size)]
+                    self.assertEqual(games, expected)
+
+    def test_read_games_block_boundaries(self):
+        pgn = textwrap.dedent("""\
+            [Event "A"]
+
+            1. e4 { a comment
+            spanning lines } e5 ; rest of line
+            2. Nf3 (2. Nc3) *
+
+            [Event "B"]
+
+            1. d4 *""")
+
+        for block_size in range(1, 20):
+            games = list(chess.pgn.read_games(StringIO(pgn), block_size=block_size))
+            self.assertEqual([game.headers["Event"] for game in games], ["A", "B"])
+            self.assertEqual(games[0].variation(0).comment, "a comment\nspanning lines")
+            self.assertEqual(games[0].variation(0).variation(0).variation(0).move, chess.Move.from_uci("g1f3"))
+            self.assertEqual(games[0].variation(0).variation(0).variation(1).move, chess.Move.from_uci("b1c3"))
+            self.assertEqual(games[1].variation(0).move, chess.Move.from_uci("d2d4"))
+
+        self.assertEqual(list(chess.pgn.read_games(StringIO(" \n\n   "))), [])
+
+    def test_skip(self):
+        class HeadersOnly(chess.pgn.BaseVisitor):
+            def begin_game(self):
+                self.headers = {}
+
+            def visit_header(self, tagname, tagvalue):
+                self.headers[tagname] = tagvalue
+
+            def end_headers(self):
+                return chess.pgn.SKIP
+
+            def visit_move(self, board, move):
+                raise AssertionError("movetext not skipped")
+
+            def result(self):
+                return self.headers
+
+        class SkipGames(chess.pgn.BaseVisitor):
+            def begin_game(self):
+                return chess.pgn.SKIP
+
+            def visit_header(self, tagname, tagvalue):
+                raise AssertionError("game not skipped")
+
+        with open("data/pgn/kasparov-deep-blue-1997.pgn") as pgn:
+            sites = []
+            offsets = []
+            while True:
+                headers = chess.pgn.read_game(pgn, Visitor=HeadersOnly)
+                if headers is None:
+                    break
+                sites.append(headers["Site"])
+                offsets.append(pgn.tell())
+            self.assertEqual(sites, ["01", "02", "03", "04", "05", "06"])
+
+            pgn.seek(0)
+            for offset in offsets:
+                self.assertTrue(chess.pgn.read_game(pgn))
+                self.assertEqual(pgn.tell(), offset)
+
+            for block_size in [1, chess.pgn.DEFAULT_BLOCK_SIZE]:
+                pgn.seek(0)
+                games = chess.pgn.read_games(pgn, Visitor=HeadersOnly, block_size=block_size)
+                self.assertEqual([headers["Site"] for headers in games], sites)
+
+            pgn.seek(0)
+            self.assertEqual(len(list(chess.pgn.read_games(pgn, Visitor=SkipGames))), 6)
+
+        pgn = StringIO(textwrap.dedent("""\
+            [Event "A"]
+
+            1. e4 { [Event "Fake"]
+
+            } e5 ; {
+            % {
+            2. Nf3 *
+
+            [Event "B"]
+
+            1. d4 *"""))
+        self.assertEqual(chess.pgn.read_game(pgn, Visitor=HeadersOnly)["Event"], "A")
+        self.assertEqual(chess.pgn.read_game(pgn, Visitor=HeadersOnly)["Event"], "B")
+        self.assertTrue(chess.pgn.read_game(pgn, Visitor=HeadersOnly) is None)
+
+        game = chess.pgn.Game()
+        game.add_variation(chess.Move.from_uci("e2e4"))
+        self.assertEqual(game.accept(HeadersOnly())["Event"], "?")
+
+    def test_trusted(self):
+        for path in ["data/pgn/kasparov-deep-blue-1997.pgn", "data/pgn/saturs-jannlee-zh-lichess.pgn", "data/pgn/cutechess-fischerrandom.pgn"]:
+            with open(path) as pgn:
+                expected = [str(game) for game in chess.pgn.read_games(pgn)]
+                pgn.seek(0)
+                self.assertEqual([str(game) for game in chess.pgn.read_games(pgn, trusted=True)], expected)
+
+        # The knight on d2 is pinned, so Ne4 is not ambiguous.
+        pgn = StringIO(textwrap.dedent("""\
+            [FEN "4k3/8/8/8/1b6/8/3N1N2/4K3 w - - 0 1"]
+
+            1. Ne4 Kd7 2. exd5 *"""))
+        logging.disable(logging.ERROR)
+        game = chess.pgn.read_game(pgn, trusted=True)
+        logging.disable(logging.NOTSET)
+        self.assertEqual(game.variation(0).move, chess.Move.from_uci("f2e4"))
+        self.assertEqual(len(game.errors), 1)
+
+        # Long algebraic notation, with the source square of pawn pushes.
+        for trusted in [False, True]:
+            game = chess.pgn.read_game(StringIO("1. e2e4 e7e5 2. Ng1f3 Nb8c6 3. d2d4 e5xd4 *"), trusted=trusted)
+            self.assertEqual(game.errors, [])
+            self.assertEqual(game.end().board().fen(), "r1bqkbnr/pppp1ppp/2n5/8/3pP3/5N2/PPP2PPP/RNBQKB1R w KQkq - 0 4")
+
+    def test_read_games_parallel(self):
+        path = "data/pgn/kasparov-deep-blue-1997.pgn"
+        with open(path) as pgn:
+            expected = [str(game) for game in chess.pgn.read_games(pgn)]
+
+        games = chess.pgn.read_games_parallel(path, processes=2, chunk_size=1000)
+        self.assertEqual([str(game) for game in games], expected)
+
+        games = chess.pgn.read_games_parallel(path, processes=2, chunk_size=1000, ordered=False)
+        self.assertEqual(sorted(str(game) for game in games), sorted(expected))
+
+    def test_index(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "games.pgn")
+            shutil.copy("data/pgn/kasparov-deep-blue-1997.pgn", path)
+
+            index = chess.pgn.open_index(path)
+            self.assertEqual(len(index), 6)
+            self.assertEqual(index.find("Result", "1/2-1/2"), [2, 3, 4])
+            self.assertEqual(index.find("White", "Nobody"), [])
+            self.assertEqual(index.headers(0)["ECO"], "A06")
+            self.assertEqual(index.read_game(5).headers["Site"], "06")
+            self.assertEqual(index.offset(5) + index.length(5), os.path.getsize(path))
+
+            with open(path, "ab") as pgn:
+                pgn.write(b"\n[Event \"Appended\"]\n[White \"Nobody\"]\n\n1. e4 *\n")
+            self.assertEqual(index.refresh(), 1)
+            self.assertEqual(index.find("White", "Nobody"), [6])
+
+            index = chess.pgn.open_index(path)
+            self.assertEqual(len(index), 7)
+            self.assertEqual(index.read_game(6).variation(0).move, chess.Move.from_uci("e2e4"))
+            self.assertEqual(index.refresh(), 0)
+
+            # An edit of the same size earlier in the file.
+            with open(path, "r+b") as pgn:
+                data = pgn.read()
+                pgn.seek(0)
+                pgn.write(data.replace(b"Garry Kasparov", b"Garry Kasparow", 1))
+            os.utime(path, (index.mtime + 10, index.mtime + 10))
+            self.assertEqual(index.refresh(), 7)
+            self.assertEqual(index.headers(0)["White"], "Garry Kasparow")
+            self.assertEqual(index.find("White", "Garry Kasparov"), [2, 4])
+
+            shutil.copy("data/pgn/molinari-bordais-1979.pgn", path)
+            index = chess.pgn.open_index(path)
+            self.assertEqual(len(index), 1)
+            self.assertEqual(index.headers(0)["White"], "Molinari")
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_pickle_game(self):
+        game = chess.pgn.Game()
+        game.headers["White"] = "Deep Blue"
+        game.comment = "root comment"
+        node = game
+        for _ in range(150):
+            for uci in ["g1f3", "g8f6", "f3g1", "f6g8"]:
+                node = node.add_variation(chess.Move.from_uci(uci))
+        game.variation(0).add_variation(chess.Move.from_uci("e7e5"), comment="comment", starting_comment="start", nags=[chess.pgn.NAG_DUBIOUS_MOVE])
+
+        restored = pickle.loads(pickle.dumps(game))
+        self.assertEqual(restored.headers, game.headers)
+        self.assertEqual(str(restored), str(game))
+        self.assertEqual(restored.variation(0).variation(1).nags, set([chess.pgn.NAG_DUBIOUS_MOVE]))
+
     def test_black_to_move(self):
         game = chess.pgn.Game()
         game.setup("8/8/4k3/8/4P3/4K3/8/8 b - - 0 17")
@@ -3243,6 +3893,177 @@ class SvgTestCase(unittest.TestCase):
         self.assertNotIn("black queen", svg)
 
 
+class PerftTestCase(unittest.TestCase):
+
+    def test_perft(self):
+        board = chess.Board("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1")
+        fen = board.fen()
+        self.assertEqual(chess.perft.perft(board, 0), 1)
+        self.assertEqual(chess.perft.perft(board, 1), 48)
+        self.assertEqual(chess.perft.perft(board, 2), 2039)
+        self.assertEqual(chess.perft.perft(board, 3, {}), 97862)
+        self.assertEqual(board.fen(), fen)
+
+    def test_divide(self):
+        board = chess.Board("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1")
+        divided = chess.perft.divide(board, 3)
+        self.assertEqual([move for move, _ in divided], list(board.legal_moves))
+        self.assertEqual(sum(nodes for _, nodes in divided), 2812)
+        self.assertEqual(dict(divided)[chess.Move.from_uci("e2e4")], 177)
+
+    def test_hash_table(self):
+        hash_table = {}
+        board = chess.variant.CrazyhouseBoard("r1bqk2r/pppp1ppp/2n1p3/4P3/1b1Pn3/2NB1N2/PPP2PPP/R1BQK2R[] b KQkq - 0 1")
+        self.assertEqual(chess.perft.perft(board, 3, hash_table), 58057)
+        self.assertEqual(chess.perft.perft(board, 3, hash_table), 58057)
+
+        board = chess.variant.ThreeCheckBoard("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 2+1 0 1")
+        self.assertEqual(chess.perft.perft(board, 3, hash_table), chess.perft.perft(board, 3))
+
+    def test_parallel_perft(self):
+        board = chess.variant.AtomicBoard("rn1qkb1r/p5pp/2p5/3p4/N3P3/5P2/PPP4P/R1BQK3 w Qkq - 0 1")
+        self.assertEqual(chess.perft.parallel_perft(board, 3, processes=2), 23353)
+        self.assertEqual(chess.perft.parallel_perft(board, 3, processes=2, hashing=True), 23353)
+
+
+class EpdTestCase(unittest.TestCase):
+
+    def test_read_epd(self):
+        with open(os.path.join("data", "endgame.epd")) as epd:
+            positions = list(chess.epd.read_epd(epd))
+        self.assertEqual(len(positions), 200)
+
+        board, operations = positions[0]
+        self.assertEqual(board.fen(), "8/2K5/8/8/8/8/3p4/1k2N3 b - - 0 1")
+        self.assertEqual(operations, {"wdl_table": 2, "wdl": 2, "dtz": 1})
+
+        lines = [
+            "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2",
+            "",
+            "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - hmvc 2; fmvn 3; bm Bb5; c0 \"Ruy  Lopez\";",
+        ]
+        for trusted in [False, True]:
+            positions = list(chess.epd.read_epd(lines, trusted=trusted))
+            self.assertEqual(positions[0][0].ep_square, chess.E6)
+            self.assertEqual([board.fen() for board, _ in positions], [
+                "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+                "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+            ])
+            self.assertEqual(positions[1][1]["bm"], [chess.Move.from_uci("f1b5")])
+            self.assertEqual(positions[1][1]["c0"], "Ruy  Lopez")
+
+    def test_read_epd_bitboards(self):
+        (bitboards, operations), = chess.epd.read_epd(["4k3/8/8/8/8/8/4P3/4K2R w K - 0 1"], trusted=True, bitboards=True)
+        self.assertEqual(bitboards, (
+            chess.BB_E2, chess.BB_VOID, chess.BB_VOID, chess.BB_H1, chess.BB_VOID, chess.BB_E1 | chess.BB_E8,
+            chess.BB_E1 | chess.BB_E2 | chess.BB_H1, chess.BB_E8,
+            chess.WHITE, chess.BB_H1, None, 0, 1))
+        self.assertEqual(operations, {})
+
+    def test_read_epd_invalid(self):
+        with self.assertRaises(ValueError):
+            list(chess.epd.read_epd(["8/8/8/8/8/8/8/8 w - -"]))
+        with self.assertRaises(ValueError):
+            list(chess.epd.read_epd(["4k3/8/8/8/8/8/8/4K3 x - -"]))
+
+        # Trusted input is not validated, so invalid positions are accepted.
+        (board, _), = chess.epd.read_epd(["8/8/8/8/8/8/8/8 w - -"], trusted=True)
+        self.assertEqual(board, chess.Board.empty())
+
+    def test_read_epd_variant(self):
+        lines = ["r3kb1r/p1pN1ppp/2p1p3/8/2Pn4/3Q4/PP3PPP/R1B2q~K1[Bn] w kq - 0 1"]
+        for trusted in [False, True]:
+            (board, _), = chess.epd.read_epd(lines, chess.variant.CrazyhouseBoard, trusted=trusted)
+            self.assertEqual(board.fen(), lines[0])
+
+    def test_read_epd_parallel(self):
+        with open(os.path.join("data", "suicide-stats.epd")) as epd:
+            lines = epd.readlines()
+        expected = [board.epd() for board, _ in chess.epd.read_epd(lines, chess.variant.SuicideBoard)]
+        result = chess.epd.read_epd_parallel(lines, chess.variant.SuicideBoard, processes=2, chunk_size=1000)
+        self.assertEqual([board.epd() for board, _ in result], expected)
+
+
+class ArraysTestCase(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            import chess.arrays
+            import numpy
+        except ImportError:
+            self.skipTest("need numpy")
+
+        self.arrays = chess.arrays
+        self.numpy = numpy
+
+    def test_export(self):
+        numpy = self.numpy
+        boards = [chess.Board(), chess.Board("r3k2r/8/8/2pP4/8/8/8/R3K3 w Qk c6 7 40")]
+
+        bitboards = numpy.zeros((3, 12), dtype=numpy.uint64)
+        planes = numpy.zeros((3, 12, 64), dtype=numpy.uint8)
+        state = numpy.zeros((3, 8), dtype=numpy.int32)
+        self.assertEqual(self.arrays.export(boards, bitboards, planes, state, offset=1), 2)
+
+        self.assertFalse(bitboards[0].any())
+        self.assertEqual(int(bitboards[1, 0]), chess.BB_RANK_2)
+        self.assertEqual(int(bitboards[1, 11]), chess.BB_E8)
+        self.assertEqual(int(bitboards[2, 3]), chess.BB_A1)
+        self.assertEqual(int(bitboards[2, 9]), chess.BB_A8 | chess.BB_H8)
+
+        for i, board in enumerate(boards, 1):
+            for square in chess.SQUARES:
+                piece = board.piece_at(square)
+                for plane, (color, piece_type) in enumerate(self.arrays.PIECE_PLANES):
+                    expected = piece is not None and piece.color == color and piece.piece_type == piece_type
+                    self.assertEqual(planes[i, plane, square], expected)
+
+        self.assertEqual(state[1].tolist(), [1, 1, 1, 1, 1, -1, 0, 1])
+        self.assertEqual(state[2].tolist(), [1, 0, 1, 1, 0, chess.C6, 7, 40])
+
+    def test_export_bytes(self):
+        numpy = self.numpy
+        board = chess.Board("r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4")
+
+        expected = numpy.zeros((1, 12), dtype=numpy.uint64)
+        self.arrays.export([board], expected)
+        bitboards = numpy.zeros((1, 12), dtype=numpy.uint64)
+        self.arrays.export([board.to_bytes()], bitboards)
+        self.assertTrue((bitboards == expected).all())
+
+        with self.assertRaises(ValueError):
+            self.arrays.export([board, board], bitboards)
+
+    def test_bitboard_functions(self):
+        numpy = self.numpy
+        masks = [chess.BB_VOID, chess.BB_A1, chess.BB_H8, chess.BB_ALL, chess.BB_RANK_2 | chess.BB_G8,
+                 chess.BB_FILE_A | chess.BB_FILE_H, chess.BB_LIGHT_SQUARES, chess.BB_B1 | chess.BB_G1 | chess.BB_D5]
+        bbs = numpy.array(masks, dtype=numpy.uint64)
+
+        def union(table):
+            return lambda mask: functools.reduce(operator.or_, (table[square] for square in chess.scan_forward(mask)), chess.BB_VOID)
+
+        functions = [
+            (self.arrays.popcount, chess.popcount),
+            (self.arrays.lsb, lambda mask: chess.lsb(mask) if mask else -1),
+            (self.arrays.msb, lambda mask: chess.msb(mask) if mask else -1),
+            (self.arrays.bswap, chess.bswap),
+            (self.arrays.knight_attacks, union(chess.BB_KNIGHT_ATTACKS)),
+            (self.arrays.king_attacks, union(chess.BB_KING_ATTACKS)),
+            (functools.partial(self.arrays.pawn_attacks, chess.WHITE), union(chess.BB_PAWN_ATTACKS[chess.WHITE])),
+            (functools.partial(self.arrays.pawn_attacks, chess.BLACK), union(chess.BB_PAWN_ATTACKS[chess.BLACK])),
+        ]
+        for name in ["shift_down", "shift_2_down", "shift_up", "shift_2_up", "shift_right", "shift_2_right",
+                     "shift_left", "shift_2_left", "shift_up_left", "shift_up_right", "shift_down_left", "shift_down_right"]:
+            functions.append((getattr(self.arrays, name), getattr(chess, name)))
+
+        for vectorized, scalar in functions:
+            self.assertEqual([int(result) for result in vectorized(bbs)], [scalar(mask) for mask in masks])
+
+        self.assertEqual(int(self.arrays.BB_KNIGHT_ATTACKS[chess.G1]), chess.BB_KNIGHT_ATTACKS[chess.G1])
+        self.assertEqual(int(self.arrays.BB_PAWN_ATTACKS[int(chess.BLACK), chess.E5]), chess.BB_D4 | chess.BB_F4)
+
+
 class SuicideTestCase(unittest.TestCase):
 
     def test_parse_san(self):
@@ -3379,6 +4200,10 @@ class AtomicTestCase(unittest.TestCase):
         board.push_san("O-O")
         self.assertEqual(board.fen(), "5b1r/1p5p/4ppp1/4Bn2/1PPP1PP1/4P2P/3k4/5RK1 b - - 2 1")
 
+        # Attacks through the king still count.
+        board = chess.variant.AtomicBoard("8/8/8/8/8/8/3k4/r3K2R w K - 0 1")
+        self.assertNotIn(chess.Move.from_uci("e1g1"), board.legal_moves)
+
 
 class RacingKingsTestCase(unittest.TestCase):
 
@@ -3403,6 +4228,7 @@ class RacingKingsTestCase(unittest.TestCase):
         self.assertFalse(board.is_variant_draw())
         self.assertFalse(board.is_variant_win())
         self.assertTrue(board.is_variant_loss())
+        self.assertEqual(board.outcome(), chess.Outcome(chess.TERMINATION_VARIANT_LOSS, chess.BLACK))
 
         # Black to move is lost, because they cannot reach the backrank.
         board = chess.variant.RacingKingsBoard("5RK1/1k6/8/8/8/8/8/8 b - - 0 1")
@@ -3413,6 +4239,7 @@ class RacingKingsTestCase(unittest.TestCase):
     def test_stalemate(self):
         board = chess.variant.RacingKingsBoard("1Q4R1/5K2/4B3/8/8/3N4/8/k7 b - - 0 1")
         self.assertTrue(board.is_game_over())
+        self.assertEqual(board.outcome(), chess.Outcome(chess.TERMINATION_STALEMATE, None))
         self.assertTrue(board.is_stalemate())
         self.assertFalse(board.is_variant_win())
         self.assertFalse(board.is_variant_draw())
@@ -3476,6 +4303,12 @@ class HordeTestCase(unittest.TestCase):
 
 class ThreeCheckTestCase(unittest.TestCase):
 
+    def test_outcome_cache(self):
+        board = chess.variant.ThreeCheckBoard()
+        self.assertIsNone(board.outcome())
+        board.remaining_checks[chess.BLACK] = 0
+        self.assertEqual(board.outcome(), chess.Outcome(chess.TERMINATION_VARIANT_LOSS, chess.BLACK))
+
     def test_get_fen(self):
         board = chess.variant.ThreeCheckBoard()
         self.assertEqual(board.fen(), chess.variant.ThreeCheckBoard.starting_fen)
@@ -3501,6 +4334,11 @@ class ThreeCheckTestCase(unittest.TestCase):
         self.assertEqual(board.remaining_checks[chess.WHITE], 2)
         self.assertEqual(board.remaining_checks[chess.BLACK], 1)
 
+    def test_bytes(self):
+        board = chess.variant.ThreeCheckBoard("8/8/1K2p3/3qP2k/8/8/8/8 b - - 3 57 +1+2")
+        board = chess.variant.ThreeCheckBoard.from_bytes(board.to_bytes())
+        self.assertEqual(board.fen(), "8/8/1K2p3/3qP2k/8/8/8/8 b - - 2+1 3 57")
+
     def test_set_epd(self):
         epd = "4r3/ppk3p1/4b2p/2ppPp2/5P2/2P3P1/PP1N2P1/3R2K1 w - - 1+3 foo \"bar\";"
         board, extra = chess.variant.ThreeCheckBoard.from_epd(epd)
@@ -3564,6 +4402,11 @@ class CrazyhouseTestCase(unittest.TestCase):
             game = chess.pgn.read_game(pgn)
             self.assertEqual(game.end().board().move_stack[23], chess.Move.from_uci("N@f3"))
 
+    def test_no_halfmove_clock_draws(self):
+        board = chess.variant.CrazyhouseBoard("4k3/8/6r1/8/8/8/2R5/4K3[] w - - 369 1")
+        self.assertFalse(board.is_seventyfive_moves())
+        self.assertIsNone(board.outcome(claim_draw=True))
+
     def test_pawns_in_pocket(self):
         board = chess.variant.CrazyhouseBoard("r2q1rk1/ppp2pp1/1bnp3p/3Bp3/4P1b1/2PPPN2/PP4PP/R2Q1RK1/NBn w - - 22 12")
         board.push_san("d4")
@@ -3620,6 +4463,14 @@ class CrazyhouseTestCase(unittest.TestCase):
         board = chess.variant.CrazyhouseBoard(fen)
         self.assertEqual(board.fen(), fen)
 
+    def test_bytes(self):
+        fen = "r3kb1r/p1pN1ppp/2p1p3/8/2Pn4/3Q4/PP3PPP/R1B2q~K1[NPbbp] w kq - 0 1"
+        board = chess.variant.CrazyhouseBoard(fen)
+        board = chess.variant.CrazyhouseBoard.from_bytes(board.to_bytes())
+        self.assertEqual(board.fen(), fen)
+        self.assertEqual(board.promoted, chess.BB_F1)
+        self.assertEqual(board.pockets[chess.BLACK].count(chess.BISHOP), 2)
+
     def test_push_pop_ep(self):
         fen = "rnbqkb1r/ppp1pppp/5n2/3pP3/8/8/PPPP1PPP/RNBQKBNR[] w KQkq d6 0 3"
         board = chess.variant.CrazyhouseBoard(fen)